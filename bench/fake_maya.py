@@ -0,0 +1,310 @@
+"""Headless stand-ins for maya.cmds and maya.api.OpenMaya.
+
+They only do enough for the scatter modules to run, and count every call
+so benchmarks can report how much work would go through maya. Call
+install() before importing any scatter module."""
+import collections
+import importlib
+import os
+import sys
+import types
+
+import numpy as np
+
+calls = collections.Counter()
+meshes = {}
+commands = {}
+plugins = set()
+
+
+def install():
+    """Puts the stand-ins into sys.modules as the maya packages"""
+    maya = types.ModuleType("maya")
+    api = types.ModuleType("maya.api")
+    open_maya = types.ModuleType("maya.api.OpenMaya")
+    for name, value in _open_maya_members().items():
+        setattr(open_maya, name, value)
+    maya.cmds = FakeCmds()
+    maya.api = api
+    api.OpenMaya = open_maya
+    sys.modules["maya"] = maya
+    sys.modules["maya.cmds"] = maya.cmds
+    sys.modules["maya.api"] = api
+    sys.modules["maya.api.OpenMaya"] = open_maya
+
+
+def reset():
+    calls.clear()
+    meshes.clear()
+
+
+def add_mesh(name, points, normals, face_counts, face_vertices):
+    """Registers a mesh the fake OpenMaya can read"""
+    meshes[name] = (points, normals, face_counts, face_vertices)
+
+
+def command_calls():
+    return sum(count for name, count in calls.items()
+               if name.startswith("cmds."))
+
+
+def api_calls():
+    return sum(count for name, count in calls.items()
+               if name.startswith("om."))
+
+
+class FakeCmds(types.ModuleType):
+    """maya.cmds where every command is counted and mostly does nothing"""
+
+    def __init__(self):
+        super(FakeCmds, self).__init__("maya.cmds")
+        self._made = 0
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        handler = commands.get(name) or getattr(self, "_" + name, None)
+
+        def command(*args, **kwargs):
+            calls["cmds." + name] += 1
+            if handler is not None:
+                return handler(*args, **kwargs)
+            return None
+
+        return command
+
+    def _instance(self, prototype):
+        self._made += 1
+        return ["{}_instance{}".format(prototype, self._made)]
+
+    def _particle(self, *args, **kwargs):
+        return ["scatter_points", "scatter_pointsShape"]
+
+    def _particleInstancer(self, *args, **kwargs):
+        return "scatter_instancer"
+
+    def _normalConstraint(self, component, node, **kwargs):
+        return [node + "_normalConstraint1"]
+
+    def _objExists(self, name):
+        return True
+
+    def _workspace(self, *args, **kwargs):
+        return "."
+
+    def _loadPlugin(self, path):
+        name = os.path.splitext(os.path.basename(path))[0]
+        importlib.import_module(name).initializePlugin(None)
+        plugins.add(name)
+        return [name]
+
+    def _pluginInfo(self, name, query=False, loaded=False):
+        return name in plugins
+
+
+def _count(name):
+    calls["om." + name] += 1
+
+
+def _open_maya_members():
+    class MSpace(object):
+        kTransform = 1
+        kWorld = 4
+
+    class MFn(object):
+        kTransform = 110
+        kMesh = 296
+        kMeshVertComponent = 550
+        kMeshEdgeComponent = 547
+        kMeshPolygonComponent = 548
+
+    class MObject(object):
+        def __init__(self, kind=None, elements=None, name=None):
+            self.kind = kind
+            self.elements = elements
+            self.name = name
+
+        def isNull(self):
+            return self.kind is None and self.name is None
+
+        def hasFn(self, kind):
+            return self.kind == kind
+
+    class MDagPath(object):
+        def __init__(self, name):
+            self.name = name
+
+        def apiType(self):
+            return MFn.kMesh if self.name in meshes else MFn.kTransform
+
+        def extendToShape(self):
+            if self.name not in meshes:
+                raise RuntimeError("No shape below " + self.name)
+
+        def fullPathName(self):
+            return "|" + self.name
+
+        def partialPathName(self):
+            return self.name
+
+    class MSelectionList(object):
+        def __init__(self):
+            self._items = []
+
+        def add(self, name):
+            _count("MSelectionList.add")
+            path, _, component = name.lstrip("|").partition(".")
+            self._items.append((path, component))
+            return self
+
+        def length(self):
+            return len(self._items)
+
+        def getComponent(self, index):
+            path, component = self._items[index]
+            return MDagPath(path), _component(component)
+
+        def getDagPath(self, index):
+            return MDagPath(self._items[index][0])
+
+        def getDependNode(self, index):
+            return MObject(name=self._items[index][0])
+
+        def getPlug(self, index):
+            return MPlug()
+
+    def _component(name):
+        """MObject of a component name like vtx[0:3], null without one"""
+        if not name:
+            return MObject()
+        kinds = {"vtx": MFn.kMeshVertComponent, "e": MFn.kMeshEdgeComponent,
+                 "f": MFn.kMeshPolygonComponent}
+        kind, _, run = name.rstrip("]").partition("[")
+        start, _, end = run.partition(":")
+        return MObject(kinds[kind],
+                       list(range(int(start), int(end or start) + 1)))
+
+    class MGlobal(object):
+        @staticmethod
+        def getActiveSelectionList():
+            return MSelectionList()
+
+    class MFnMesh(object):
+        def __init__(self, dag_path):
+            self._mesh = meshes[dag_path.name]
+
+        def getPoints(self, space):
+            _count("MFnMesh.getPoints")
+            points = self._mesh[0]
+            return np.hstack((points, np.ones((len(points), 1))))
+
+        def getVertexNormals(self, angle_weighted, space):
+            _count("MFnMesh.getVertexNormals")
+            return self._mesh[1]
+
+        def getVertices(self):
+            _count("MFnMesh.getVertices")
+            return self._mesh[2], self._mesh[3]
+
+    class MFnSingleIndexedComponent(object):
+        def __init__(self, component):
+            self._component = component
+
+        def getElements(self):
+            return self._component.elements
+
+    class MPlug(object):
+        pass
+
+    class MFnDependencyNode(object):
+        def setObject(self, node):
+            _count("MFnDependencyNode.setObject")
+
+        def findPlug(self, attr, want_networked):
+            _count("MFnDependencyNode.findPlug")
+            return MPlug()
+
+    class MDGModifier(object):
+        def newPlugValueDouble(self, plug, value):
+            _count("MDGModifier.newPlugValueDouble")
+
+        def doIt(self):
+            _count("MDGModifier.doIt")
+
+        def undoIt(self):
+            _count("MDGModifier.undoIt")
+
+    class MSyntax(object):
+        kDouble = 4
+        kStringObjects = 3
+
+        def __init__(self):
+            self.flags = {}
+
+        def setObjectType(self, kind, minimum=0, maximum=None):
+            pass
+
+        def addFlag(self, short_name, long_name, *arg_types):
+            self.flags[short_name] = long_name.lstrip("-")
+
+        def makeFlagMultiUse(self, short_name):
+            pass
+
+    class MArgList(list):
+        """Command arguments, positional ones in the list and flag values
+        by long name in flags"""
+
+        def __init__(self, values=(), flags=None):
+            super(MArgList, self).__init__(values)
+            self.flags = flags or {}
+
+        def asDouble(self, index):
+            return float(self[index])
+
+    class MArgDatabase(object):
+        def __init__(self, syntax, args):
+            self._syntax = syntax
+            self._args = args
+
+        def getObjectStrings(self):
+            objects = []
+            for value in self._args:
+                if isinstance(value, (list, tuple)):
+                    objects.extend(value)
+                else:
+                    objects.append(value)
+            return objects
+
+        def _flag_values(self, short_name):
+            return self._args.flags.get(self._syntax.flags[short_name], [])
+
+        def numberOfFlagUses(self, short_name):
+            return len(self._flag_values(short_name))
+
+        def getFlagArgumentList(self, short_name, use):
+            return MArgList(self._flag_values(short_name)[use])
+
+    class MPxCommand(object):
+        def syntax(self):
+            return self._syntax
+
+    class MFnPlugin(object):
+        """Registers plugin commands as fake maya.cmds commands that run
+        doIt right away"""
+
+        def __init__(self, plugin=None):
+            pass
+
+        def registerCommand(self, name, creator, syntax_creator):
+            def command(*args, **kwargs):
+                instance = creator()
+                instance._syntax = syntax_creator()
+                return instance.doIt(MArgList(args, kwargs))
+
+            commands[name] = command
+
+        def deregisterCommand(self, name):
+            commands.pop(name, None)
+
+    return dict((name, value) for name, value in locals().items()
+                if name.startswith("M"))
@@ -0,0 +1,86 @@
+"""Times importing scenefile in fresh python processes.
+
+Every run starts a new interpreter, so nothing is cached in sys.modules,
+and fails when the import pulls in maya, pymel or Qt. With --max-ms the
+exit code is also 1 when the median import time is slower than that, so
+it can guard the import speed of batch jobs and tests.
+
+    python bench/import_bench.py --runs 20 --max-ms 50
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                   "src")
+MODULES = ("scenefile",)
+HEAVY_MODULES = ("maya", "pymel", "PySide2", "shiboken2")
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": sorted(
+    name for name in sys.modules if name.split(".")[0] in {heavy!r})}}))
+"""
+
+
+def time_import(module, python=sys.executable):
+    """Seconds to import module in a new interpreter and the heavy
+    modules it imported"""
+    probe = PROBE.format(src=SRC, module=module, heavy=HEAVY_MODULES)
+    output = subprocess.check_output([python, "-c", probe])
+    result = json.loads(output.decode("utf-8").splitlines()[-1])
+    return result["seconds"], result["heavy"]
+
+
+def run(module, runs, python=sys.executable):
+    times = []
+    heavy = set()
+    for _ in range(runs):
+        seconds, imported = time_import(module, python)
+        times.append(seconds * 1000.0)
+        heavy.update(imported)
+    return {"module": module, "runs": runs,
+            "median_ms": statistics.median(times), "min_ms": min(times),
+            "max_ms": max(times), "heavy_modules": sorted(heavy)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-ms", type=float,
+                        help="Fail when the median import is slower")
+    parser.add_argument("--python", default=sys.executable,
+                        help="Interpreter to time, mayapy for example")
+    parser.add_argument("--output", help="Save the results as json")
+    args = parser.parse_args(argv)
+    failed = False
+    results = []
+    for module in args.modules:
+        stats = run(module, args.runs, args.python)
+        print("{module:18} median {median_ms:7.2f}ms min {min_ms:7.2f}ms "
+              "max {max_ms:7.2f}ms".format(**stats))
+        if stats["heavy_modules"]:
+            print("  imports " + ", ".join(stats["heavy_modules"]))
+            failed = True
+        if args.max_ms is not None and stats["median_ms"] > args.max_ms:
+            print("  slower than {:.2f}ms".format(args.max_ms))
+            failed = True
+        results.append(stats)
+    if args.output:
+        report = {"python": platform.python_version(), "results": results}
+        with open(args.output, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        print("Saved " + args.output)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
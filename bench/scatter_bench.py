@@ -0,0 +1,123 @@
+"""Benchmarks the four scatter modes on synthetic grid meshes.
+
+Runs headless against fake_maya and reports wall time, peak memory,
+maya commands per instance and points per second, saved as json so runs
+of different versions can be compared.
+
+    python bench/scatter_bench.py --sizes 1000 10000 --output results.json
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import fake_maya
+
+fake_maya.install()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "src"))
+
+import mesh_reader  # noqa: E402
+import scatter_core  # noqa: E402
+import scatter_pipeline  # noqa: E402
+
+log = logging.getLogger(__name__)
+
+MESH_NAME = "bench_grid"
+PROTOTYPE = "bench_prototype"
+MODES = (("scatter_work", False, False), ("normal_work", False, True),
+         ("scatter_work_face", True, False), ("normal_work_face", True, True))
+SIZES = (1000, 10000, 100000, 1000000)
+
+
+def make_grid(faces):
+    """A roughly square quad grid with about the given number of faces"""
+    side = max(int(round(math.sqrt(faces))), 1)
+    coords = np.arange(side + 1, dtype=np.float64)
+    xs, zs = np.meshgrid(coords, coords)
+    points = np.stack((xs.ravel(), np.zeros(xs.size), zs.ravel()), axis=1)
+    normals = np.tile((0.0, 1.0, 0.0), (len(points), 1))
+    rows, cols = np.meshgrid(np.arange(side), np.arange(side), indexing="ij")
+    corner = (rows * (side + 1) + cols).ravel()
+    face_vertices = np.stack((corner, corner + side + 1, corner + side + 2,
+                              corner + 1), axis=1).ravel()
+    face_counts = np.full(side * side, 4, dtype=np.int64)
+    return points, normals, face_counts, face_vertices
+
+
+def run(mode, faces, align, size, percentage, seed, instancer):
+    fake_maya.reset()
+    fake_maya.add_mesh(MESH_NAME, *make_grid(size))
+    settings = scatter_core.ScatterSettings(
+        rot_min=(0, 0, 0), rot_max=(0, 360, 0), scale_min=(0.5, 0.5, 0.5),
+        scale_max=(1.5, 1.5, 1.5), percentage=percentage, faces=faces,
+        align=align, seed=seed)
+    selection = mesh_reader.read_selection([MESH_NAME])
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = scatter_pipeline.run_scatter(selection, PROTOTYPE, settings,
+                                          instancer=instancer)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    instances = len(result)
+    return {"mode": mode, "size": size, "instances": instances,
+            "wall_time": elapsed, "peak_memory_mb": peak / 1024.0 ** 2,
+            "cmds_calls": fake_maya.command_calls(),
+            "cmds_per_instance":
+                fake_maya.command_calls() / float(max(instances, 1)),
+            "api_calls": fake_maya.api_calls(),
+            "points_per_second": instances / elapsed if elapsed else 0.0}
+
+
+def version():
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.STDOUT).decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--modes", nargs="+",
+                        default=[mode for mode, _, _ in MODES])
+    parser.add_argument("--percentage", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--instancer", action="store_true",
+                        help="Output to a single instancer node")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+    runs = []
+    for mode, faces, align in MODES:
+        if mode not in args.modes:
+            continue
+        for size in args.sizes:
+            stats = run(mode, faces, align, size, args.percentage, args.seed,
+                        args.instancer)
+            print("{mode:18} {size:>8} {instances:>8} instances "
+                  "{wall_time:8.3f}s {peak_memory_mb:8.1f}MB "
+                  "{cmds_per_instance:6.2f} cmds/instance "
+                  "{points_per_second:12.0f} points/s".format(**stats))
+            runs.append(stats)
+    report = {"version": version(), "python": platform.python_version(),
+              "numpy": np.__version__, "instancer": args.instancer,
+              "percentage": args.percentage, "runs": runs}
+    with open(args.output, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+    print("Saved " + args.output)
+
+
+if __name__ == "__main__":
+    main()
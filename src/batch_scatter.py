@@ -0,0 +1,303 @@
+"""Runs scatter layouts on scenes without a ui, for example on a farm.
+
+    mayapy batch_scatter.py jobs.json --workers 4 --report report.json
+
+The job file lists the scenes to open, the scatters to make in each and
+how to name the saved result:
+
+    {"workers": 4,
+     "report": "scatter_report.json",
+     "jobs": [{"name": "forest",
+               "scene": "/proj/scenes/forest_layout_v001.ma",
+               "output": {"folder": "/proj/scenes/scatter",
+                          "descriptor": "forest", "task": "scatter"},
+               "scatters": [{"targets": ["ground"],
+                             "prototypes": ["pine", "birch"],
+                             "weights": [3, 1],
+                             "rot_min": [0, 0, 0], "rot_max": [0, 360, 0],
+                             "scale_min": [0.8, 0.8, 0.8],
+                             "scale_max": [1.2, 1.2, 1.2],
+                             "percentage": 0.2, "seed": 1,
+                             "mode": "surface", "count": 5000,
+                             "instancer": true}]}]}
+
+Every scene is handled by its own worker process running maya
+standalone. The version every job saves as is picked before the workers
+start, after the latest version on disk and the versions given to the
+jobs before it, so existing versions are never overwritten, not even by
+jobs writing the same name. Output entries are optional, without them
+the opened scene is saved as its next version. A report with the timings
+and result of every job is written when all of them are done."""
+import argparse
+import atexit
+import concurrent.futures
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+import maya.cmds as cmds
+
+import chunk_store
+import mesh_reader
+import scatter_core
+import scatter_parallel
+import scatter_pipeline
+import scenefile
+
+log = logging.getLogger(__name__)
+
+MODES = {"vertices": (False, False), "faces": (True, False),
+         "surface": (True, True)}
+SCATTER_KEYS = ("targets", "prototypes", "weights", "rot_min", "rot_max",
+                "scale_min", "scale_max", "percentage", "seed", "mode",
+                "align", "count", "spacing", "scale_spacing", "density",
+                "instancer", "blockers")
+OUTPUT_KEYS = ("folder", "descriptor", "task", "ext")
+
+
+def load_jobs(path):
+    """Reads and checks a job file, raises ValueError when it is invalid"""
+    with open(path) as job_file:
+        spec = json.load(job_file)
+    jobs = spec.get("jobs")
+    if not jobs:
+        raise ValueError("{} has no jobs".format(path))
+    for num, job in enumerate(jobs):
+        job.setdefault("name", "job{}".format(num))
+        if not job.get("scene"):
+            raise ValueError("Job {} has no scene".format(job["name"]))
+        _check_keys(job.get("output", {}), OUTPUT_KEYS,
+                    "output of " + job["name"])
+        for config in job.get("scatters", []):
+            _check_keys(config, SCATTER_KEYS, "scatter of " + job["name"])
+            if not config.get("targets") or not config.get("prototypes"):
+                raise ValueError("Every scatter of {} needs targets and "
+                                 "prototypes".format(job["name"]))
+            if config.get("mode", "vertices") not in MODES:
+                raise ValueError("Unknown scatter mode {} in {}".format(
+                    config["mode"], job["name"]))
+            _check_weights(config, job["name"])
+    return spec
+
+
+def run_jobs(jobs, workers=None, executable=None):
+    """Runs every job in a pool of maya standalone processes.
+
+    Returns the report entry of every job in order."""
+    assign_versions(jobs)
+    workers = min(workers or multiprocessing.cpu_count(), len(jobs))
+    context = multiprocessing.get_context("spawn")
+    context.set_executable(executable or scatter_parallel.mayapy_executable()
+                           or sys.executable)
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=context,
+            initializer=_init_worker) as pool:
+        futures = [pool.submit(run_job, job) for job in jobs]
+        reports = []
+        for job, future in zip(jobs, futures):
+            try:
+                reports.append(future.result())
+            except Exception as err:
+                reports.append({"name": job["name"], "scene": job["scene"],
+                                "ok": False, "error": repr(err),
+                                "timings": {}})
+            log.info("%s finished", job["name"])
+        return reports
+
+
+def run_job(job):
+    """Opens the scene of a job, scatters into it and saves a new version.
+
+    Runs inside a worker and never raises, errors go into the report."""
+    report = {"name": job["name"], "scene": job["scene"], "ok": False,
+              "saved": None, "instances": [], "timings": {}}
+    timings = report["timings"]
+    start = time.perf_counter()
+    try:
+        with _timer(timings, "open"):
+            cmds.file(job["scene"], open=True, force=True)
+        for num, config in enumerate(job.get("scatters", [])):
+            with _timer(timings, "scatter{}".format(num)):
+                report["instances"].append(run_scatter_config(config))
+        with _timer(timings, "save"):
+            report["saved"] = save_version(job["save_path"])
+        report["ok"] = True
+    except Exception as err:
+        report["error"] = repr(err)
+        report["traceback"] = traceback.format_exc()
+    timings["total"] = time.perf_counter() - start
+    return report
+
+
+def run_scatter_config(config):
+    """Makes one scatter of a job file in the open scene.
+
+    Returns the number of instances made."""
+    selection = mesh_reader.read_selection(config["targets"])
+    density = config.get("density")
+    result = scatter_pipeline.run_scatter(
+        selection, list(config["prototypes"]), scatter_settings(config),
+        density=tuple(density) if density else None,
+        instancer=config.get("instancer", False),
+        blockers=config.get("blockers", ()))
+    return len(result)
+
+
+def scatter_settings(config):
+    """ScatterSettings for one scatter of a job file"""
+    faces, surface = MODES[config.get("mode", "vertices")]
+    weights = scatter_core.prototype_weights(config.get("weights") or (),
+                                             len(config["prototypes"]))
+    options = dict((key, config[key]) for key in
+                   ("rot_min", "rot_max", "scale_min", "scale_max",
+                    "percentage", "seed", "align", "count", "spacing",
+                    "scale_spacing") if key in config)
+    return scatter_core.ScatterSettings(faces=faces, surface=surface,
+                                        prototype_weights=weights, **options)
+
+
+def output_scene_file(scene, output):
+    """SceneFile of a job's scene renamed by its output entry"""
+    scene_file = scenefile.SceneFile(scene)
+    if output.get("folder"):
+        scene_file.folder_path = output["folder"]
+    for key in ("descriptor", "task", "ext"):
+        if output.get(key):
+            setattr(scene_file, key, output[key])
+    return scene_file
+
+
+def assign_versions(jobs):
+    """Sets the path every job saves to, as job["save_path"].
+
+    Jobs saving under the same name get consecutive versions after the
+    latest one on disk. Raises ValueError when a scene name does not
+    follow the naming convention."""
+    taken = {}
+    for job in jobs:
+        try:
+            scene_file = output_scene_file(job["scene"],
+                                           job.get("output", {}))
+        except ValueError:
+            raise ValueError("Unable to name the output of {}, {} does not "
+                             "follow the naming convention".format(
+                                 job["name"], job["scene"]))
+        key = (os.path.normcase(os.path.abspath(str(scene_file.folder_path))),
+               scene_file.descriptor, scene_file.task, scene_file.ext)
+        if key in taken:
+            scene_file.ver = taken[key] + 1
+        else:
+            scene_file.ver = scene_file.next_avail_ver()
+        taken[key] = scene_file.ver
+        job["save_path"] = str(scene_file.path)
+
+
+def save_version(path):
+    """Saves the open scene to the path assigned to its job.
+
+    The file is created exclusively before maya writes to it. Should
+    another save have taken the version since it was assigned, the next
+    free one is used instead."""
+    scene_file = scenefile.SceneFile(path)
+    scene_file.store = chunk_store.default_store()
+    scene_file.folder_path.mkdir(parents=True, exist_ok=True)
+    while True:
+        try:
+            os.close(os.open(str(scene_file.path),
+                             os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            log.warning("%s already exists, trying the next version",
+                        scene_file.path)
+            scene_file.ver += 1
+    try:
+        scene_file.save()
+    except Exception:
+        os.remove(str(scene_file.path))
+        raise
+    return str(scene_file.path)
+
+
+def write_report(path, reports, elapsed):
+    with open(path, "w") as report_file:
+        json.dump({"elapsed": elapsed,
+                   "failed": sum(1 for report in reports
+                                 if not report["ok"]),
+                   "jobs": reports}, report_file, indent=2)
+
+
+def _init_worker():
+    import maya.standalone
+
+    maya.standalone.initialize(name="python")
+    atexit.register(maya.standalone.uninitialize)
+
+
+@contextlib.contextmanager
+def _timer(timings, name):
+    """Adds the seconds spent in the block to timings[name]"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+def _check_keys(entry, allowed, where):
+    unknown = sorted(set(entry) - set(allowed))
+    if unknown:
+        raise ValueError("Unknown keys {} in {}".format(", ".join(unknown),
+                                                       where))
+
+
+def _check_weights(config, name):
+    """Raises ValueError unless there is a weight for every prototype"""
+    weights = config.get("weights")
+    if weights is None:
+        return
+    if (not isinstance(weights, list) or
+            len(weights) != len(config["prototypes"])):
+        raise ValueError("A scatter of {} needs one weight for each of its "
+                         "{} prototypes".format(name,
+                                                len(config["prototypes"])))
+    for weight in weights:
+        if (isinstance(weight, bool) or
+                not isinstance(weight, (int, float)) or not weight >= 0):
+            raise ValueError("Invalid weight {!r} in a scatter of {}, "
+                             "weights are numbers of 0 or more".format(
+                                 weight, name))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("job_file")
+    parser.add_argument("--workers", type=int,
+                        help="Number of maya processes, the job file or "
+                             "the cpu count by default")
+    parser.add_argument("--report",
+                        help="Where to write the timing report")
+    parser.add_argument("--executable",
+                        help="The mayapy to start workers with")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    spec = load_jobs(args.job_file)
+    report = (args.report or spec.get("report") or
+              os.path.splitext(args.job_file)[0] + "_report.json")
+    start = time.perf_counter()
+    reports = run_jobs(spec["jobs"], args.workers or spec.get("workers"),
+                       args.executable)
+    write_report(report, reports, time.perf_counter() - start)
+    failed = [entry["name"] for entry in reports if not entry["ok"]]
+    if failed:
+        log.error("Failed jobs: %s", ", ".join(failed))
+    log.info("Saved report to %s", report)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
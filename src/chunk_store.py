@@ -0,0 +1,291 @@
+"""Deduplicated storage of scene versions.
+
+Saved scenes are cut into content defined chunks: a rolling hash over
+the last WINDOW bytes marks the cut points, so an edit only changes the
+chunks around it and the rest of the file cuts the same way as before.
+Every unique chunk is stored once under its hash, compressed with zstd
+when the zstandard package is installed, and every version is a json
+manifest listing its chunks. Adding a version only writes the chunks
+that are new. Versions are named after their file name and a hash of
+their folder, see version_name.
+
+    store = ChunkStore("/proj/version_store")
+    store.add("/proj/scenes/forest_layout_v012.ma")
+    store.restore(version_name("/proj/scenes/forest_layout_v012.ma"),
+                  "/tmp/forest_layout_v012.ma")
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import uuid
+
+import numpy as np
+
+import profiling
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+log = logging.getLogger(__name__)
+
+WINDOW = 32
+AVERAGE_BITS = 13
+MIN_CHUNK = 2 * 1024
+MAX_CHUNK = 64 * 1024
+BLOCK_SIZE = 4 * 1024 * 1024
+MASK = np.uint64(((1 << AVERAGE_BITS) - 1) << (64 - AVERAGE_BITS))
+GEAR = np.random.default_rng(0x5CA77E2).integers(
+    0, np.iinfo(np.uint64).max, size=256, dtype=np.uint64, endpoint=True)
+RAW = ".raw"
+ZSTD = ".zst"
+
+
+class ChunkStore(object):
+    """Chunks and version manifests in a folder.
+
+    compress defaults to whether zstandard can be imported."""
+
+    def __init__(self, root, compress=None, level=3):
+        self.root = os.fspath(root)
+        if compress is None:
+            compress = zstandard is not None
+        if compress and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        self.compress = compress
+        self.level = level
+
+    def add(self, path, name=None):
+        """Stores the file at path as version name, version_name by default.
+
+        Returns the number of bytes of new chunks that had to be written."""
+        name = name or version_name(path)
+        with profiling.span("store.add"):
+            written, manifest = self._add(path)
+            manifest["path"] = os.path.abspath(os.fspath(path))
+            _write_json(self._manifest_path(name), manifest)
+        profiling.report(log)
+        log.info("Stored %s, wrote %d of %d bytes", name, written,
+                 manifest["size"])
+        return written
+
+    def _add(self, path):
+        chunks = []
+        size = 0
+        written = 0
+        digest = hashlib.sha256()
+        with open(path, "rb") as source:
+            for chunk in iter_chunks(source):
+                chunk_hash = hashlib.blake2b(chunk, digest_size=20).hexdigest()
+                if not self.has_chunk(chunk_hash):
+                    written += self._write_chunk(chunk_hash, chunk)
+                chunks.append([chunk_hash, len(chunk)])
+                size += len(chunk)
+                digest.update(chunk)
+        profiling.count("store.bytes_written", written)
+        return written, {"size": size, "sha256": digest.hexdigest(),
+                         "chunks": chunks}
+
+    def versions(self):
+        """Names of every stored version"""
+        folder = os.path.join(self.root, "manifests")
+        if not os.path.isdir(folder):
+            return []
+        return sorted(name[:-len(".json")] for name in os.listdir(folder)
+                      if name.endswith(".json"))
+
+    def manifest(self, name):
+        with open(self._manifest_path(name)) as manifest_file:
+            return json.load(manifest_file)
+
+    def iter_version(self, name):
+        """Yields the bytes of a stored version chunk by chunk"""
+        for chunk_hash, size in self.manifest(name)["chunks"]:
+            chunk = self.read_chunk(chunk_hash)
+            if len(chunk) != size:
+                raise ValueError("Chunk {} of {} is damaged".format(
+                    chunk_hash, name))
+            yield chunk
+
+    def restore(self, name, path):
+        """Writes a stored version to path without holding it in memory"""
+        with profiling.span("store.restore"):
+            digest = hashlib.sha256()
+            with partial_file(path) as partial:
+                with open(partial, "xb") as target:
+                    for chunk in self.iter_version(name):
+                        digest.update(chunk)
+                        target.write(chunk)
+                if digest.hexdigest() != self.manifest(name)["sha256"]:
+                    raise ValueError("Restored {} does not match its "
+                                     "checksum".format(name))
+        profiling.report(log)
+
+    def remove(self, name):
+        """Forgets a version, its chunks stay until collect_garbage"""
+        os.remove(self._manifest_path(name))
+
+    def collect_garbage(self):
+        """Deletes the chunks no version uses, returns how many"""
+        used = set()
+        for name in self.versions():
+            used.update(chunk_hash for chunk_hash, _
+                        in self.manifest(name)["chunks"])
+        removed = 0
+        for folder, _, names in os.walk(os.path.join(self.root, "chunks")):
+            for file_name in names:
+                if os.path.splitext(file_name)[0] not in used:
+                    os.remove(os.path.join(folder, file_name))
+                    removed += 1
+        return removed
+
+    def has_chunk(self, chunk_hash):
+        return any(os.path.isfile(self._chunk_path(chunk_hash, codec))
+                   for codec in (ZSTD, RAW))
+
+    def read_chunk(self, chunk_hash):
+        path = self._chunk_path(chunk_hash, ZSTD)
+        if os.path.isfile(path):
+            if zstandard is None:
+                raise ValueError("Chunk {} needs the zstandard package to "
+                                 "be read".format(chunk_hash))
+            with open(path, "rb") as chunk_file:
+                return zstandard.ZstdDecompressor().decompress(
+                    chunk_file.read())
+        with open(self._chunk_path(chunk_hash, RAW), "rb") as chunk_file:
+            return chunk_file.read()
+
+    def _write_chunk(self, chunk_hash, chunk):
+        """Writes a chunk, returns the bytes written or 0 when it is there.
+
+        Several threads or processes may add the same chunk at once, so
+        each writes its own temporary file and the last rename wins with
+        the same content."""
+        codec = RAW
+        if self.compress:
+            chunk = zstandard.ZstdCompressor(level=self.level).compress(chunk)
+            codec = ZSTD
+        path = self._chunk_path(chunk_hash, codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.has_chunk(chunk_hash):
+            return 0
+        _write_atomic(path, chunk)
+        return len(chunk)
+
+    def _chunk_path(self, chunk_hash, codec):
+        return os.path.join(self.root, "chunks", chunk_hash[:2],
+                            chunk_hash + codec)
+
+    def _manifest_path(self, name):
+        return os.path.join(self.root, "manifests", name + ".json")
+
+
+def version_name(path):
+    """Version name of a scene, its file name and a hash of its folder.
+
+    Scenes of different folders often share file names like
+    main_model_v001.ma, the hash keeps their versions apart."""
+    folder, name = os.path.split(os.path.abspath(os.fspath(path)))
+    digest = hashlib.sha1(
+        os.path.normcase(folder).encode("utf-8")).hexdigest()[:12]
+    return "{}-{}".format(name, digest)
+
+
+def default_store():
+    """The store in SFA_VERSION_STORE, None when it is not set"""
+    root = os.environ.get("SFA_VERSION_STORE")
+    return ChunkStore(root) if root else None
+
+
+def iter_chunks(stream, block_size=BLOCK_SIZE):
+    """Yields the content defined chunks of a binary stream"""
+    context = bytes(WINDOW - 1)
+    pending = b""
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        cuts = cut_candidates(block, context) + len(pending)
+        context = (context + block)[-(WINDOW - 1):]
+        pending += block
+        start = 0
+        for end in _chunk_ends(cuts.tolist(), len(pending)):
+            yield pending[start:end]
+            start = end
+        pending = pending[start:]
+    while len(pending) > MAX_CHUNK:
+        yield pending[:MAX_CHUNK]
+        pending = pending[MAX_CHUNK:]
+    if pending:
+        yield pending
+
+
+def cut_candidates(data, context):
+    """Offsets in data where the rolling hash allows a chunk to end.
+
+    context holds the WINDOW - 1 bytes before data. The hash of a byte
+    is the sum of the gear values of the last WINDOW bytes, each shifted
+    by its age, computed for the whole block at once."""
+    values = GEAR[np.frombuffer(context + data, dtype=np.uint8)]
+    hashes = np.zeros(len(data), dtype=np.uint64)
+    shifted = np.empty_like(hashes)
+    offset = len(context)
+    for age in range(WINDOW):
+        start = offset - age
+        np.left_shift(values[start:start + len(data)], np.uint64(age),
+                      out=shifted)
+        hashes += shifted
+    return np.flatnonzero((hashes & MASK) == 0) + 1
+
+
+def _chunk_ends(cuts, length):
+    """Chunk ends from the cut candidates, keeping sizes within bounds.
+
+    Data after the last end is left for the next block."""
+    ends = []
+    start = 0
+    for cut in cuts:
+        while cut - start > MAX_CHUNK:
+            start += MAX_CHUNK
+            ends.append(start)
+        if cut - start >= MIN_CHUNK:
+            ends.append(cut)
+            start = cut
+    while length - start > MAX_CHUNK + WINDOW:
+        start += MAX_CHUNK
+        ends.append(start)
+    return ends
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_atomic(path, json.dumps(data).encode("utf-8"))
+
+
+@contextlib.contextmanager
+def partial_file(path):
+    """Yields a unique temporary path next to path to write to.
+
+    It is renamed over path when the block is done, so readers never see
+    half written files and writers of the same path never write into each
+    other. It is removed again when the block fails. Unlike
+    tempfile.mkstemp the file gets the usual permissions, so other users
+    of a shared folder can read it."""
+    partial = "{}.{}.partial".format(os.fspath(path), uuid.uuid4().hex)
+    try:
+        yield partial
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+
+def _write_atomic(path, data):
+    """Writes data to path through a partial_file"""
+    with partial_file(path) as partial:
+        with open(partial, "xb") as target:
+            target.write(data)
@@ -0,0 +1,387 @@
+import logging
+
+import numpy as np
+import maya.api.OpenMaya as om
+import maya.cmds as cmds
+
+import profiling
+import scatter_core
+
+log = logging.getLogger(__name__)
+
+COLOR_SET = "color set"
+WEIGHT_ATTR = "weight attribute"
+TEXTURE = "texture"
+
+VERTICES = "vtx"
+FACES = "f"
+
+
+class MeshData(object):
+    """World space arrays of a polygon mesh, read in bulk"""
+
+    def __init__(self, name, points, normals, face_counts, face_vertices):
+        self.name = name
+        self.points = points
+        self.normals = normals
+        self.face_counts = face_counts
+        self.face_vertices = face_vertices
+        self._face_centers = None
+        self._face_normals = None
+        self._triangles = None
+        self.weights = None
+
+    @property
+    def vertex_count(self):
+        return len(self.points)
+
+    @property
+    def face_count(self):
+        return len(self.face_counts)
+
+    @property
+    def face_offsets(self):
+        return scatter_core.face_offsets(self.face_counts)
+
+    @property
+    def face_centers(self):
+        if self._face_centers is None:
+            self._face_centers = scatter_core.face_centers(
+                self.points, self.face_counts, self.face_vertices)
+        return self._face_centers
+
+    @property
+    def face_normals(self):
+        if self._face_normals is None:
+            self._face_normals = scatter_core.face_normals(
+                self.points, self.face_counts, self.face_vertices)
+        return self._face_normals
+
+    @property
+    def triangles(self):
+        """Tx3 vertex indices of the triangulated mesh and their faces"""
+        if self._triangles is None:
+            self._triangles = scatter_core.triangulate(self.face_counts,
+                                                       self.face_vertices)
+        return self._triangles
+
+    @property
+    def face_weights(self):
+        """Average of the vertex weights of every face"""
+        corners = self.weights[self.face_vertices]
+        return np.add.reduceat(corners, self.face_offsets) / self.face_counts
+
+    def face_vertex_indices(self, faces):
+        """Return the unique vertex indices used by the given faces"""
+        mask = np.zeros(self.face_count, dtype=bool)
+        mask[faces] = True
+        return np.unique(self.face_vertices[np.repeat(mask, self.face_counts)])
+
+    def contained_faces(self, vertices):
+        """Return the faces whose vertices are all in the given vertices"""
+        mask = np.zeros(self.vertex_count, dtype=bool)
+        mask[vertices] = True
+        contained = np.logical_and.reduceat(mask[self.face_vertices],
+                                            self.face_offsets)
+        return np.flatnonzero(contained)
+
+
+class ScatterTarget(object):
+    """A mesh and the vertex or face indices to scatter onto"""
+
+    def __init__(self, mesh, indices, faces=False):
+        self.mesh = mesh
+        self.indices = indices
+        self.faces = faces
+
+    def __len__(self):
+        return len(self.indices)
+
+    @property
+    def positions(self):
+        if self.faces:
+            return self.mesh.face_centers[self.indices]
+        return self.mesh.points[self.indices]
+
+    @property
+    def normals(self):
+        if self.faces:
+            return self.mesh.face_normals[self.indices]
+        return self.mesh.normals[self.indices]
+
+    @property
+    def weights(self):
+        """Density weight of every candidate, None without a density map"""
+        if self.mesh.weights is None:
+            return None
+        if self.faces:
+            return self.mesh.face_weights[self.indices]
+        return self.mesh.weights[self.indices]
+
+    def triangles(self):
+        """Corner positions, normals and weights of the target triangles.
+
+        Also returns the position in indices of the face of each triangle.
+        Weights are None without a density map."""
+        triangles, tri_faces = self.mesh.triangles
+        lookup = np.full(self.mesh.face_count, -1, dtype=np.int64)
+        lookup[self.indices] = np.arange(len(self.indices))
+        face_ids = lookup[tri_faces]
+        keep = face_ids >= 0
+        triangles = triangles[keep]
+        weights = None
+        if self.mesh.weights is not None:
+            weights = self.mesh.weights[triangles]
+        return (self.mesh.points[triangles], self.mesh.normals[triangles],
+                weights, face_ids[keep])
+
+    def component_name(self, index):
+        """Return the maya name of the component at a position in indices"""
+        pattern = "{mesh}.f[{index}]" if self.faces else "{mesh}.vtx[{index}]"
+        return pattern.format(mesh=self.mesh.name, index=self.indices[index])
+
+
+def read_mesh(dag_path):
+    """Reads points, normals and topology of a mesh with one call each"""
+    fn_mesh = om.MFnMesh(dag_path)
+    points = np.array(fn_mesh.getPoints(om.MSpace.kWorld),
+                      dtype=np.float64)[:, :3]
+    normals = np.array(fn_mesh.getVertexNormals(False, om.MSpace.kWorld),
+                       dtype=np.float64)
+    face_counts, face_vertices = fn_mesh.getVertices()
+    return MeshData(dag_path.partialPathName(), points, normals,
+                    np.array(face_counts, dtype=np.int64),
+                    np.array(face_vertices, dtype=np.int64))
+
+
+def read_density(dag_path, mesh, source, name):
+    """Reads a per vertex density weight from one of the density sources.
+
+    COLOR_SET uses the luminance of the vertex colors of the named set,
+    WEIGHT_ATTR a doubleArray attribute on the shape and TEXTURE the
+    named texture node sampled at the vertex uvs."""
+    fn_mesh = om.MFnMesh(dag_path)
+    if source == COLOR_SET:
+        colors = np.array(fn_mesh.getVertexColors(name), dtype=np.float64)
+        return _luminance(np.maximum(colors[:, :3], 0.0))
+    if source == WEIGHT_ATTR:
+        values = cmds.getAttr(dag_path.fullPathName() + "." + name)
+        weights = np.array(values or [], dtype=np.float64)
+        if len(weights) != mesh.vertex_count:
+            raise ValueError("{} does not have a weight for every vertex"
+                             .format(name))
+        return np.maximum(weights, 0.0)
+    if source == TEXTURE:
+        us, vs = fn_mesh.getUVs()
+        uv_counts, uv_ids = fn_mesh.getAssignedUVs()
+        has_uvs = np.repeat(np.array(uv_counts) > 0, mesh.face_counts)
+        vertex_uvs = np.full(mesh.vertex_count, -1, dtype=np.int64)
+        vertex_uvs[mesh.face_vertices[has_uvs]] = np.array(uv_ids)
+        mapped = vertex_uvs >= 0
+        uvs = vertex_uvs[mapped]
+        colors = cmds.colorAtPoint(name, output="RGB",
+                                   u=np.array(us)[uvs].tolist(),
+                                   v=np.array(vs)[uvs].tolist())
+        weights = np.zeros(mesh.vertex_count)
+        weights[mapped] = _luminance(np.reshape(colors, (-1, 3)))
+        return weights
+    raise ValueError("Unknown density source {}".format(source))
+
+
+class SelectionEntry(object):
+    """A mesh and the vertex or face indices picked on it.
+
+    kind is VERTICES or FACES, or None with no indices for a whole mesh."""
+
+    def __init__(self, path, kind=None, indices=None):
+        self.path = path
+        self.kind = kind
+        self.indices = indices
+
+
+class TargetSelection(object):
+    """Meshes to scatter to, stored as index arrays instead of names"""
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def summary(self, max_ranges=4, max_length=120):
+        """Short text for the ui.
+
+        Components are written as compressed ranges like pPlane1.f[0:99]
+        when there are only a few runs, otherwise as a count."""
+        parts = []
+        for entry in self.entries:
+            name = entry.path.split("|")[-1]
+            if entry.kind is None:
+                parts.append(name)
+                continue
+            ranges = compress_ranges(entry.indices)
+            if len(ranges) > max_ranges:
+                parts.append("{} ({} {})".format(
+                    name, len(entry.indices),
+                    "faces" if entry.kind == FACES else "vertices"))
+                continue
+            for start, end in ranges:
+                run = str(start) if start == end else "{}:{}".format(start,
+                                                                     end)
+                parts.append("{}.{}[{}]".format(name, entry.kind, run))
+        text = ", ".join(parts)
+        if len(text) > max_length:
+            text = "{} meshes, {} components".format(
+                len(self.entries),
+                sum(len(entry.indices) for entry in self.entries
+                    if entry.kind is not None))
+        return text
+
+
+def compress_ranges(indices):
+    """Turns sorted indices into inclusive (start, end) runs"""
+    indices = np.asarray(indices)
+    if not len(indices):
+        return []
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    starts = indices[np.concatenate(([0], breaks))]
+    ends = indices[np.concatenate((breaks - 1, [len(indices) - 1]))]
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def read_selection(names=None):
+    """Reads names, or the active selection, into a TargetSelection.
+
+    Components are kept as one index array per mesh and type, so large
+    selections never get flattened into names."""
+    with profiling.span("scatter.read_selection"):
+        return _read_selection(names)
+
+
+def _read_selection(names):
+    if names is None:
+        selection = om.MGlobal.getActiveSelectionList()
+    else:
+        selection = om.MSelectionList()
+        for name in names:
+            try:
+                selection.add(name)
+            except RuntimeError:
+                log.warning("%s does not exist. Skipping...", name)
+    entries = []
+    for i in range(selection.length()):
+        dag_path, component = selection.getComponent(i)
+        if not _extend_to_mesh(dag_path):
+            log.warning("%s is not a polygon mesh. Skipping...",
+                        dag_path.partialPathName())
+            continue
+        if component.isNull():
+            entries.append(SelectionEntry(dag_path.fullPathName()))
+            continue
+        if component.hasFn(om.MFn.kMeshPolygonComponent):
+            kind = FACES
+        elif component.hasFn(om.MFn.kMeshVertComponent):
+            kind = VERTICES
+        else:
+            log.warning("Only vertex and face components can be scattered to")
+            continue
+        elements = om.MFnSingleIndexedComponent(component).getElements()
+        entries.append(SelectionEntry(dag_path.fullPathName(), kind,
+                                      np.sort(np.array(elements,
+                                                       dtype=np.int64))))
+    return TargetSelection(entries)
+
+
+def read_targets(selection, faces=False, density=None):
+    """Returns a ScatterTarget for every entry of a TargetSelection.
+
+    Whole meshes use all of their vertices or faces, mismatched
+    components are converted. density is an optional (source, name) pair
+    passed to read_density."""
+    targets = []
+    meshes = {}
+    for entry in selection:
+        if entry.path not in meshes:
+            dag_path = om.MSelectionList().add(entry.path).getDagPath(0)
+            meshes[entry.path] = read_mesh(dag_path)
+            if density is not None:
+                meshes[entry.path].weights = read_density(
+                    dag_path, meshes[entry.path], *density)
+        mesh = meshes[entry.path]
+        targets.append(ScatterTarget(mesh, _entry_indices(mesh, entry, faces),
+                                     faces))
+    return targets
+
+
+def read_blockers(names):
+    """World space Tx3x3 corners of the triangles of every blocker mesh"""
+    corners = [np.zeros((0, 3, 3))]
+    for name in names:
+        try:
+            dag_path = om.MSelectionList().add(name).getDagPath(0)
+        except RuntimeError:
+            log.warning("%s does not exist. Skipping...", name)
+            continue
+        if not _extend_to_mesh(dag_path):
+            log.warning("%s is not a polygon mesh. Skipping...", name)
+            continue
+        mesh = read_mesh(dag_path)
+        corners.append(mesh.points[mesh.triangles[0]])
+    return np.concatenate(corners)
+
+
+def read_bound_radius(name):
+    """Radius around its pivot that holds the object in its own space"""
+    bounds = np.array(cmds.xform(name, query=True, boundingBox=True,
+                                 objectSpace=True), dtype=np.float64)
+    extent = np.maximum(np.abs(bounds[:3]), np.abs(bounds[3:]))
+    return float(np.linalg.norm(extent))
+
+
+def read_camera(name, frustum=True, padding=0.0, bands=(), max_distance=0.0,
+                proxy_outside=False):
+    """Reads a camera into scatter_core.CullSettings.
+
+    Without frustum only the distance from the camera is used."""
+    dag_path = om.MSelectionList().add(name).getDagPath(0)
+    if dag_path.apiType() == om.MFn.kTransform:
+        dag_path.extendToShape()
+    fn_camera = om.MFnCamera(dag_path)
+    cull = scatter_core.CullSettings(
+        tuple(fn_camera.eyePoint(om.MSpace.kWorld)), padding=padding,
+        bands=bands, max_distance=max_distance, proxy_outside=proxy_outside)
+    if frustum:
+        matrix = dag_path.inclusiveMatrixInverse()
+        cull.world_to_camera = np.array(
+            [matrix.getElement(row, col) for row in range(4)
+             for col in range(4)], dtype=np.float64).reshape(4, 4)
+        cull.fov = (fn_camera.horizontalFieldOfView(),
+                    fn_camera.verticalFieldOfView())
+        cull.clip = (fn_camera.nearClippingPlane, fn_camera.farClippingPlane)
+    return cull
+
+
+def _extend_to_mesh(dag_path):
+    if dag_path.apiType() == om.MFn.kTransform:
+        try:
+            dag_path.extendToShape()
+        except RuntimeError:
+            return False
+    return dag_path.apiType() == om.MFn.kMesh
+
+
+def _entry_indices(mesh, entry, faces):
+    if entry.kind is None:
+        count = mesh.face_count if faces else mesh.vertex_count
+        return np.arange(count, dtype=np.int64)
+    if entry.kind == FACES:
+        return entry.indices if faces else mesh.face_vertex_indices(
+            entry.indices)
+    return mesh.contained_faces(entry.indices) if faces else entry.indices
+
+
+def _luminance(colors):
+    return colors.dot((0.299, 0.587, 0.114))
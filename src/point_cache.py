@@ -0,0 +1,97 @@
+"""Compact columnar point cache files for scatter results.
+
+A cache file is the MAGIC bytes, a little endian uint32 header length, a
+json header and then one contiguous block per column. Every block starts
+on an ALIGNMENT boundary so columns can be memory mapped in place."""
+import json
+import struct
+
+import numpy as np
+
+from scatter_core import ScatterResult
+
+MAGIC = b"SCATTER1"
+ALIGNMENT = 64
+EXTENSION = ".scatter"
+COLUMNS = (("positions", "<f4", 3), ("rotations", "<f4", 3),
+           ("scales", "<f4", 3), ("prototype_ids", "<i4", 1))
+
+
+class PointCache(object):
+    """Columns of a point cache file, memory mapped when read"""
+
+    def __init__(self, positions, rotations, scales, prototype_ids,
+                 prototypes):
+        self.positions = positions
+        self.rotations = rotations
+        self.scales = scales
+        self.prototype_ids = prototype_ids
+        self.prototypes = prototypes
+
+    def __len__(self):
+        return len(self.positions)
+
+    def to_result(self):
+        """Wraps the columns in a ScatterResult for the instancing code"""
+        return ScatterResult(self.positions, self.rotations, self.scales,
+                             None, None, self.prototype_ids)
+
+
+def write_point_cache(path, result, prototypes, prototype_ids=None):
+    """Writes a scatter result and its prototype names to path.
+
+    prototype_ids default to the ones of the result."""
+    count = len(result)
+    if prototype_ids is None:
+        prototype_ids = result.prototype_ids
+    if prototype_ids is None:
+        prototype_ids = np.zeros(count, dtype=np.int32)
+    values = {"positions": result.positions, "rotations": result.rotations,
+              "scales": result.scales, "prototype_ids": prototype_ids}
+    arrays = []
+    columns = {}
+    offset = 0
+    for name, dtype, width in COLUMNS:
+        array = np.ascontiguousarray(values[name], dtype=dtype)
+        array = array.reshape((count, width) if width > 1 else (count,))
+        arrays.append(array)
+        columns[name] = {"dtype": dtype, "shape": list(array.shape),
+                         "offset": offset}
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({"count": count, "prototypes": list(prototypes),
+                         "columns": columns}).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 4 + len(header))
+    with open(path, "wb") as cache_file:
+        cache_file.write(MAGIC)
+        cache_file.write(struct.pack("<I", len(header)))
+        cache_file.write(header)
+        for array, (name, _, _) in zip(arrays, COLUMNS):
+            cache_file.seek(data_start + columns[name]["offset"])
+            cache_file.write(array.tobytes())
+    return path
+
+
+def read_point_cache(path):
+    """Memory maps the columns of a point cache file without copying them"""
+    with open(path, "rb") as cache_file:
+        if cache_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not a scatter point cache".format(path))
+        header_size = struct.unpack("<I", cache_file.read(4))[0]
+        header = json.loads(cache_file.read(header_size).decode("utf-8"))
+    data_start = _aligned(len(MAGIC) + 4 + header_size)
+    columns = {}
+    for name, _, _ in COLUMNS:
+        column = header["columns"][name]
+        if not header["count"]:
+            columns[name] = np.zeros(column["shape"], dtype=column["dtype"])
+            continue
+        columns[name] = np.memmap(path, dtype=column["dtype"], mode="r",
+                                  offset=data_start + column["offset"],
+                                  shape=tuple(column["shape"]))
+    return PointCache(columns["positions"], columns["rotations"],
+                      columns["scales"], columns["prototype_ids"],
+                      header["prototypes"])
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
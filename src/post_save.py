@@ -0,0 +1,164 @@
+"""Work done on a scene after it is saved, in background threads.
+
+Once maya has written a scene, PostSaveQueue checksums it, copies it to
+an archive folder, adds it to a deduplicated chunk_store.ChunkStore and
+writes a json sidecar with its metadata next to it. The steps run in a
+small thread pool and are retried on OS errors, so slow storage never
+holds up maya.
+
+    queue = PostSaveQueue(archive_folder="/proj/archive")
+    queue.submit(path, callback=print)
+"""
+import concurrent.futures
+import getpass
+import hashlib
+import json
+import logging
+import os
+import shutil
+import socket
+import time
+
+import chunk_store
+import version_index
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+SIDECAR_EXTENSION = ".meta.json"
+
+
+class PostSaveResult(object):
+    """What happened to one saved scene, error is None when it worked"""
+
+    def __init__(self, path):
+        self.path = path
+        self.checksum = None
+        self.archive_path = None
+        self.sidecar_path = None
+        self.error = None
+        self.attempts = 0
+        self.seconds = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class PostSaveQueue(object):
+    """Runs the post save steps of every submitted scene.
+
+    At most workers scenes are handled at once. A step failing with an
+    OSError is tried again up to retries times, waiting retry_delay
+    seconds and twice as long every time after. Missing files and
+    permission errors are not retried."""
+
+    def __init__(self, archive_folder=None, workers=2, retries=3,
+                 retry_delay=1.0, store=None):
+        self.archive_folder = archive_folder
+        self.store = store
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="post_save")
+
+    def submit(self, path, metadata=None, callback=None):
+        """Queues a saved scene and returns right away.
+
+        callback(result) is called from the worker thread when done, so
+        ui code has to pass the result on to the main thread itself.
+        Returns a future of the PostSaveResult."""
+        future = self._pool.submit(self._run, os.fspath(path),
+                                   dict(metadata or {}))
+        if callback is not None:
+            future.add_done_callback(lambda done: callback(done.result()))
+        return future
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+    def _run(self, path, metadata):
+        result = PostSaveResult(path)
+        start = time.perf_counter()
+        try:
+            result.checksum = self._retry(result, file_checksum, path)
+            if self.archive_folder:
+                result.archive_path = self._retry(
+                    result, archive_copy, path, self.archive_folder)
+            if self.store is not None:
+                self._retry(result, self.store.add, path)
+            metadata.update(scene_metadata(path, result))
+            result.sidecar_path = self._retry(result, write_sidecar, path,
+                                              metadata)
+        except Exception as err:
+            result.error = err
+            log.warning("Post save of %s failed: %s", path, err)
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def _retry(self, result, step, *args):
+        delay = self.retry_delay
+        for attempt in range(self.retries + 1):
+            result.attempts += 1
+            try:
+                return step(*args)
+            except OSError as err:
+                if (attempt == self.retries or
+                        isinstance(err, (FileNotFoundError, PermissionError))):
+                    raise
+                log.info("%s failed, retrying in %.1fs: %s", step.__name__,
+                         delay, err)
+                time.sleep(delay)
+                delay *= 2
+
+
+def file_checksum(path):
+    """sha256 of a file, read in chunks so big scenes stay out of memory"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as scene_file:
+        for chunk in iter(lambda: scene_file.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def archive_copy(path, folder):
+    """Copies a scene into folder, never leaving half written copies"""
+    target = archive_path(path, folder)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with chunk_store.partial_file(target) as partial:
+        shutil.copy2(path, partial)
+    return target
+
+
+def archive_path(path, folder):
+    """Where a scene is archived in folder.
+
+    The whole path of the scene is repeated below folder, so scenes of
+    different folders with the same file name never replace each other."""
+    drive, rest = os.path.splitdrive(os.path.abspath(path))
+    drive_parts = [part for part in
+                   drive.replace(":", "").replace("\\", "/").split("/")
+                   if part]
+    return os.path.join(folder, *(drive_parts + [rest.lstrip("\\/")]))
+
+
+def scene_metadata(path, result):
+    stat = os.stat(path)
+    return {"path": path, "size": stat.st_size, "mtime": stat.st_mtime,
+            "sha256": result.checksum, "archive_path": result.archive_path,
+            "user": getpass.getuser(), "host": socket.gethostname()}
+
+
+def write_sidecar(path, metadata):
+    """Writes metadata as json next to the scene.
+
+    The version index of the folder is kept current, so the next version
+    lookup does not list the folder again for the sidecar."""
+    sidecar = path + SIDECAR_EXTENSION
+    folder = os.path.dirname(os.path.abspath(sidecar))
+    mtime_before = version_index.folder_mtime(folder)
+    with chunk_store.partial_file(sidecar) as partial:
+        with open(partial, "x") as sidecar_file:
+            json.dump(metadata, sidecar_file, indent=2, sort_keys=True)
+    version_index.record_change(folder, mtime_before)
+    return sidecar
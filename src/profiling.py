@@ -0,0 +1,180 @@
+"""Opt-in timers and counters for the scatter and save tools.
+
+Nothing is recorded until enable() is called, or SFA_PROFILE is set in
+the environment. Setting SFA_PROFILE_TRACE to a path also writes a
+Chrome trace of every reported run there (open it in chrome://tracing
+or Perfetto).
+
+    with profiling.span("scatter.sample"):
+        ...
+    profiling.count("maya.nodes", 10)
+    profiling.report(log)
+"""
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+_profiler = None
+
+
+class Profiler(object):
+    """Records named spans and counters.
+
+    Spans can be recorded from several threads at once. depth is the
+    span depth of the calling thread, open_spans counts the spans open in
+    all of them."""
+
+    def __init__(self, trace_path=None):
+        self.trace_path = trace_path
+        self.spans = []
+        self.counters = collections.Counter()
+        self.open_spans = 0
+        self.lock = threading.RLock()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+
+    @property
+    def depth(self):
+        return getattr(self._local, "depth", 0)
+
+    @contextlib.contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        depth = self.depth
+        self._local.depth = depth + 1
+        with self.lock:
+            self.open_spans += 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            with self.lock:
+                self.open_spans -= 1
+                self.spans.append((name, start - self._origin,
+                                   time.perf_counter() - start, depth,
+                                   threading.current_thread().ident))
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def reset(self):
+        with self.lock:
+            self.spans = []
+            self.counters.clear()
+            self._origin = time.perf_counter()
+
+    def totals(self):
+        """Total seconds and number of calls of every span name"""
+        totals = collections.OrderedDict()
+        with self.lock:
+            spans = list(self.spans)
+        for name, _, duration, _, _ in sorted(spans,
+                                              key=lambda span: span[1]):
+            seconds, calls = totals.get(name, (0.0, 0))
+            totals[name] = (seconds + duration, calls + 1)
+        return totals
+
+    def summary(self):
+        lines = ["Profile:"]
+        for name, (seconds, calls) in self.totals().items():
+            lines.append("  {:<36} {:9.4f}s  {:>6} call{}".format(
+                name, seconds, calls, "" if calls == 1 else "s"))
+        with self.lock:
+            counters = sorted(self.counters.items())
+        for name, value in counters:
+            lines.append("  {:<36} {:>10}".format(name, value))
+        return "\n".join(lines)
+
+    def to_dict(self):
+        with self.lock:
+            return {"spans": [{"name": name, "start": start,
+                               "duration": duration, "depth": depth}
+                              for name, start, duration, depth, _
+                              in self.spans],
+                    "counters": dict(self.counters)}
+
+    def chrome_trace(self):
+        """The spans and counters in Chrome trace event format"""
+        pid = os.getpid()
+        with self.lock:
+            spans = list(self.spans)
+            counters = list(self.counters.items())
+        events = [{"name": name, "ph": "X", "ts": start * 1e6,
+                   "dur": duration * 1e6, "pid": pid, "tid": thread}
+                  for name, start, duration, _, thread in spans]
+        end = max([start + duration for _, start, duration, _, _
+                   in spans] or [0.0])
+        for name, value in counters:
+            events.append({"name": name, "ph": "C", "ts": end * 1e6,
+                           "pid": pid, "args": {name: value}})
+        return {"traceEvents": events}
+
+    def write_json(self, path):
+        with open(path, "w") as json_file:
+            json.dump(self.to_dict(), json_file, indent=2)
+
+    def write_chrome_trace(self, path):
+        with open(path, "w") as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
+
+
+def enable(trace_path=None):
+    """Starts recording and returns the Profiler"""
+    global _profiler
+    _profiler = Profiler(trace_path)
+    return _profiler
+
+
+def disable():
+    global _profiler
+    _profiler = None
+
+
+def current():
+    """The active Profiler, None while profiling is off"""
+    return _profiler
+
+
+@contextlib.contextmanager
+def span(name):
+    """Times the block under name when profiling is on"""
+    if _profiler is None:
+        yield
+        return
+    with _profiler.span(name):
+        yield
+
+
+def count(name, value=1):
+    if _profiler is not None:
+        _profiler.count(name, value)
+
+
+def report(logger):
+    """Logs the summary of a finished run and starts a new one.
+
+    Does nothing while a span is open in any thread, so only the outermost
+    call of nested instrumented functions reports, and a background
+    thread never cuts a run of another short. Its spans are reported by
+    the next call after they all closed."""
+    profiler = _profiler
+    if profiler is None:
+        return
+    with profiler.lock:
+        if profiler.open_spans:
+            return
+        summary = profiler.summary()
+        trace = profiler.chrome_trace() if profiler.trace_path else None
+        profiler.reset()
+    logger.info(summary)
+    if trace is not None:
+        with open(profiler.trace_path, "w") as trace_file:
+            json.dump(trace, trace_file)
+
+
+if os.environ.get("SFA_PROFILE") or os.environ.get("SFA_PROFILE_TRACE"):
+    enable(os.environ.get("SFA_PROFILE_TRACE"))
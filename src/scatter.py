@@ -1,32 +1,47 @@
 import logging
-import random
 import math
+import os
 
 from PySide2 import QtWidgets, QtCore
 from shiboken2 import wrapInstance
 import maya.OpenMayaUI as omui
 import maya.cmds as cmds
 
+import mesh_reader
+import point_cache
+import scatter_cache
+import scatter_core
+import scatter_pipeline
+import scatter_preview
+
 log = logging.getLogger(__name__)
 
 
 def maya_main_window():
     """Return the maya main window widget"""
     main_window = omui.MQtUtil.mainWindow()
-    return wrapInstance(long(main_window), QtWidgets.QWidget)
+    return wrapInstance(int(main_window), QtWidgets.QWidget)
 
 
 class ScatterToolUI(QtWidgets.QDialog):
     global_instance = []
+    result_cache = scatter_cache.ScatterCache()
 
     def __init__(self):
         super(ScatterToolUI, self).__init__(parent=maya_main_window())
         self.setWindowTitle("Scatter Tool")
         self.setMinimumWidth(500)
-        self.setMaximumHeight(400)
+        self.setMaximumHeight(1000)
         self.setMaximumWidth(1200)
         self.setWindowFlags(self.windowFlags() ^
                             QtCore.Qt.WindowContextHelpButtonHint)
+        self.last_result = None
+        self.target_selection = None
+        self.preview = scatter_preview.ScatterPreview()
+        self.preview_source = None
+        self.preview_timer = QtCore.QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(250)
         self.create_ui()
         self.create_connections()
 
@@ -34,9 +49,35 @@ class ScatterToolUI(QtWidgets.QDialog):
         self.scatter_btn.clicked.connect(self.scatter_function)
         self.fill_selected_one_btn.clicked.connect(self.fill_selected_one_function)
         self.fill_selected_two_btn.clicked.connect(self.fill_selected_two_function)
+        self.export_cache_btn.clicked.connect(self.export_cache_function)
+        self.instance_cache_btn.clicked.connect(self.instance_cache_function)
+        self.preview_timer.timeout.connect(self.update_preview)
+        self.preview_checkbox.toggled.connect(self.preview_toggled)
+        for spinbox in self._preview_spinboxes():
+            spinbox.valueChanged.connect(self._schedule_preview)
+        for checkbox in (self.face_checkbox, self.normal_checkbox,
+                         self.surface_checkbox, self.scale_spacing_checkbox):
+            checkbox.toggled.connect(self._schedule_preview)
+        self.density_cmb.currentIndexChanged.connect(self._schedule_preview)
+        self.density_le.editingFinished.connect(self._schedule_preview)
+        self.blockers_le.editingFinished.connect(self._schedule_preview)
+        self.collision_checkbox.toggled.connect(self._schedule_preview)
+        self.weights_le.editingFinished.connect(self._schedule_preview)
+        self.second_select.editingFinished.connect(self._schedule_preview)
+
+    def showEvent(self, event):
+        self._refresh_cameras()
+        super(ScatterToolUI, self).showEvent(event)
+
+    def closeEvent(self, event):
+        self.preview.clear()
+        super(ScatterToolUI, self).closeEvent(event)
 
     @QtCore.Slot()
     def scatter_function(self):
+        if self.preview_checkbox.isChecked():
+            self._commit_preview()
+            return
         if self.face_checkbox.isChecked() is False:
             if self.normal_checkbox.isChecked() is False:
                 self.scatter_work()
@@ -51,214 +92,266 @@ class ScatterToolUI(QtWidgets.QDialog):
     @QtCore.Slot()
     def fill_selected_one_function(self):
         selected = cmds.ls(sl=True, o=True)
-        ScatterToolUI.global_instance = selected[0]
-        self.first_select.setText(selected[0])
+        ScatterToolUI.global_instance = selected
+        self.first_select.setText(", ".join(selected))
+        self._schedule_preview()
 
     @QtCore.Slot()
     def fill_selected_two_function(self):
-        selected = cmds.ls(sl=True, fl=True)
-        selected_text = ""
-        i = 0
-        for obj in selected:
-            selected_text += selected[i] + ", "
-            i += 1
-        self.second_select.setText(selected_text)
+        self.target_selection = mesh_reader.read_selection()
+        self.second_select.setText(self.target_selection.summary())
+        self._schedule_preview()
+
+    @QtCore.Slot(bool)
+    def preview_toggled(self, checked):
+        if checked:
+            self.update_preview()
+        else:
+            self.preview_timer.stop()
+            self.preview.clear()
+
+    @QtCore.Slot()
+    def update_preview(self):
+        """Updates the preview points, only resampling when needed"""
+        if not self.preview_checkbox.isChecked():
+            return
+        source = (self.second_select.text(), self._density(),
+                  self._blockers())
+        try:
+            if source != self.preview_source:
+                self.preview.set_source(self._target_selection(), source[1],
+                                        source[2])
+                self.preview_source = source
+            settings = self._settings(faces=self.face_checkbox.isChecked(),
+                                      align=self.normal_checkbox.isChecked())
+            self.preview.update(settings)
+        except (ValueError, RuntimeError) as err:
+            log.warning(err)
+
+    @QtCore.Slot()
+    def _schedule_preview(self):
+        if self.preview_checkbox.isChecked():
+            self.preview_timer.start()
+
+    def _preview_spinboxes(self):
+        return [self.rot_x_sbx_min, self.rot_y_sbx_min, self.rot_z_sbx_min,
+                self.rot_x_sbx_max, self.rot_y_sbx_max, self.rot_z_sbx_max,
+                self.size_x_sbx_min, self.size_y_sbx_min, self.size_z_sbx_min,
+                self.size_x_sbx_max, self.size_y_sbx_max, self.size_z_sbx_max,
+                self.percent_spinbox, self.count_spinbox,
+                self.spacing_spinbox, self.seed_spinbox]
+
+    def _commit_preview(self):
+        """Instances the previewed points without sampling again"""
+        if self.preview_timer.isActive():
+            self.preview_timer.stop()
+        self.update_preview()
+        if self.preview.result is None:
+            log.warning("Nothing to scatter to. Select a polygon or components")
+            return
+        progress, on_batch = self._progress()
+        try:
+            self.last_result = self.preview.commit(
+                ScatterToolUI.global_instance,
+                instancer=self.instancer_checkbox.isChecked(),
+                live=self.live_checkbox.isChecked(), on_batch=on_batch,
+                cull=self._cull(), proxies=self._proxies())
+        except (ValueError, RuntimeError) as err:
+            log.warning(err)
+        finally:
+            progress.close()
+        self.preview_source = None
+        self.preview_checkbox.setChecked(False)
 
     def normal_work_face(self):
-        percentage = self.percent_spinbox.value() * .01
-        cmds.select(clear=True)
-        names = list(self.second_select.text().split(", "))
-        names = names[:-1]
-        random_nums = []
-        selected_face = []
-
-        i = 0
-        for obj in names:
-            cmds.select(names[i], add=True)
-            i += 1
-
-        if ".f[" not in names[0]:
-            for x in range(500):
-                """Used 500 as it should be large enough for any polygon that is in the scene"""
-                cmds.select(names[0] + ".f[" + str(x) + "]", add=True)
-
-        selected_face = cmds.filterExpand(expand=True, sm=34)
-        value = 0
-        nums_track = 0
-
-        total = len(selected_face)
-        vertex_make = percentage * total
-        vertex_make = round(vertex_make)
-        vertex_make = int(vertex_make)
-
-        for x in range(0, vertex_make):
-            random_nums = random.sample(range(total), k=vertex_make)
-            nums_track += 1
-
-        for face in selected_face:
-            if len(random_nums) > value:
-                new_obj = cmds.instance(ScatterToolUI.global_instance)
-                location = [1.2, 1.2, 1.2]
-                location = self.find_center_face(selected_face[random_nums[value]])
-                self.set_transforms(new_obj)
-                cmds.move(location[0], location[1], location[2], new_obj[0], a=True, ws=True)
-                cmds.normalConstraint(selected_face[random_nums[value]], new_obj[0], aimVector=[0.0, 1.0, 0.0])
-            value += 1
+        self._scatter(faces=True, align=True)
 
     def scatter_work_face(self):
-        percentage = self.percent_spinbox.value() * .01
-        cmds.select(clear=True)
-        names = list(self.second_select.text().split(", "))
-        names = names[:-1]
-        random_nums = []
-        selected_face = []
-
-        i = 0
-        for obj in names:
-            cmds.select(names[i], add=True)
-            i += 1
-
-        if ".f[" not in names[0]:
-            for x in range(500):
-                """Used 500 as it should be large enough for any polygon that is in the scene"""
-                cmds.select(names[0] + ".f[" + str(x) + "]", add=True)
-
-        selected_face = cmds.filterExpand(expand=True, sm=34)
-        value = 0
-        nums_track = 0
-
-        total = len(selected_face)
-        vertex_make = percentage * total
-        vertex_make = round(vertex_make)
-        vertex_make = int(vertex_make)
-
-        for x in range(0, vertex_make):
-            random_nums = random.sample(range(total), k=vertex_make)
-            nums_track += 1
-
-        for face in selected_face:
-            if len(random_nums) > value:
-                new_obj = cmds.instance(ScatterToolUI.global_instance)
-                location = [1.2, 1.2, 1.2]
-                location = self.find_center_face(selected_face[random_nums[value]])
-                self.set_transforms(new_obj)
-                cmds.move(location[0], location[1], location[2], new_obj[0], a=True, ws=True)
-            value += 1
-
-    def find_center_face(self, face_number):
-        location = [0.0, 1.2, 0.0]
-        vertex_pos = cmds.xform(face_number, q=True, ws=True, t=True)
-        vertex_num_int = int(len(vertex_pos) / 3)
-        sum_x = 0.0
-        sum_y = 0.0
-        sum_z = 0.0
-        i = 0
-        j = 1
-        k = 2
-        for x in range(0, vertex_num_int):
-            sum_x = sum_x + float(vertex_pos[i])
-            sum_y = sum_y + float(vertex_pos[j])
-            sum_z = sum_z + float(vertex_pos[k])
-            i += 3
-            j += 3
-            k += 3
-        avg_x = sum_x / vertex_num_int
-        avg_y = sum_y / vertex_num_int
-        avg_z = sum_z / vertex_num_int
-        location[0] = avg_x
-        location[1] = avg_y
-        location[2] = avg_z
-        return location
+        self._scatter(faces=True, align=False)
 
     def normal_work(self):
-        percentage = self.percent_spinbox.value() * .01
-        cmds.select(clear=True)
-        names = list(self.second_select.text().split(", "))
-        names = names[:-1]
-        random_nums = []
-        selected_vtx = []
-
-        i = 0
-        for obj in names:
-            cmds.select(names[i], add=True)
-            i += 1
-
-        if ".vtx" not in names[0]:
-            for x in range(500):
-                """Used 500 as it should be large enough for any polygon that is in the scene"""
-                cmds.select(names[0] + ".vtx[" + str(x) + "]", add=True)
-
-        selected_vtx = cmds.filterExpand(expand=True, sm=31)
-        value = 0
-        nums_track = 0
-
-        total = len(selected_vtx)
-        vertex_make = percentage * total
-        vertex_make = round(vertex_make)
-        vertex_make = int(vertex_make)
-
-        for x in range(0, vertex_make):
-            random_nums = random.sample(range(total), k=vertex_make)
-            nums_track += 1
-
-        for vertex in selected_vtx:
-            if len(random_nums) > value:
-                location = cmds.pointPosition(selected_vtx[random_nums[value]], w=True)
-                new_obj = cmds.instance(ScatterToolUI.global_instance)
-                self.set_transforms(new_obj)
-                cmds.move(location[0], location[1], location[2], new_obj[0], a=True, ws=True)
-                cmds.normalConstraint(selected_vtx[random_nums[value]], new_obj[0], aimVector=[0.0, 1.0, 0.0])
-            value += 1
+        self._scatter(faces=False, align=True)
 
     def scatter_work(self):
-        percentage = self.percent_spinbox.value() * .01
-        cmds.select(clear=True)
-        names = list(self.second_select.text().split(", "))
-        names = names[:-1]
-        random_nums = []
-        selected_vtx = []
-
-        i = 0
-        for obj in names:
-            cmds.select(names[i], add=True)
-            i += 1
-
-        if ".vtx" not in names[0]:
-            for x in range(500):
-                """Used 500 as it should be large enough for any polygon that is in the scene"""
-                cmds.select(names[0] + ".vtx[" + str(x) + "]", add=True)
-
-        selected_vtx = cmds.filterExpand(expand=True, sm=31)
-        value = 0
-        nums_track = 0
-
-        total = len(selected_vtx)
-        vertex_make = percentage * total
-        vertex_make = round(vertex_make)
-        vertex_make = int(vertex_make)
-
-        for x in range(0, vertex_make):
-            random_nums = random.sample(range(total), k=vertex_make)
-            nums_track += 1
-
-        for vertex in selected_vtx:
-            if len(random_nums) > value:
-                location = cmds.pointPosition(selected_vtx[random_nums[value]], w=True)
-                new_obj = cmds.instance(ScatterToolUI.global_instance)
-                self.set_transforms(new_obj)
-                cmds.move(location[0], location[1], location[2], new_obj[0], a=True, ws=True)
-            value += 1
-
-    def set_transforms(self, new_obj):
-        """Sets the transform of the object"""
-        x_rot = random.uniform(self.rot_x_sbx_min.value(), self.rot_x_sbx_max.value())
-        y_rot = random.uniform(self.rot_y_sbx_min.value(), self.rot_y_sbx_max.value())
-        z_rot = random.uniform(self.rot_z_sbx_min.value(), self.rot_z_sbx_max.value())
-        x_scl = random.uniform(self.size_x_sbx_min.value(), self.size_x_sbx_max.value())
-        y_scl = random.uniform(self.size_y_sbx_min.value(), self.size_y_sbx_max.value())
-        z_scl = random.uniform(self.size_z_sbx_min.value(), self.size_z_sbx_max.value())
-        cmds.rotate(x_rot, y_rot, z_rot, new_obj)
-        cmds.scale(x_scl, y_scl, z_scl, new_obj)
+        self._scatter(faces=False, align=False)
+
+    def _scatter(self, faces, align):
+        """Scatters instances to the vertices or face centers of the targets"""
+        self._update_cache_folder()
+        progress, on_batch = self._progress()
+        try:
+            settings = self._settings(faces=faces, align=align)
+            self.last_result = scatter_pipeline.run_scatter(
+                self._target_selection(), ScatterToolUI.global_instance,
+                settings, density=self._density(),
+                instancer=self.instancer_checkbox.isChecked(),
+                live=self.live_checkbox.isChecked(),
+                cache=ScatterToolUI.result_cache, on_batch=on_batch,
+                cull=self._cull(), proxies=self._proxies(),
+                blockers=self._blockers())
+        except (ValueError, RuntimeError) as err:
+            log.warning(err)
+        finally:
+            progress.close()
+
+    def _progress(self):
+        """Progress dialog and the on_batch callback that drives it"""
+        progress = QtWidgets.QProgressDialog("Scattering instances...",
+                                             "Cancel", 0, 0, self)
+        progress.setWindowModality(QtCore.Qt.WindowModal)
+        progress.setMinimumDuration(0)
+
+        def on_batch(made, total):
+            progress.setMaximum(total)
+            progress.setValue(made)
+            QtWidgets.QApplication.processEvents()
+            return not progress.wasCanceled()
+
+        return progress, on_batch
+
+    @QtCore.Slot()
+    def export_cache_function(self):
+        if self.last_result is None:
+            log.warning("Nothing to export. Scatter something first")
+            return
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            parent=self, caption="Export Point Cache",
+            filter="Scatter point cache (*{})".format(point_cache.EXTENSION))
+        if not path:
+            return
+        if not path.endswith(point_cache.EXTENSION):
+            path += point_cache.EXTENSION
+        point_cache.write_point_cache(path, self.last_result,
+                                      list(ScatterToolUI.global_instance))
+        log.info("Exported %d points to %s", len(self.last_result), path)
+
+    @QtCore.Slot()
+    def instance_cache_function(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            parent=self, caption="Instance From Point Cache",
+            filter="Scatter point cache (*{})".format(point_cache.EXTENSION))
+        if not path:
+            return
+        try:
+            cache = point_cache.read_point_cache(path)
+        except ValueError as err:
+            log.warning(err)
+            return
+        prototype = ScatterToolUI.global_instance
+        if cache.prototypes and all(cmds.objExists(name)
+                                    for name in cache.prototypes):
+            prototype = cache.prototypes
+        progress, on_batch = self._progress()
+        try:
+            scatter_pipeline.instance_result(
+                cache.to_result(), prototype,
+                instancer=self.instancer_checkbox.isChecked(),
+                on_batch=on_batch)
+        finally:
+            progress.close()
+
+    def _update_cache_folder(self):
+        cache = ScatterToolUI.result_cache
+        if not self.disk_cache_checkbox.isChecked():
+            cache.folder = None
+            return
+        root = cmds.workspace(rootDirectory=True, query=True)
+        cache.folder = os.path.join(root, "cache", "scatter")
+
+    def _target_selection(self):
+        """The filled selection, or the typed names if the text was edited"""
+        if (self.target_selection is not None and
+                self.second_select.text() == self.target_selection.summary()):
+            return self.target_selection
+        names = self.second_select.text().split(", ")
+        return mesh_reader.read_selection([name for name in names if name])
+
+    def _density(self):
+        """Returns the (source, name) density map picked in the ui or None"""
+        if self.density_cmb.currentIndex() == 0:
+            return None
+        return self.density_cmb.currentText(), self.density_le.text()
+
+    def _settings(self, faces=False, align=False):
+        """Reads the spinboxes into ScatterSettings"""
+        return scatter_core.ScatterSettings(
+            rot_min=(self.rot_x_sbx_min.value(), self.rot_y_sbx_min.value(),
+                     self.rot_z_sbx_min.value()),
+            rot_max=(self.rot_x_sbx_max.value(), self.rot_y_sbx_max.value(),
+                     self.rot_z_sbx_max.value()),
+            scale_min=(self.size_x_sbx_min.value(), self.size_y_sbx_min.value(),
+                       self.size_z_sbx_min.value()),
+            scale_max=(self.size_x_sbx_max.value(), self.size_y_sbx_max.value(),
+                       self.size_z_sbx_max.value()),
+            percentage=self.percent_spinbox.value() * .01,
+            align=align,
+            count=self.count_spinbox.value(),
+            spacing=self.spacing_spinbox.value(),
+            scale_spacing=self.scale_spacing_checkbox.isChecked(),
+            faces=faces,
+            surface=faces and self.surface_checkbox.isChecked(),
+            seed=self._seed(),
+            prototype_weights=self._prototype_weights(),
+            prototype_radii=self._prototype_radii())
+
+    def _prototype_weights(self):
+        """A weight for every item to scatter, missing ones count as 1.
+
+        Raises ValueError for weights that are not numbers."""
+        return scatter_core.prototype_weights(
+            self.weights_le.text().replace(",", " ").split(),
+            len(ScatterToolUI.global_instance))
+
+    def _prototype_radii(self):
+        """Bounding radius of every item to scatter while collisions are on"""
+        prototypes = ScatterToolUI.global_instance
+        if not self.collision_checkbox.isChecked():
+            return ()
+        return tuple(mesh_reader.read_bound_radius(prototype)
+                     if cmds.objExists(prototype) else 0.0
+                     for prototype in prototypes)
+
+    def _blockers(self):
+        """The blocker mesh names typed in the ui"""
+        return tuple(self.blockers_le.text().replace(",", " ").split())
+
+    def _cull(self):
+        """CullSettings for the picked camera, None when culling is off.
+
+        Raises ValueError for LOD distances that are not numbers."""
+        if self.camera_cmb.currentIndex() == 0:
+            return None
+        bands = [float(band) for band in
+                 self.lod_bands_le.text().replace(",", " ").split()]
+        return mesh_reader.read_camera(
+            self.camera_cmb.currentText(),
+            frustum=self.frustum_checkbox.isChecked(),
+            padding=self.padding_spinbox.value(), bands=bands,
+            max_distance=self.distance_spinbox.value(),
+            proxy_outside=self.proxy_outside_checkbox.isChecked())
+
+    def _proxies(self):
+        """The LOD proxy names typed in the ui, nearest band first"""
+        names = self.proxies_le.text().replace(",", " ").split()
+        missing = [name for name in names if not cmds.objExists(name)]
+        if missing:
+            raise ValueError("LOD proxies do not exist: " + ", ".join(missing))
+        return names
+
+    def _refresh_cameras(self):
+        """Fills the camera box with the cameras of the scene"""
+        current = self.camera_cmb.currentText()
+        cameras = cmds.listRelatives(cmds.ls(type="camera"), parent=True) or []
+        self.camera_cmb.clear()
+        self.camera_cmb.addItems(["none"] + sorted(cameras))
+        self.camera_cmb.setCurrentIndex(max(self.camera_cmb.findText(current),
+                                            0))
+
+    def _seed(self):
+        """The seed spinbox value, None while it is set to random"""
+        if self.seed_spinbox.value() < 0:
+            return None
+        return self.seed_spinbox.value()
 
     def create_ui(self):
         """Creates the UI layout"""
@@ -283,6 +376,10 @@ class ScatterToolUI(QtWidgets.QDialog):
         layout.addWidget(self.fill_selected_two_btn)
         layout.addWidget(self.scatter_btn)
         layout_two = QtWidgets.QHBoxLayout()
+        self.export_cache_btn = QtWidgets.QPushButton("Export Point Cache")
+        self.instance_cache_btn = QtWidgets.QPushButton("Instance From Cache")
+        layout.addWidget(self.export_cache_btn)
+        layout.addWidget(self.instance_cache_btn)
         return layout
 
     def _create_selection_layouts(self):
@@ -311,6 +408,52 @@ class ScatterToolUI(QtWidgets.QDialog):
         face_label.setStyleSheet("font: bold")
         layout.addWidget(check_label, 9, 0)
         layout.addWidget(face_label, 11, 0)
+        self.instancer_checkbox = QtWidgets.QCheckBox()
+        layout.addWidget(self.instancer_checkbox, 14, 0)
+        instancer_label = QtWidgets.QLabel("Check to scatter into a single instancer instead of transforms!")
+        instancer_label.setStyleSheet("font: bold")
+        layout.addWidget(instancer_label, 13, 0)
+        self.live_checkbox = QtWidgets.QCheckBox()
+        layout.addWidget(self.live_checkbox, 16, 0)
+        live_label = QtWidgets.QLabel("Check to keep normal constraints live instead of baking them!")
+        live_label.setStyleSheet("font: bold")
+        layout.addWidget(live_label, 15, 0)
+        self.surface_checkbox = QtWidgets.QCheckBox()
+        layout.addWidget(self.surface_checkbox, 18, 0)
+        surface_label = QtWidgets.QLabel("Check to spread face scatters evenly over the surface area!")
+        surface_label.setStyleSheet("font: bold")
+        layout.addWidget(surface_label, 17, 0)
+        self.scale_spacing_checkbox = QtWidgets.QCheckBox()
+        layout.addWidget(self.scale_spacing_checkbox, 20, 0)
+        scale_spacing_label = QtWidgets.QLabel("Check to multiply the minimum spacing by each object's scale!")
+        scale_spacing_label.setStyleSheet("font: bold")
+        layout.addWidget(scale_spacing_label, 19, 0)
+        self.preview_checkbox = QtWidgets.QCheckBox()
+        layout.addWidget(self.preview_checkbox, 24, 0)
+        preview_label = QtWidgets.QLabel("Check to preview points live, Scatter! then makes the instances!")
+        preview_label.setStyleSheet("font: bold")
+        layout.addWidget(preview_label, 23, 0)
+        self.disk_cache_checkbox = QtWidgets.QCheckBox()
+        layout.addWidget(self.disk_cache_checkbox, 22, 0)
+        disk_cache_label = QtWidgets.QLabel("Check to also keep seeded results in the workspace cache folder!")
+        disk_cache_label.setStyleSheet("font: bold")
+        layout.addWidget(disk_cache_label, 21, 0)
+        self.frustum_checkbox = QtWidgets.QCheckBox()
+        self.frustum_checkbox.setChecked(True)
+        layout.addWidget(self.frustum_checkbox, 26, 0)
+        frustum_label = QtWidgets.QLabel("Check to cull objects outside the view of the cull camera!")
+        frustum_label.setStyleSheet("font: bold")
+        layout.addWidget(frustum_label, 25, 0)
+        self.proxy_outside_checkbox = QtWidgets.QCheckBox()
+        layout.addWidget(self.proxy_outside_checkbox, 28, 0)
+        proxy_outside_label = QtWidgets.QLabel("Check to give culled objects the last proxy instead of removing them!")
+        proxy_outside_label.setStyleSheet("font: bold")
+        layout.addWidget(proxy_outside_label, 27, 0)
+        self.collision_checkbox = QtWidgets.QCheckBox()
+        layout.addWidget(self.collision_checkbox, 30, 0)
+        collision_label = QtWidgets.QLabel("Check to keep objects from overlapping using their scaled bounds!")
+        collision_label.setStyleSheet("font: bold")
+        layout.addWidget(collision_label, 29, 0)
 
     def add_widgets(self, layout):
         """Simply adds spinbox widgets. Using this to clean up one function"""
@@ -356,6 +499,102 @@ class ScatterToolUI(QtWidgets.QDialog):
         layout.addWidget(percentage_label, 12, 7)
         layout.addWidget(self.percent_spinbox, 12, 5)
         layout.addWidget(QtWidgets.QLabel("%"), 12, 6)
+        self.count_spinbox = QtWidgets.QSpinBox()
+        self.count_spinbox.setButtonSymbols(QtWidgets.QAbstractSpinBox.PlusMinus)
+        self.count_spinbox.setFixedWidth(100)
+        self.count_spinbox.setMaximum(10000000)
+        self.count_spinbox.setMinimum(0)
+        self.count_spinbox.setSingleStep(100)
+        count_label = QtWidgets.QLabel("Number of Points (surface, 0 uses %)")
+        count_label.setStyleSheet("font: bold")
+        layout.addWidget(count_label, 13, 7)
+        layout.addWidget(self.count_spinbox, 13, 5)
+        self.spacing_spinbox = QtWidgets.QDoubleSpinBox()
+        self.spacing_spinbox.setButtonSymbols(QtWidgets.QAbstractSpinBox.PlusMinus)
+        self.spacing_spinbox.setFixedWidth(100)
+        self.spacing_spinbox.setMaximum(10000)
+        self.spacing_spinbox.setMinimum(0)
+        self.spacing_spinbox.setSingleStep(.5)
+        spacing_label = QtWidgets.QLabel("Minimum Spacing (0 allows overlaps)")
+        spacing_label.setStyleSheet("font: bold")
+        layout.addWidget(spacing_label, 14, 7)
+        layout.addWidget(self.spacing_spinbox, 14, 5)
+        self.density_cmb = QtWidgets.QComboBox()
+        self.density_cmb.addItems(["uniform", mesh_reader.COLOR_SET,
+                                   mesh_reader.WEIGHT_ATTR,
+                                   mesh_reader.TEXTURE])
+        self.density_le = QtWidgets.QLineEdit()
+        self.density_le.setPlaceholderText("Color set, attribute or texture name")
+        density_label = QtWidgets.QLabel("Density Map")
+        density_label.setStyleSheet("font: bold")
+        layout.addWidget(density_label, 15, 7)
+        layout.addWidget(self.density_cmb, 15, 1, 1, 3)
+        layout.addWidget(self.density_le, 15, 4, 1, 3)
+        self.seed_spinbox = QtWidgets.QSpinBox()
+        self.seed_spinbox.setButtonSymbols(QtWidgets.QAbstractSpinBox.PlusMinus)
+        self.seed_spinbox.setFixedWidth(100)
+        self.seed_spinbox.setMinimum(-1)
+        self.seed_spinbox.setMaximum(2147483647)
+        self.seed_spinbox.setValue(-1)
+        self.seed_spinbox.setSpecialValueText("random")
+        seed_label = QtWidgets.QLabel("Seed (set one to repeat and cache)")
+        seed_label.setStyleSheet("font: bold")
+        layout.addWidget(seed_label, 16, 7)
+        layout.addWidget(self.seed_spinbox, 16, 5)
+        self.create_culling(layout)
+
+    def create_culling(self, layout):
+        """Creates the camera culling and LOD options"""
+        self.camera_cmb = QtWidgets.QComboBox()
+        self.camera_cmb.addItem("none")
+        camera_label = QtWidgets.QLabel("Cull Camera (none keeps everything)")
+        camera_label.setStyleSheet("font: bold")
+        layout.addWidget(camera_label, 17, 7)
+        layout.addWidget(self.camera_cmb, 17, 1, 1, 5)
+        self.padding_spinbox = QtWidgets.QDoubleSpinBox()
+        self.padding_spinbox.setButtonSymbols(QtWidgets.QAbstractSpinBox.PlusMinus)
+        self.padding_spinbox.setFixedWidth(100)
+        self.padding_spinbox.setMaximum(10000)
+        self.padding_spinbox.setMinimum(0)
+        self.padding_spinbox.setSingleStep(.5)
+        padding_label = QtWidgets.QLabel("View Padding")
+        padding_label.setStyleSheet("font: bold")
+        layout.addWidget(padding_label, 18, 7)
+        layout.addWidget(self.padding_spinbox, 18, 5)
+        self.distance_spinbox = QtWidgets.QDoubleSpinBox()
+        self.distance_spinbox.setButtonSymbols(QtWidgets.QAbstractSpinBox.PlusMinus)
+        self.distance_spinbox.setFixedWidth(100)
+        self.distance_spinbox.setMaximum(1000000)
+        self.distance_spinbox.setMinimum(0)
+        self.distance_spinbox.setSingleStep(10)
+        distance_label = QtWidgets.QLabel("Cull Distance (0 keeps far objects)")
+        distance_label.setStyleSheet("font: bold")
+        layout.addWidget(distance_label, 19, 7)
+        layout.addWidget(self.distance_spinbox, 19, 5)
+        self.lod_bands_le = QtWidgets.QLineEdit()
+        self.lod_bands_le.setPlaceholderText("Distances where the next proxy starts, like 50, 200")
+        lod_bands_label = QtWidgets.QLabel("LOD Distances")
+        lod_bands_label.setStyleSheet("font: bold")
+        layout.addWidget(lod_bands_label, 20, 7)
+        layout.addWidget(self.lod_bands_le, 20, 1, 1, 6)
+        self.proxies_le = QtWidgets.QLineEdit()
+        self.proxies_le.setPlaceholderText("Low res proxies for each LOD distance, nearest first")
+        proxies_label = QtWidgets.QLabel("LOD Proxies")
+        proxies_label.setStyleSheet("font: bold")
+        layout.addWidget(proxies_label, 21, 7)
+        layout.addWidget(self.proxies_le, 21, 1, 1, 6)
+        self.blockers_le = QtWidgets.QLineEdit()
+        self.blockers_le.setPlaceholderText("Meshes the objects should stay clear of")
+        blockers_label = QtWidgets.QLabel("Blockers")
+        blockers_label.setStyleSheet("font: bold")
+        layout.addWidget(blockers_label, 22, 7)
+        layout.addWidget(self.blockers_le, 22, 1, 1, 6)
+        self.weights_le = QtWidgets.QLineEdit()
+        self.weights_le.setPlaceholderText("Weight of each item to scatter, like 3, 1, 1 (equal when empty)")
+        weights_label = QtWidgets.QLabel("Item Weights")
+        weights_label.setStyleSheet("font: bold")
+        layout.addWidget(weights_label, 23, 7)
+        layout.addWidget(self.weights_le, 23, 1, 1, 6)
 
     def create_spinboxes(self):
         """Creates the spinboxes"""
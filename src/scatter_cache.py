@@ -0,0 +1,83 @@
+"""Caches scatter results so unchanged inputs skip sampling."""
+import collections
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+from scatter_core import ScatterResult
+
+log = logging.getLogger(__name__)
+
+RESULT_ARRAYS = ("positions", "rotations", "scales", "normals", "indices")
+OPTIONAL_ARRAYS = ("prototype_ids",)
+# Raised whenever the same settings start giving different results
+KEY_VERSION = 2
+
+
+def cache_key(settings, arrays):
+    """Hashes the settings and the input arrays into a hex digest.
+
+    None entries are allowed so optional inputs like weights can be
+    passed as they are."""
+    digest = hashlib.sha1(repr((KEY_VERSION, settings.key())).encode(
+        "utf-8"))
+    for array in arrays:
+        if array is None:
+            digest.update(b"none")
+            continue
+        array = np.ascontiguousarray(array)
+        digest.update("{}{}".format(array.dtype, array.shape).encode("utf-8"))
+        digest.update(array.data)
+    return digest.hexdigest()
+
+
+class ScatterCache(object):
+    """In memory LRU of scatter results with an optional folder on disk"""
+
+    def __init__(self, max_entries=16, folder=None):
+        self.max_entries = max_entries
+        self.folder = folder
+        self._entries = collections.OrderedDict()
+
+    def get(self, key):
+        """Returns the cached ScatterResult for key or None"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        if not self.folder:
+            return None
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        with np.load(path) as data:
+            result = ScatterResult(*[data[name] for name in RESULT_ARRAYS])
+            for name in OPTIONAL_ARRAYS:
+                if name in data:
+                    setattr(result, name, data[name])
+        self._remember(key, result)
+        return result
+
+    def put(self, key, result):
+        self._remember(key, result)
+        if not self.folder:
+            return
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+        arrays = dict((name, getattr(result, name))
+                      for name in RESULT_ARRAYS + OPTIONAL_ARRAYS
+                      if getattr(result, name) is not None)
+        np.savez(self._path(key), **arrays)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _remember(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.folder, key + ".npz")
@@ -0,0 +1,695 @@
+"""Maya free sampling math for the scatter tool.
+
+Everything in here works on numpy arrays so it can be profiled and tested
+outside of maya."""
+import numpy as np
+
+TRANSFORM_STREAM = 0x7472616E
+CULLED_LEVEL = -1
+OUTSIDE_LEVEL = np.iinfo(np.int32).max
+
+
+class ScatterSettings(object):
+    """Random transform ranges and amount of a scatter run"""
+
+    def __init__(self, rot_min=(0.0, 0.0, 0.0), rot_max=(0.0, 0.0, 0.0),
+                 scale_min=(1.0, 1.0, 1.0), scale_max=(1.0, 1.0, 1.0),
+                 percentage=1.0, align=False, count=0, spacing=0.0,
+                 scale_spacing=False, faces=False, surface=False, seed=None,
+                 bound_radius=0.0, prototype_weights=(), prototype_radii=()):
+        self.rot_min = tuple(float(val) for val in rot_min)
+        self.rot_max = tuple(float(val) for val in rot_max)
+        self.scale_min = tuple(float(val) for val in scale_min)
+        self.scale_max = tuple(float(val) for val in scale_max)
+        self.percentage = float(percentage)
+        self.align = bool(align)
+        self.count = int(count)
+        self.spacing = float(spacing)
+        self.scale_spacing = bool(scale_spacing)
+        self.faces = bool(faces)
+        self.surface = bool(surface)
+        self.seed = None if seed is None else int(seed)
+        self.bound_radius = float(bound_radius)
+        self.prototype_weights = tuple(float(val) for val in prototype_weights)
+        self.prototype_radii = tuple(float(val) for val in prototype_radii)
+
+    def key(self):
+        """Every parameter as a sorted tuple, used for caching"""
+        return tuple(sorted(vars(self).items()))
+
+    def rng(self):
+        """Random generator for the seed, unseeded when seed is None"""
+        return np.random.default_rng(self.seed)
+
+    def transform_rng(self):
+        """Random generator for the transforms of the sampled points.
+
+        A child stream of the seed of its own, so the transforms only
+        depend on the seed and the points, not on how they were sampled."""
+        if self.seed is None:
+            return np.random.default_rng()
+        return np.random.default_rng(np.random.SeedSequence(
+            self.seed, spawn_key=(TRANSFORM_STREAM,)))
+
+
+class ScatterResult(object):
+    """Nx3 positions, rotations and scales of the scattered instances.
+
+    indices holds the candidate each instance was sampled from and
+    prototype_ids the prototype it uses, None when there is only one."""
+
+    def __init__(self, positions, rotations, scales, normals, indices,
+                 prototype_ids=None):
+        self.positions = positions
+        self.rotations = rotations
+        self.scales = scales
+        self.normals = normals
+        self.indices = indices
+        self.prototype_ids = prototype_ids
+
+    def __len__(self):
+        return len(self.positions)
+
+
+class CullSettings(object):
+    """Camera frustum and distance bands to cull and LOD instances with.
+
+    world_to_camera is the 4x4 inverse world matrix of the camera, laid
+    out for row vectors like maya matrices, fov the horizontal and
+    vertical field of view in radians and clip the near and far clip
+    distances. bands are increasing distances from eye that split the
+    kept points into LOD levels 0, 1, ... Points outside the frustum grown
+    by padding, or further than max_distance, are culled unless
+    proxy_outside puts them on OUTSIDE_LEVEL, which uses the last proxy."""
+
+    def __init__(self, eye, world_to_camera=None, fov=None, clip=None,
+                 padding=0.0, bands=(), max_distance=0.0,
+                 proxy_outside=False):
+        self.eye = np.asarray(eye, dtype=np.float64)[:3]
+        self.world_to_camera = None
+        if world_to_camera is not None:
+            self.world_to_camera = np.asarray(world_to_camera,
+                                              dtype=np.float64).reshape(4, 4)
+        self.fov = None if fov is None else tuple(float(val) for val in fov)
+        self.clip = None if clip is None else tuple(float(val)
+                                                    for val in clip)
+        self.padding = float(padding)
+        self.bands = tuple(sorted(float(val) for val in bands))
+        self.max_distance = float(max_distance)
+        self.proxy_outside = bool(proxy_outside)
+
+
+def empty_result():
+    """A ScatterResult without any instances"""
+    vectors = np.zeros((0, 3))
+    return ScatterResult(vectors, vectors.copy(), vectors.copy(),
+                         vectors.copy(), np.zeros(0, dtype=np.int64))
+
+
+def concatenate_results(results, sizes):
+    """Joins results of separately sampled candidate sets.
+
+    sizes are the candidate counts of each set, indices are offset by
+    them so they point into the sets as if they were concatenated."""
+    if not results:
+        return empty_result()
+    starts = np.cumsum(sizes) - sizes
+    prototype_ids = None
+    if any(result.prototype_ids is not None for result in results):
+        prototype_ids = np.concatenate([
+            np.zeros(len(result), dtype=np.int64)
+            if result.prototype_ids is None else result.prototype_ids
+            for result in results])
+    return ScatterResult(
+        np.concatenate([result.positions for result in results]),
+        np.concatenate([result.rotations for result in results]),
+        np.concatenate([result.scales for result in results]),
+        np.concatenate([result.normals for result in results]),
+        np.concatenate([result.indices + start
+                        for result, start in zip(results, starts)]),
+        prototype_ids)
+
+
+def retransform(result, settings, rng=None):
+    """Random rotations and scales for sampled points.
+
+    Drawn from settings.transform_rng by default, which is what scatter,
+    scatter_surface and scatter_parallel.scatter_jobs finish with, so the
+    same seed always gives the same transforms. Scales the spacing was
+    worked out with are kept, see scales_spaced."""
+    if rng is None:
+        rng = settings.transform_rng()
+    rotations, scales = random_transforms(len(result), settings, rng)
+    if result.scales is not None and scales_spaced(settings):
+        scales = result.scales
+    if settings.align:
+        rotations = align_rotations(rotations, result.normals)
+    return ScatterResult(result.positions, rotations, scales, result.normals,
+                         result.indices, result.prototype_ids)
+
+
+def take_result(result, indices):
+    """The instances of a result at the given indices or mask"""
+    return ScatterResult(*[None if array is None else array[indices]
+                           for array in (result.positions, result.rotations,
+                                         result.scales, result.normals,
+                                         result.indices,
+                                         result.prototype_ids)])
+
+
+def lod_levels(positions, cull):
+    """LOD level of every position for CullSettings cull.
+
+    Culled points get CULLED_LEVEL, or OUTSIDE_LEVEL with proxy_outside."""
+    positions = np.asarray(positions, dtype=np.float64)
+    distances = np.linalg.norm(positions - cull.eye, axis=1)
+    levels = np.searchsorted(cull.bands, distances, side="right")
+    outside = np.zeros(len(positions), dtype=bool)
+    if cull.max_distance > 0.0:
+        outside |= distances > cull.max_distance
+    if cull.world_to_camera is not None:
+        outside |= ~frustum_mask(positions, cull.world_to_camera, cull.fov,
+                                 cull.clip, cull.padding)
+    levels[outside] = OUTSIDE_LEVEL if cull.proxy_outside else CULLED_LEVEL
+    return levels
+
+
+def frustum_mask(positions, world_to_camera, fov, clip=None, padding=0.0):
+    """True for the positions inside a camera frustum grown by padding.
+
+    Maya cameras look down their negative z axis, so the depth of a point
+    is its negated camera space z."""
+    local = positions.dot(world_to_camera[:3, :3]) + world_to_camera[3, :3]
+    depth = -local[:, 2]
+    half_width = depth * np.tan(fov[0] * 0.5) + padding
+    half_height = depth * np.tan(fov[1] * 0.5) + padding
+    inside = ((np.abs(local[:, 0]) <= half_width) &
+              (np.abs(local[:, 1]) <= half_height) & (depth >= -padding))
+    if clip is not None:
+        inside &= (depth >= clip[0] - padding) & (depth <= clip[1] + padding)
+    return inside
+
+
+def sample_count(total, percentage):
+    """Number of instances to make out of total candidates"""
+    return int(round(percentage * total))
+
+
+def sample_indices(total, count, rng):
+    """Picks count unique candidate indices in one draw"""
+    return np.sort(rng.choice(total, size=count, replace=False))
+
+
+def random_transforms(count, settings, rng):
+    """Returns Nx3 random rotations and scales within the settings ranges"""
+    rotations = rng.uniform(settings.rot_min, settings.rot_max,
+                            size=(count, 3))
+    scales = rng.uniform(settings.scale_min, settings.scale_max,
+                         size=(count, 3))
+    return rotations, scales
+
+
+def random_scales(count, settings, rng):
+    """Returns Nx3 random scales within the settings range"""
+    return rng.uniform(settings.scale_min, settings.scale_max,
+                       size=(count, 3))
+
+
+def prototype_weights(weights, count):
+    """Weights of count prototypes, missing ones count as 1.
+
+    Weights past count are dropped. Empty with fewer than two prototypes,
+    see random_prototypes. Raises ValueError for weights that are not
+    finite numbers of 0 or more."""
+    if count < 2:
+        return ()
+    numbers = []
+    for weight in weights:
+        try:
+            number = float(weight)
+        except (TypeError, ValueError):
+            number = None
+        if number is None or not 0.0 <= number < np.inf:
+            raise ValueError("Invalid prototype weight {!r}, weights are "
+                             "finite numbers of 0 or more".format(weight))
+        numbers.append(number)
+    return tuple((numbers + [1.0] * count)[:count])
+
+
+def random_prototypes(count, settings, rng):
+    """Picks a prototype for count instances by the prototype weights.
+
+    Returns None with fewer than two prototypes, so single prototype
+    runs draw the same random numbers as before."""
+    if len(settings.prototype_weights) < 2:
+        return None
+    return alias_draw(alias_table(np.array(settings.prototype_weights)),
+                      count, rng)
+
+
+def scatter(positions, normals, settings, rng=None, weights=None,
+            obstacles=None):
+    """Samples the candidate positions and gives each sample a transform.
+
+    Optional per candidate weights make denser areas more likely.
+    obstacles are optional (centers, radii) spheres instances must not
+    overlap, see blocker_spheres."""
+    if rng is None:
+        rng = settings.rng()
+    positions = np.asarray(positions, dtype=np.float64)
+    normals = np.asarray(normals, dtype=np.float64)
+    count = sample_count(len(positions), settings.percentage)
+    if is_filtered(settings, obstacles):
+        indices, scales, prototype_ids = _spaced_samples(
+            positions, count, settings, rng, weights, obstacles)
+    else:
+        if weights is None:
+            indices = sample_indices(len(positions), count, rng)
+        else:
+            indices = weighted_indices(weights, count, rng)
+        scales = None
+        prototype_ids = random_prototypes(len(indices), settings, rng)
+    return retransform(ScatterResult(positions[indices], None, scales,
+                                     normals[indices], indices,
+                                     prototype_ids), settings)
+
+
+def scatter_surface(corners, corner_normals, face_ids, settings, rng=None,
+                    corner_weights=None, obstacles=None):
+    """Samples points evenly over the area of the given triangles.
+
+    corners and corner_normals are Tx3x3, face_ids maps every triangle to
+    the candidate face it came from. settings.count points are made, or
+    percentage of the faces when count is 0. Optional Tx3 corner_weights
+    scale the density of every triangle. See scatter for obstacles."""
+    if rng is None:
+        rng = settings.rng()
+    count = settings.count
+    if not count:
+        count = sample_count(len(np.unique(face_ids)), settings.percentage)
+    densities = None
+    if corner_weights is not None:
+        densities = corner_weights.mean(axis=1)
+    picks, bary = sample_triangles(corners, count, rng, densities)
+    positions = np.einsum("ij,ijk->ik", bary, corners[picks])
+    normals = normalized(np.einsum("ij,ijk->ik", bary,
+                                   corner_normals[picks]))
+    scales = None
+    prototype_ids = random_prototypes(count, settings, rng)
+    if is_filtered(settings, obstacles):
+        scales = random_scales(count, settings, rng)
+        keep = poisson_filter(positions, spacing_radii(scales, settings,
+                                                       prototype_ids),
+                              obstacles=obstacles)
+        picks = picks[keep]
+        positions, normals = positions[keep], normals[keep]
+        scales = scales[keep]
+        if prototype_ids is not None:
+            prototype_ids = prototype_ids[keep]
+    return retransform(ScatterResult(positions, None, scales, normals,
+                                     face_ids[picks], prototype_ids),
+                       settings)
+
+
+def _spaced_samples(positions, count, settings, rng, weights=None,
+                    obstacles=None):
+    """Visits the candidates in random order keeping the spaced out ones"""
+    if weights is None:
+        order = rng.permutation(len(positions))
+    else:
+        order = weighted_order(weights, rng)
+    scales = random_scales(len(order), settings, rng)
+    prototype_ids = random_prototypes(len(order), settings, rng)
+    keep = poisson_filter(positions[order],
+                          spacing_radii(scales, settings, prototype_ids),
+                          limit=count, obstacles=obstacles)
+    if prototype_ids is not None:
+        prototype_ids = prototype_ids[keep]
+    return order[keep], scales[keep], prototype_ids
+
+
+def alias_table(weights):
+    """Builds a Walker alias table with Vose's method in O(n).
+
+    Returns the probability of keeping each slot and its alias."""
+    weights = np.asarray(weights, dtype=np.float64)
+    total = weights.sum()
+    if not total > 0.0:
+        raise ValueError("Scatter weights are all zero")
+    probs = (weights * (len(weights) / total)).tolist()
+    aliases = list(range(len(weights)))
+    small = [i for i, prob in enumerate(probs) if prob < 1.0]
+    large = [i for i, prob in enumerate(probs) if prob >= 1.0]
+    while small and large:
+        less = small.pop()
+        more = large[-1]
+        aliases[less] = more
+        probs[more] -= 1.0 - probs[less]
+        if probs[more] < 1.0:
+            large.pop()
+            small.append(more)
+    for leftover in small + large:
+        probs[leftover] = 1.0
+    return np.array(probs), np.array(aliases, dtype=np.int64)
+
+
+def alias_draw(table, count, rng):
+    """Draws count indices from an alias table, O(1) each"""
+    probs, aliases = table
+    slots = rng.integers(len(probs), size=count)
+    keep = rng.random(count) < probs[slots]
+    return np.where(keep, slots, aliases[slots])
+
+
+def weighted_indices(weights, count, rng):
+    """Draws count unique indices, heavier candidates more likely.
+
+    Exact weighted sampling without replacement, taking the count highest
+    keys of weighted_order. Candidates with zero weight are never picked,
+    so fewer than count come back only when there are not enough others."""
+    weights = np.asarray(weights, dtype=np.float64)
+    if not weights.sum() > 0.0:
+        raise ValueError("Scatter weights are all zero")
+    count = min(count, np.count_nonzero(weights > 0.0))
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64)
+    keys = _weighted_keys(weights, rng)
+    if count < len(keys):
+        picked = np.argpartition(-keys, count - 1)[:count]
+    else:
+        picked = np.arange(len(keys))
+    return np.sort(picked)
+
+
+def weighted_order(weights, rng):
+    """Random visiting order where heavier candidates tend to come first"""
+    weights = np.asarray(weights, dtype=np.float64)
+    order = np.argsort(-_weighted_keys(weights, rng))
+    return order[weights[order] > 0.0]
+
+
+def _weighted_keys(weights, rng):
+    """Efraimidis-Spirakis keys, sorting by them samples by weight"""
+    with np.errstate(divide="ignore"):
+        return np.log(rng.random(len(weights))) / weights
+
+
+def is_filtered(settings, obstacles=None):
+    """Whether samples go through poisson_filter to keep them apart"""
+    return (settings.spacing > 0.0 or _bound_radius(settings) > 0.0 or
+            obstacles is not None)
+
+
+def scales_spaced(settings):
+    """Whether instance scales change the spacing.
+
+    The scales are then drawn while sampling and kept afterwards,
+    otherwise they are drawn with the rotations."""
+    return ((settings.spacing > 0.0 and settings.scale_spacing) or
+            _bound_radius(settings) > 0.0)
+
+
+def spacing_radii(scales, settings, prototype_ids=None):
+    """Half the minimum spacing of every instance, scaled if asked to.
+
+    With a bound_radius the bounding radius of the prototype scaled by
+    the largest axis of every instance is used where it is larger.
+    prototype_radii replace it with the radius of the prototype of every
+    instance."""
+    largest = np.abs(scales).max(axis=1)
+    radii = np.full(len(scales), settings.spacing * 0.5)
+    if settings.scale_spacing:
+        radii *= largest
+    if settings.prototype_radii:
+        bounds = np.array(settings.prototype_radii)
+        if prototype_ids is None:
+            bounds = bounds[:1]
+        else:
+            bounds = bounds[prototype_ids]
+        radii = np.maximum(radii, bounds * largest)
+    elif settings.bound_radius > 0.0:
+        radii = np.maximum(radii, settings.bound_radius * largest)
+    return radii
+
+
+def _bound_radius(settings):
+    """The largest bounding radius of the prototypes"""
+    return max(settings.prototype_radii or (settings.bound_radius,))
+
+
+def max_radius(settings):
+    """The largest radius spacing_radii can give for the settings"""
+    largest = max(max(abs(low), abs(high)) for low, high
+                  in zip(settings.scale_min, settings.scale_max))
+    radius = settings.spacing * 0.5
+    if settings.scale_spacing:
+        radius *= largest
+    return max(radius, _bound_radius(settings) * largest)
+
+
+def blocker_spheres(corners, radius=0.0, max_splits=64):
+    """Covers Tx3x3 triangles with spheres no bigger than radius.
+
+    Every triangle gets its bounding sphere around the centroid, large
+    triangles are first split into n * n similar ones so their spheres
+    fit in radius and keep the hash grid of poisson_filter fine. Without
+    a radius the median triangle size is used. Returns Nx3 centers and
+    their radii for the obstacles of scatter."""
+    corners = np.asarray(corners, dtype=np.float64).reshape(-1, 3, 3)
+    if not len(corners):
+        return np.zeros((0, 3)), np.zeros(0)
+    centroids = corners.mean(axis=1)
+    sizes = np.linalg.norm(corners - centroids[:, None], axis=2).max(axis=1)
+    if not radius > 0.0:
+        radius = max(float(np.median(sizes)), 1e-9)
+    splits = np.clip(np.ceil(sizes / radius), 1, max_splits).astype(np.int64)
+    centers = []
+    radii = []
+    for split in np.unique(splits).tolist():
+        picked = corners[splits == split]
+        bary = _split_centroids(split)
+        centers.append(np.einsum("ij,tjk->tik", bary, picked).reshape(-1, 3))
+        radii.append(np.repeat(sizes[splits == split] / split, len(bary)))
+    return np.concatenate(centers), np.concatenate(radii)
+
+
+def _split_centroids(split):
+    """Barycentric centroids of a triangle split into split * split ones"""
+    rows = []
+    for i in range(split):
+        for j in range(split - i):
+            rows.append((i + 1.0 / 3.0, j + 1.0 / 3.0))
+            if i + j < split - 1:
+                rows.append((i + 2.0 / 3.0, j + 2.0 / 3.0))
+    uv = np.array(rows) / split
+    return np.column_stack((1.0 - uv.sum(axis=1), uv))
+
+
+def poisson_filter(positions, radii, limit=None, obstacles=None):
+    """Greedy dart throwing over positions in the order given.
+
+    A point is kept when it is at least its radius plus the radius of
+    every kept neighbour away from them. Kept points live in a uniform
+    hash grid with cells as big as the largest spacing, so each test
+    only looks at the 27 surrounding cells. Optional (centers, radii)
+    obstacles are in the grid from the start and reject every point that
+    overlaps them. Returns the kept indices. Raises ValueError when there
+    is not one radius per position."""
+    if len(radii) != len(positions):
+        raise ValueError("Got {} radii for {} positions".format(
+            len(radii), len(positions)))
+    if not len(positions):
+        return np.zeros(0, dtype=np.int64)
+    count = len(positions)
+    if obstacles is not None and len(obstacles[0]):
+        positions = np.concatenate((positions, obstacles[0]))
+        radii = np.concatenate((radii, obstacles[1]))
+    cell_size = max(2.0 * float(radii.max()), 1e-9)
+    cells = np.floor(positions / cell_size)
+    cells -= cells.min(axis=0) - 1
+    span = int(cells.max()) + 2
+    if span ** 3 < 2 ** 63:
+        cells = cells.astype(np.int64)
+        keys = ((cells[:, 0] * span + cells[:, 1]) * span +
+                cells[:, 2]).tolist()
+    else:
+        # Far apart points or tiny spacings overflow int64 keys
+        keys = [(int(x) * span + int(y)) * span + int(z)
+                for x, y, z in cells.tolist()]
+    neighbours = [(x * span + y) * span + z for x in (-1, 0, 1)
+                  for y in (-1, 0, 1) for z in (-1, 0, 1)]
+    neighbours.sort(key=abs)
+    coords = positions.tolist()
+    radii = radii.tolist()
+    grid = {}
+    for index in range(count, len(keys)):
+        grid.setdefault(keys[index], []).append(index)
+    kept = []
+    for index in range(count):
+        key = keys[index]
+        px, py, pz = coords[index]
+        radius = radii[index]
+        clear = True
+        for offset in neighbours:
+            for other in grid.get(key + offset, ()):
+                ox, oy, oz = coords[other]
+                distance = radius + radii[other]
+                if ((px - ox) ** 2 + (py - oy) ** 2 + (pz - oz) ** 2 <
+                        distance * distance):
+                    clear = False
+                    break
+            if not clear:
+                break
+        if not clear:
+            continue
+        kept.append(index)
+        grid.setdefault(key, []).append(index)
+        if limit is not None and len(kept) >= limit:
+            break
+    return np.array(kept, dtype=np.int64)
+
+
+def sample_triangles(corners, count, rng, densities=None):
+    """Picks count triangles by area and a uniform point inside each.
+
+    Returns the triangle indices and Nx3 barycentric weights."""
+    areas = triangle_areas(corners)
+    if densities is not None:
+        areas = areas * densities
+    cumulative = np.cumsum(areas)
+    if not cumulative[-1] > 0.0:
+        raise ValueError("Scatter weights are all zero")
+    targets = rng.random(count) * cumulative[-1]
+    picks = np.searchsorted(cumulative, targets, side="right")
+    picks = np.minimum(picks, len(areas) - 1)
+    root = np.sqrt(rng.random(count))
+    second = rng.random(count)
+    weights = np.stack((1.0 - root, root * (1.0 - second), root * second),
+                       axis=1)
+    return picks, weights
+
+
+def triangle_areas(corners):
+    """Area of every triangle in a Tx3x3 corner array"""
+    edges = np.cross(corners[:, 1] - corners[:, 0],
+                     corners[:, 2] - corners[:, 0])
+    return 0.5 * np.linalg.norm(edges, axis=1)
+
+
+def triangulate(face_counts, face_vertices):
+    """Fan triangulates every face.
+
+    Returns Tx3 vertex indices and the face each triangle belongs to."""
+    offsets = face_offsets(face_counts)
+    tri_counts = face_counts - 2
+    tri_faces = np.repeat(np.arange(len(face_counts)), tri_counts)
+    firsts = np.cumsum(tri_counts) - tri_counts
+    fan = np.arange(len(tri_faces)) - np.repeat(firsts, tri_counts)
+    starts = offsets[tri_faces]
+    triangles = np.stack((face_vertices[starts],
+                          face_vertices[starts + fan + 1],
+                          face_vertices[starts + fan + 2]), axis=1)
+    return triangles, tri_faces
+
+
+def align_rotations(rotations, normals, up=(0.0, 1.0, 0.0)):
+    """Tilts the up axis of every rotation onto its normal.
+
+    The random rotation is applied in local space first, so it ends up
+    spinning the instance around the surface normal. Returns euler xyz
+    degrees."""
+    aligned = np.matmul(align_matrices(normals, up),
+                        euler_to_matrices(rotations))
+    return matrices_to_euler(aligned)
+
+
+def align_matrices(normals, up=(0.0, 1.0, 0.0)):
+    """Shortest arc rotation matrices taking up onto every normal"""
+    up = np.asarray(up, dtype=np.float64)
+    normals = normalized(np.asarray(normals, dtype=np.float64))
+    axes = np.cross(up, normals)
+    cosines = normals.dot(up)
+    skew = np.zeros((len(normals), 3, 3))
+    skew[:, 0, 1] = -axes[:, 2]
+    skew[:, 0, 2] = axes[:, 1]
+    skew[:, 1, 0] = axes[:, 2]
+    skew[:, 1, 2] = -axes[:, 0]
+    skew[:, 2, 0] = -axes[:, 1]
+    skew[:, 2, 1] = axes[:, 0]
+    opposite = cosines < -1.0 + 1e-9
+    factors = 1.0 / np.where(opposite, 1.0, 1.0 + cosines)
+    matrices = (np.eye(3) + skew +
+                np.matmul(skew, skew) * factors[:, np.newaxis, np.newaxis])
+    if opposite.any():
+        # Normals facing away from up have no unique axis, turn 180 degrees
+        axis = np.cross(up, (1.0, 0.0, 0.0))
+        if not axis.any():
+            axis = np.cross(up, (0.0, 0.0, 1.0))
+        axis /= np.linalg.norm(axis)
+        matrices[opposite] = 2.0 * np.outer(axis, axis) - np.eye(3)
+    return matrices
+
+
+def euler_to_matrices(rotations):
+    """Nx3 euler xyz degrees to Nx3x3 rotation matrices (column vectors)"""
+    radians = np.radians(rotations)
+    cos = np.cos(radians)
+    sin = np.sin(radians)
+    cx, cy, cz = cos[:, 0], cos[:, 1], cos[:, 2]
+    sx, sy, sz = sin[:, 0], sin[:, 1], sin[:, 2]
+    matrices = np.empty((len(rotations), 3, 3))
+    matrices[:, 0, 0] = cy * cz
+    matrices[:, 0, 1] = sx * sy * cz - cx * sz
+    matrices[:, 0, 2] = cx * sy * cz + sx * sz
+    matrices[:, 1, 0] = cy * sz
+    matrices[:, 1, 1] = sx * sy * sz + cx * cz
+    matrices[:, 1, 2] = cx * sy * sz - sx * cz
+    matrices[:, 2, 0] = -sy
+    matrices[:, 2, 1] = sx * cy
+    matrices[:, 2, 2] = cx * cy
+    return matrices
+
+
+def matrices_to_euler(matrices):
+    """Nx3x3 rotation matrices to Nx3 euler xyz degrees"""
+    sy = np.clip(-matrices[:, 2, 0], -1.0, 1.0)
+    y_rot = np.arcsin(sy)
+    locked = np.abs(sy) > 1.0 - 1e-9
+    x_rot = np.where(locked, 0.0,
+                     np.arctan2(matrices[:, 2, 1], matrices[:, 2, 2]))
+    z_rot = np.where(locked,
+                     np.arctan2(-matrices[:, 0, 1], matrices[:, 1, 1]),
+                     np.arctan2(matrices[:, 1, 0], matrices[:, 0, 0]))
+    return np.degrees(np.stack((x_rot, y_rot, z_rot), axis=1))
+
+
+def face_offsets(face_counts):
+    """Index of the first entry of every face in face_vertices"""
+    offsets = np.zeros(len(face_counts), dtype=np.int64)
+    np.cumsum(face_counts[:-1], out=offsets[1:])
+    return offsets
+
+
+def face_centers(points, face_counts, face_vertices):
+    """Average of the vertex positions of every face"""
+    corners = points[face_vertices]
+    sums = np.add.reduceat(corners, face_offsets(face_counts), axis=0)
+    return sums / face_counts[:, np.newaxis]
+
+
+def face_normals(points, face_counts, face_vertices):
+    """Geometric face normals using Newell's method"""
+    offsets = face_offsets(face_counts)
+    following = np.arange(1, len(face_vertices) + 1)
+    following[offsets + face_counts - 1] = offsets
+    current = points[face_vertices]
+    nxt = points[face_vertices[following]]
+    return normalized(np.add.reduceat(np.cross(current, nxt), offsets,
+                                      axis=0))
+
+
+def normalized(vectors):
+    """Unit length copies of Nx3 vectors, zero vectors are left alone"""
+    lengths = np.linalg.norm(vectors, axis=1)
+    lengths[lengths == 0.0] = 1.0
+    return vectors / lengths[:, np.newaxis]
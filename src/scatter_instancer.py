@@ -0,0 +1,234 @@
+import contextlib
+import logging
+import os
+
+import numpy as np
+import maya.api.OpenMaya as om
+import maya.cmds as cmds
+
+import profiling
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+PLUGIN_NAME = os.path.splitext(os.path.basename(__file__))[0]
+TRANSFORM_ATTRS = ("translateX", "translateY", "translateZ",
+                   "rotateX", "rotateY", "rotateZ",
+                   "scaleX", "scaleY", "scaleZ")
+TRANSFORM_FLAGS = (("-t", "-translation"), ("-ro", "-rotation"),
+                   ("-s", "-scale"))
+
+
+@contextlib.contextmanager
+def undo_chunk(name="scatter"):
+    """Groups every command issued inside into a single undo step"""
+    cmds.undoInfo(openChunk=True, chunkName=name)
+    try:
+        yield
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+
+@contextlib.contextmanager
+def suspended_refresh():
+    """Stops the viewports from redrawing until the block is done"""
+    if cmds.about(batch=True):
+        yield
+        return
+    cmds.refresh(suspend=True)
+    try:
+        yield
+    finally:
+        cmds.refresh(suspend=False)
+        cmds.refresh()
+
+
+def iter_transforms(prototype, result, components=None,
+                    batch_size=BATCH_SIZE):
+    """Makes one instanced transform per point, batch_size at a time.
+
+    Yields the number of instances made after every batch so the caller
+    can report progress or stop between batches. components optionally
+    holds a component name per point to keep a live normalConstraint to."""
+    positions = to_parent_space(prototype, result.positions)
+    for start in range(0, len(result), batch_size):
+        end = min(start + batch_size, len(result))
+        with profiling.span("scatter.instance.create"):
+            new_objs = [cmds.instance(prototype)[0]
+                        for _ in range(start, end)]
+        profiling.count("maya.commands", end - start)
+        profiling.count("maya.nodes", end - start)
+        with profiling.span("scatter.instance.write_transforms"):
+            write_transforms(new_objs, positions[start:end],
+                             result.rotations[start:end],
+                             result.scales[start:end])
+        profiling.count("maya.commands", 1)
+        if components is not None:
+            with profiling.span("scatter.instance.constraints"):
+                for new_obj, component in zip(new_objs,
+                                              components[start:end]):
+                    cmds.normalConstraint(component, new_obj,
+                                          aimVector=[0.0, 1.0, 0.0])
+            profiling.count("maya.commands", end - start)
+            profiling.count("maya.nodes", end - start)
+        yield end
+
+
+def write_transforms(nodes, positions, rotations, scales):
+    """Sets translate, rotate and scale of many transforms.
+
+    The whole batch goes to maya as one scatterWriteTransforms command,
+    which applies it through one MDGModifier and is undone and redone with
+    the chunk it runs in. Positions are in parent space, rotations are
+    euler xyz degrees."""
+    load_plugin()
+    cmds.scatterWriteTransforms(nodes, translation=positions.tolist(),
+                                rotation=rotations.tolist(),
+                                scale=scales.tolist())
+
+
+def load_plugin():
+    """Loads this module as the plugin of the scatterWriteTransforms
+    command unless maya already has it"""
+    if not cmds.pluginInfo(PLUGIN_NAME, query=True, loaded=True):
+        cmds.loadPlugin(__file__)
+
+
+class WriteTransformsCommand(om.MPxCommand):
+    """scatterWriteTransforms nodes -t x y z -ro x y z -s x y z ...
+
+    Takes one use of each flag per node and sets all their plugs through a
+    single MDGModifier, which is kept to undo and redo them."""
+    name = "scatterWriteTransforms"
+
+    def __init__(self):
+        super(WriteTransformsCommand, self).__init__()
+        self._modifier = om.MDGModifier()
+
+    @staticmethod
+    def creator():
+        return WriteTransformsCommand()
+
+    @staticmethod
+    def create_syntax():
+        syntax = om.MSyntax()
+        syntax.setObjectType(om.MSyntax.kStringObjects)
+        for short_name, long_name in TRANSFORM_FLAGS:
+            syntax.addFlag(short_name, long_name, om.MSyntax.kDouble,
+                           om.MSyntax.kDouble, om.MSyntax.kDouble)
+            syntax.makeFlagMultiUse(short_name)
+        return syntax
+
+    def isUndoable(self):
+        return True
+
+    def doIt(self, args):
+        arg_data = om.MArgDatabase(self.syntax(), args)
+        nodes = arg_data.getObjectStrings()
+        columns = []
+        for short_name, _ in TRANSFORM_FLAGS:
+            uses = arg_data.numberOfFlagUses(short_name)
+            if uses != len(nodes):
+                raise ValueError("Got {} {} values for {} nodes".format(
+                    uses, short_name, len(nodes)))
+            columns.append([
+                [arg_data.getFlagArgumentList(short_name, use).asDouble(axis)
+                 for axis in range(3)] for use in range(uses)])
+        positions, rotations, scales = (np.array(column).reshape(-1, 3)
+                                        for column in columns)
+        values = np.hstack((positions, np.radians(rotations), scales))
+        selection = om.MSelectionList()
+        for node in nodes:
+            selection.add(node)
+        fn_node = om.MFnDependencyNode()
+        for i, row in enumerate(values.tolist()):
+            fn_node.setObject(selection.getDependNode(i))
+            for attr, value in zip(TRANSFORM_ATTRS, row):
+                self._modifier.newPlugValueDouble(
+                    fn_node.findPlug(attr, False), value)
+        self._modifier.doIt()
+
+    def redoIt(self):
+        self._modifier.doIt()
+
+    def undoIt(self):
+        self._modifier.undoIt()
+
+
+def maya_useNewAPI():
+    """Tells maya the plugin uses maya.api.OpenMaya"""
+
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin).registerCommand(
+        WriteTransformsCommand.name, WriteTransformsCommand.creator,
+        WriteTransformsCommand.create_syntax)
+
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterCommand(WriteTransformsCommand.name)
+
+
+def to_parent_space(prototype, positions):
+    """Moves world positions under the parent new instances end up in"""
+    parents = cmds.listRelatives(prototype, parent=True, fullPath=True)
+    if not parents:
+        return positions
+    matrix = np.array(cmds.xform(parents[0], q=True, ws=True, matrix=True))
+    inverse = np.linalg.inv(matrix.reshape(4, 4))
+    return positions.dot(inverse[:3, :3]) + inverse[3, :3]
+
+
+def create_instancer(prototype, result, name="scatter", object_ids=None):
+    """Puts every scattered point into one particle instancer.
+
+    Positions, rotations and scales are written as per particle arrays
+    instead of making a transform for each point. prototype can also be a
+    list of objects, object_ids then picks the object of every point.
+    Returns the instancer."""
+    particle, shape = cmds.particle(p=result.positions.tolist(),
+                                    name=name + "_points")
+    profiling.count("maya.commands")
+    profiling.count("maya.nodes", 2)
+    cmds.setAttr(shape + ".isDynamic", False)
+    profiling.count("maya.commands")
+    for attr, values in (("rotationPP", result.rotations),
+                         ("scalePP", result.scales)):
+        for suffix in ("", "0"):
+            cmds.addAttr(shape, ln=attr + suffix, dt="vectorArray")
+            profiling.count("maya.commands")
+            set_vector_array(shape + "." + attr + suffix, values)
+    options = {}
+    if object_ids is not None:
+        for suffix in ("", "0"):
+            cmds.addAttr(shape, ln="objectIndexPP" + suffix, dt="doubleArray")
+            profiling.count("maya.commands")
+            set_double_array(shape + ".objectIndexPP" + suffix, object_ids)
+        options["objectIndex"] = "objectIndexPP"
+    instancer = cmds.particleInstancer(shape, addObject=True,
+                                       object=prototype,
+                                       rotation="rotationPP",
+                                       scale="scalePP",
+                                       name=name + "_instancer", **options)
+    profiling.count("maya.commands")
+    profiling.count("maya.nodes")
+    log.info("Instanced %d points with %s", len(result), instancer)
+    return instancer
+
+
+def set_vector_array(plug_name, values):
+    """Writes an Nx3 array to a vectorArray attribute in one setAttr.
+
+    Unlike setting the plug through the api this is undoable, so redoing
+    a scatter brings the per particle arrays back as well."""
+    cmds.setAttr(plug_name, len(values), *[tuple(value) for value
+                                           in values.tolist()],
+                 type="vectorArray")
+    profiling.count("maya.commands")
+
+
+def set_double_array(plug_name, values):
+    """Writes a flat array to a doubleArray attribute in one setAttr"""
+    cmds.setAttr(plug_name, [float(value) for value in values.tolist()],
+                 type="doubleArray")
+    profiling.count("maya.commands")
@@ -0,0 +1,203 @@
+"""Samples many scatter targets at once in a pool of worker processes.
+
+Every target becomes a job of numpy arrays. The arrays are copied once
+into shared memory blocks, workers map them without pickling and run
+scatter_core on them. Only the small results travel back."""
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import scatter_core
+
+log = logging.getLogger(__name__)
+
+CANDIDATE_ARRAYS = ("positions", "normals", "weights")
+SURFACE_ARRAYS = ("corners", "corner_normals", "face_ids", "corner_weights")
+OBSTACLE_ARRAYS = ("obstacle_centers", "obstacle_radii")
+
+
+def candidate_job(positions, normals, weights=None):
+    """Job sampling vertices or face centers"""
+    return {"positions": positions, "normals": normals, "weights": weights}
+
+
+def surface_job(corners, corner_normals, face_ids, corner_weights=None):
+    """Job sampling evenly over the area of triangles"""
+    return {"corners": corners, "corner_normals": corner_normals,
+            "face_ids": face_ids, "corner_weights": corner_weights}
+
+
+def scatter_jobs(jobs, settings, workers=None, min_parallel=100000,
+                 executable=None, obstacles=None):
+    """Samples every job with its own random stream and merges the results.
+
+    Result indices are offset by the job sizes in order, like the jobs had
+    been concatenated. The pool is only started for spaced or surface
+    sampling of more than one job with at least min_parallel candidates
+    in total, plain sampling takes less time than starting mayapy.
+    obstacles are the optional (centers, radii) spheres every job avoids.
+    Spaced jobs are filtered once more after merging so neighbouring jobs
+    keep apart. The transforms are drawn for the merged points, so they
+    match scatter_core.retransform of the result."""
+    if obstacles is not None:
+        jobs = [dict(job, **dict(zip(OBSTACLE_ARRAYS, obstacles)))
+                for job in jobs]
+    streams = np.random.SeedSequence(settings.seed).spawn(len(jobs))
+    counts = _split_counts(jobs, settings)
+    work = list(zip(jobs, streams, counts))
+    total = sum(_job_size(job) for job in jobs)
+    parallel = (len(jobs) > 1 and total >= min_parallel and workers != 1 and
+                is_expensive(settings, obstacles))
+    if parallel:
+        executable = executable or mayapy_executable()
+        if executable is None:
+            log.warning("No mayapy found for %s, sampling in this process",
+                        sys.executable)
+            parallel = False
+    if parallel:
+        results = _run_parallel(work, settings, workers, executable)
+    else:
+        results = [_run_job(job, settings, stream, count)
+                   for job, stream, count in work]
+    result = scatter_core.concatenate_results(
+        results, [_job_size(job) for job in jobs])
+    if len(jobs) > 1 and scatter_core.is_filtered(settings):
+        keep = scatter_core.poisson_filter(
+            result.positions, scatter_core.spacing_radii(
+                result.scales, settings, result.prototype_ids))
+        result = scatter_core.take_result(result, keep)
+    if len(jobs) > 1:
+        result = scatter_core.retransform(result, settings)
+    return result
+
+
+def is_expensive(settings, obstacles=None):
+    """Whether sampling does enough work per candidate to run in a pool"""
+    return settings.surface or scatter_core.is_filtered(settings, obstacles)
+
+
+def mayapy_executable():
+    """The python to start workers with, mayapy when running inside maya.
+
+    mayapy is bin/mayapy.exe next to maya.exe on windows, bin/mayapy next
+    to maya.bin on linux and Contents/bin/mayapy of Maya.app on macos.
+    Returns None when it cannot be found."""
+    folder, name = os.path.split(sys.executable)
+    if not name.lower().startswith("maya") or "mayapy" in name.lower():
+        return sys.executable
+    if sys.platform == "win32":
+        candidates = [os.path.join(folder, "mayapy.exe")]
+    elif sys.platform == "darwin":
+        candidates = [os.path.join(folder, os.pardir, "bin", "mayapy")]
+    else:
+        candidates = [os.path.join(folder, "mayapy")]
+    if os.environ.get("MAYA_LOCATION"):
+        candidates.append(os.path.join(
+            os.environ["MAYA_LOCATION"], "bin",
+            "mayapy.exe" if sys.platform == "win32" else "mayapy"))
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return os.path.normpath(candidate)
+    return None
+
+
+def _run_parallel(work, settings, workers, executable):
+    context = multiprocessing.get_context("spawn")
+    context.set_executable(executable)
+    blocks = []
+    try:
+        shared_work = []
+        for job, stream, count in work:
+            layout = {}
+            for name, array in job.items():
+                if array is None:
+                    layout[name] = None
+                    continue
+                array = np.ascontiguousarray(array)
+                block = shared_memory.SharedMemory(create=True,
+                                                   size=max(array.nbytes, 1))
+                blocks.append(block)
+                np.copyto(np.ndarray(array.shape, array.dtype,
+                                     buffer=block.buf), array)
+                layout[name] = (block.name, array.shape, array.dtype.str)
+            shared_work.append((layout, stream, count))
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, mp_context=context) as pool:
+            futures = [pool.submit(_run_shared_job, layout, settings, stream,
+                                   count)
+                       for layout, stream, count in shared_work]
+            return [future.result() for future in futures]
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def _run_shared_job(layout, settings, stream, count):
+    blocks = []
+    job = {}
+    try:
+        for name, entry in layout.items():
+            if entry is None:
+                job[name] = None
+                continue
+            block_name, shape, dtype = entry
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            job[name] = np.ndarray(shape, dtype, buffer=block.buf)
+        return _run_job(job, settings, stream, count)
+    finally:
+        job.clear()
+        for block in blocks:
+            block.close()
+
+
+def _run_job(job, settings, stream, count):
+    rng = np.random.default_rng(stream)
+    obstacles = None
+    if job.get("obstacle_centers") is not None:
+        obstacles = (job["obstacle_centers"], job["obstacle_radii"])
+    if not _job_size(job) or (settings.surface and settings.count and
+                              not count):
+        return scatter_core.empty_result()
+    if "corners" in job:
+        job_settings = scatter_core.ScatterSettings(**vars(settings))
+        job_settings.count = count
+        return scatter_core.scatter_surface(
+            job["corners"], job["corner_normals"], job["face_ids"],
+            job_settings, rng=rng, corner_weights=job["corner_weights"],
+            obstacles=obstacles)
+    return scatter_core.scatter(job["positions"], job["normals"], settings,
+                                rng=rng, weights=job["weights"],
+                                obstacles=obstacles)
+
+
+def _job_size(job):
+    """Number of candidates in a job, faces for surface jobs"""
+    if "corners" in job:
+        if not len(job["face_ids"]):
+            return 0
+        return int(job["face_ids"].max()) + 1
+    return len(job["positions"])
+
+
+def _split_counts(jobs, settings):
+    """Shares an explicit surface point count between jobs by area"""
+    if not settings.surface or not settings.count:
+        return [settings.count] * len(jobs)
+    areas = []
+    for job in jobs:
+        job_areas = scatter_core.triangle_areas(job["corners"])
+        if job["corner_weights"] is not None:
+            job_areas = job_areas * job["corner_weights"].mean(axis=1)
+        areas.append(job_areas.sum())
+    areas = np.array(areas)
+    if not areas.sum() > 0.0:
+        raise ValueError("Scatter weights are all zero")
+    rng = np.random.default_rng(settings.seed)
+    return rng.multinomial(settings.count, areas / areas.sum()).tolist()
@@ -0,0 +1,180 @@
+"""The scatter steps without any ui, shared by the dialog and scripts."""
+import logging
+
+import numpy as np
+
+import mesh_reader
+import profiling
+import scatter_cache
+import scatter_instancer
+import scatter_core
+import scatter_parallel
+
+log = logging.getLogger(__name__)
+
+
+def run_scatter(selection, prototype, settings, density=None,
+                instancer=False, live=False, cache=None, on_batch=None,
+                cull=None, proxies=(), blockers=()):
+    """Reads, samples and instances a scatter in one go.
+
+    selection is a mesh_reader.TargetSelection and density an optional
+    (source, name) pair. Instances keep clear of the blockers meshes. See
+    instance_result for prototype, on_batch, cull and proxies. Returns the
+    ScatterResult of the instances that were kept. Raises ValueError when
+    there is nothing to scatter."""
+    with profiling.span("scatter"):
+        with profiling.span("scatter.read_targets"):
+            targets = mesh_reader.read_targets(selection, faces=settings.faces,
+                                               density=density)
+            blocker_corners = None
+            if blockers:
+                blocker_corners = mesh_reader.read_blockers(blockers)
+        if not targets:
+            raise ValueError("Nothing to scatter to. Select a polygon or "
+                             "components")
+        with profiling.span("scatter.sample"):
+            result = sample_targets(targets, settings, cache,
+                                    blocker_corners)
+        levels = None
+        if cull is not None:
+            with profiling.span("scatter.cull"):
+                levels = scatter_core.lod_levels(result.positions, cull)
+        components = None
+        if settings.align and live:
+            components = target_components(result, targets)
+        with profiling.span("scatter.instance"):
+            instance_result(result, prototype, instancer, components,
+                            on_batch, levels, proxies)
+        if levels is not None:
+            result = scatter_core.take_result(result, levels >= 0)
+    profiling.count("scatter.instances", len(result))
+    profiling.report(log)
+    return result
+
+
+def sample_targets(targets, settings, cache=None, blockers=None):
+    """Samples the targets, reusing the cached result of a seeded run.
+
+    blockers are optional Tx3x3 triangle corners instances keep clear of."""
+    key = None
+    if cache is not None and settings.seed is not None:
+        key = scatter_cache.cache_key(settings,
+                                      cache_arrays(targets) + [blockers])
+        result = cache.get(key)
+        if result is not None:
+            log.info("Reusing cached scatter result")
+            return result
+    obstacles = None
+    if blockers is not None:
+        obstacles = scatter_core.blocker_spheres(
+            blockers, scatter_core.max_radius(settings))
+    result = scatter_parallel.scatter_jobs(target_jobs(targets, settings),
+                                           settings, obstacles=obstacles)
+    if key is not None:
+        cache.put(key, result)
+    return result
+
+
+def instance_result(result, prototype, instancer=False, components=None,
+                    on_batch=None, levels=None, proxies=()):
+    """Creates the scattered instances in the scene as one undo step.
+
+    prototype is one object or a list of them picked by the prototype_ids
+    of the result. on_batch(made, total) is called after every batch of
+    transforms, returning False from it stops before the next batch.
+    components optionally keeps a live normalConstraint per instance.
+    levels are the LOD levels from scatter_core.lod_levels, level 0 uses
+    the prototypes and the levels after it the proxies in order, the last
+    one repeating. Instances on OUTSIDE_LEVEL always use the last proxy and
+    the ones on CULLED_LEVEL are not made."""
+    if isinstance(prototype, (list, tuple)):
+        prototypes = list(prototype)
+    else:
+        prototypes = [prototype]
+    objects = prototypes + list(proxies)
+    object_ids = object_indices(result, len(prototypes), len(objects),
+                                levels)
+    keep = np.flatnonzero(object_ids >= 0)
+    if len(keep) < len(result):
+        log.info("Culled %d of %d instances", len(result) - len(keep),
+                 len(result))
+    with scatter_instancer.undo_chunk():
+        if instancer:
+            scatter_instancer.create_instancer(
+                objects, scatter_core.take_result(result, keep),
+                object_ids=object_ids[keep] if len(objects) > 1 else None)
+            return
+        made = 0
+        with scatter_instancer.suspended_refresh():
+            for object_id, name in enumerate(objects):
+                picks = np.flatnonzero(object_ids == object_id)
+                if not len(picks):
+                    continue
+                object_components = None
+                if components is not None:
+                    object_components = [components[num]
+                                         for num in picks.tolist()]
+                for object_made in scatter_instancer.iter_transforms(
+                        name, scatter_core.take_result(result, picks),
+                        object_components):
+                    if (on_batch is not None and
+                            not on_batch(made + object_made, len(keep))):
+                        log.warning("Scatter canceled after %d instances",
+                                    made + object_made)
+                        return
+                made += len(picks)
+
+
+def object_indices(result, prototype_count, object_count, levels=None):
+    """Index into prototypes + proxies of every instance, -1 when culled.
+
+    Levels past the last proxy, OUTSIDE_LEVEL among them, use the last
+    proxy. Without proxies every kept instance uses its prototype."""
+    object_ids = np.zeros(len(result), dtype=np.int64)
+    if result.prototype_ids is not None:
+        object_ids[:] = np.minimum(result.prototype_ids, prototype_count - 1)
+    if levels is None:
+        return object_ids
+    if object_count > prototype_count:
+        proxy_ids = prototype_count - 1 + np.minimum(
+            levels, object_count - prototype_count)
+        object_ids = np.where(levels > 0, proxy_ids, object_ids)
+    object_ids[levels == scatter_core.CULLED_LEVEL] = -1
+    return object_ids
+
+
+def cache_arrays(targets):
+    """Inputs that change the sampling result when they change"""
+    arrays = []
+    for target in targets:
+        mesh = target.mesh
+        arrays.extend([mesh.points, mesh.face_counts, mesh.face_vertices,
+                       target.indices, mesh.weights])
+    return arrays
+
+
+def target_jobs(targets, settings):
+    """Turns every target into a sampling job of plain arrays"""
+    jobs = []
+    for target in targets:
+        if settings.surface:
+            corners, normals, weights, face_ids = target.triangles()
+            jobs.append(scatter_parallel.surface_job(corners, normals,
+                                                     face_ids, weights))
+        else:
+            jobs.append(scatter_parallel.candidate_job(
+                target.positions, target.normals, target.weights))
+    return jobs
+
+
+def target_components(result, targets):
+    """Component name of the candidate every instance came from"""
+    sizes = [len(target) for target in targets]
+    ends = np.cumsum(sizes)
+    components = []
+    for num in result.indices.tolist():
+        target_num = int(np.searchsorted(ends, num, side="right"))
+        start = ends[target_num] - sizes[target_num]
+        components.append(targets[target_num].component_name(num - start))
+    return components
@@ -0,0 +1,132 @@
+import contextlib
+import logging
+
+import maya.cmds as cmds
+
+import mesh_reader
+import scatter_core
+import scatter_pipeline
+
+log = logging.getLogger(__name__)
+
+SAMPLING_KEYS = ("percentage", "count", "spacing", "scale_spacing", "faces",
+                 "surface", "seed", "bound_radius", "prototype_weights",
+                 "prototype_radii")
+TRANSFORM_KEYS = ("rot_min", "rot_max", "scale_min", "scale_max", "align")
+
+
+class ScatterPreview(object):
+    """Shows sampled points as one particle shape before instancing.
+
+    The sampling result is kept between updates, so changing a rotation
+    or scale range only redraws the random transforms while changing the
+    amount or seed resamples. Nothing here goes into the undo queue."""
+
+    def __init__(self, name="scatter_preview"):
+        self.name = name
+        self.node = None
+        self.result = None
+        self.settings = None
+        self._selection = None
+        self._density = None
+        self._blockers = None
+        self._targets = {}
+
+    def set_source(self, selection, density=None, blockers=()):
+        """Sets the TargetSelection, density map and blockers to preview"""
+        self._selection = selection
+        self._density = density
+        self._blockers = None
+        if blockers:
+            self._blockers = mesh_reader.read_blockers(blockers)
+        self._targets = {}
+        self.result = None
+
+    def update(self, settings):
+        """Brings the preview up to date with settings, redoing only what
+        the changed settings affect"""
+        if self._selection is None:
+            return
+        if self._needs_resample(settings):
+            targets = self.targets(settings.faces)
+            if not targets:
+                self.clear()
+                return
+            self.result = scatter_pipeline.sample_targets(
+                targets, settings, blockers=self._blockers)
+            self._draw()
+        elif self._changed(settings, TRANSFORM_KEYS):
+            self.result = scatter_core.retransform(self.result, settings)
+        self.settings = settings
+
+    def targets(self, faces):
+        """The targets of the source, read once per vertex or face mode"""
+        if faces not in self._targets:
+            self._targets[faces] = mesh_reader.read_targets(
+                self._selection, faces=faces, density=self._density)
+        return self._targets[faces]
+
+    def commit(self, prototype, instancer=False, live=False, on_batch=None,
+               cull=None, proxies=()):
+        """Turns the previewed points into real instances"""
+        components = None
+        if self.settings.align and live:
+            components = scatter_pipeline.target_components(
+                self.result, self.targets(self.settings.faces))
+        result = self.result
+        levels = None
+        if cull is not None:
+            levels = scatter_core.lod_levels(result.positions, cull)
+        self.clear()
+        scatter_pipeline.instance_result(result, prototype, instancer,
+                                         components, on_batch, levels,
+                                         proxies)
+        if levels is not None:
+            result = scatter_core.take_result(result, levels >= 0)
+        return result
+
+    def clear(self):
+        """Removes the preview display and forgets the sampling"""
+        self._delete_node()
+        self.result = None
+        self.settings = None
+
+    def _needs_resample(self, settings):
+        if self.result is None or self._changed(settings, SAMPLING_KEYS):
+            return True
+        # Spacing scaled by instance scale depends on the scale ranges
+        return (scatter_core.scales_spaced(settings) and
+                self._changed(settings, ("scale_min", "scale_max")))
+
+    def _changed(self, settings, keys):
+        if self.settings is None:
+            return True
+        return any(getattr(settings, key) != getattr(self.settings, key)
+                   for key in keys)
+
+    def _draw(self):
+        with _without_undo():
+            self._delete_node()
+            if not len(self.result):
+                return
+            self.node, shape = cmds.particle(
+                p=self.result.positions.tolist(), name=self.name)
+            cmds.setAttr(shape + ".isDynamic", False)
+            cmds.setAttr(shape + ".particleRenderType", 3)
+        log.info("Previewing %d points", len(self.result))
+
+    def _delete_node(self):
+        if self.node and cmds.objExists(self.node):
+            with _without_undo():
+                cmds.delete(self.node)
+        self.node = None
+
+
+@contextlib.contextmanager
+def _without_undo():
+    state = cmds.undoInfo(query=True, stateWithoutFlush=True)
+    cmds.undoInfo(stateWithoutFlush=False)
+    try:
+        yield
+    finally:
+        cmds.undoInfo(stateWithoutFlush=state)
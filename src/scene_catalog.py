@@ -0,0 +1,260 @@
+"""A searchable catalog of every scene file under a scenes folder.
+
+The folder tree is listed by a pool of threads and every file named
+{descriptor}_{task}_v{ver}{ext} is stored as a row in a local SQLite
+file. Rescans only list the folders whose modification time changed,
+the others are taken from the catalog as they are.
+
+    catalog = SceneCatalog(scenes_folder)
+    catalog.scan()
+    for entry in catalog.latest(descriptor="forest"):
+        print(entry.path)
+"""
+import collections
+import concurrent.futures
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+
+import profiling
+import version_index
+
+log = logging.getLogger(__name__)
+
+SCENE_EXTENSIONS = (".ma", ".mb")
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime INTEGER
+);
+CREATE INDEX IF NOT EXISTS folders_parent ON folders (parent);
+CREATE TABLE IF NOT EXISTS scenes (
+    folder TEXT,
+    name TEXT,
+    descriptor TEXT,
+    task TEXT,
+    version INTEGER,
+    ext TEXT,
+    size INTEGER,
+    mtime REAL,
+    PRIMARY KEY (folder, name)
+);
+CREATE INDEX IF NOT EXISTS scenes_name ON scenes (descriptor, task, version);
+"""
+
+
+class SceneEntry(collections.namedtuple(
+        "SceneEntry", "folder name descriptor task version ext size mtime")):
+    """One scene file of the catalog"""
+
+    @property
+    def path(self):
+        return os.path.join(self.folder, self.name)
+
+
+class SceneCatalog(object):
+    """SQLite backed catalog of the scene files below root"""
+
+    def __init__(self, root, db_path=None, workers=8,
+                 extensions=SCENE_EXTENSIONS):
+        self.root = os.path.abspath(os.fspath(root))
+        self.db_path = db_path or default_db_path(self.root)
+        self.workers = workers
+        self.extensions = tuple(extensions)
+        self._lock = threading.Lock()
+        folder = os.path.dirname(self.db_path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def scan(self):
+        """Brings the catalog up to date with the folders on disk.
+
+        Returns the number of folders that had to be listed again."""
+        with profiling.span("catalog.scan"), self._lock:
+            listed = self._scan()
+        profiling.report(log)
+        return listed
+
+    def _scan(self):
+        known = dict(self._db.execute("SELECT path, mtime FROM folders"))
+        children = collections.defaultdict(list)
+        for path, parent in self._db.execute(
+                "SELECT path, parent FROM folders"):
+            children[parent].append(path)
+        visited = set()
+        listed = 0
+        frontier = [(self.root, None)]
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as pool:
+            while frontier:
+                futures = [pool.submit(_list_folder, path, known.get(path),
+                                       self.extensions)
+                           for path, _ in frontier]
+                next_frontier = []
+                for (path, parent), future in zip(frontier, futures):
+                    mtime, files, subfolders = future.result()
+                    if mtime is None:
+                        continue
+                    visited.add(path)
+                    if files is None:
+                        subfolders = children.get(path, [])
+                    else:
+                        listed += 1
+                        self._store_folder(path, parent, mtime, files)
+                    next_frontier.extend((subfolder, path)
+                                         for subfolder in subfolders)
+                frontier = next_frontier
+        gone = [(path,) for path in known if path not in visited]
+        self._db.executemany("DELETE FROM folders WHERE path = ?", gone)
+        self._db.executemany("DELETE FROM scenes WHERE folder = ?", gone)
+        self._db.commit()
+        profiling.count("catalog.folders_listed", listed)
+        log.info("Scanned %d folders, listed %d", len(visited), listed)
+        return listed
+
+    def _store_folder(self, path, parent, mtime, files):
+        rows = []
+        for name, size, file_mtime in files:
+            (descriptor, task, ext), ver = version_index.parse_filename(name)
+            rows.append((path, name, descriptor, task, ver, ext, size,
+                         file_mtime))
+        self._db.execute("DELETE FROM scenes WHERE folder = ?", (path,))
+        self._db.executemany(
+            "INSERT INTO scenes VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self._db.execute("INSERT OR REPLACE INTO folders VALUES (?, ?, ?)",
+                         (path, parent, mtime))
+
+    def record(self, path):
+        """Adds or updates a scene we saved ourselves without a rescan"""
+        path = os.path.abspath(os.fspath(path))
+        folder, name = os.path.split(path)
+        parsed = version_index.parse_filename(name)
+        if parsed is None or not os.path.isfile(path):
+            return
+        (descriptor, task, ext), ver = parsed
+        stat = os.stat(path)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO scenes "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (folder, name, descriptor, task, ver, ext, stat.st_size,
+                 stat.st_mtime))
+            self._db.commit()
+
+    def find(self, descriptor=None, task=None, ext=None, folder=None):
+        """Every scene matching the given fields, oldest version first"""
+        where, args = _where(descriptor=descriptor, task=task, ext=ext,
+                             folder=folder)
+        return self._entries(
+            "SELECT folder, name, descriptor, task, version, ext, size, mtime "
+            "FROM scenes" + where +
+            " ORDER BY folder, descriptor, task, ext, version", args)
+
+    def versions(self, descriptor, task=None):
+        """Every task and version of a descriptor"""
+        return self.find(descriptor=descriptor, task=task)
+
+    def latest(self, descriptor=None, task=None, folder=None):
+        """The highest version of every scene name, per folder and ext"""
+        where, args = _where(descriptor=descriptor, task=task, folder=folder)
+        return self._entries(
+            "SELECT folder, name, descriptor, task, MAX(version), ext, size, "
+            "mtime "
+            "FROM scenes" + where +
+            " GROUP BY folder, descriptor, task, ext"
+            " ORDER BY folder, descriptor, task, ext", args)
+
+    def latest_version(self, folder, descriptor, task, ext):
+        """The highest cataloged version of one scene name, 0 without any"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MAX(version) FROM scenes WHERE folder = ? AND "
+                "descriptor = ? AND task = ? AND ext = ?",
+                (os.path.abspath(os.fspath(folder)), descriptor, task,
+                 ext)).fetchone()
+        return row[0] or 0
+
+    def descriptors(self):
+        return self._column("SELECT DISTINCT descriptor FROM scenes "
+                            "ORDER BY descriptor")
+
+    def tasks(self, descriptor=None):
+        where, args = _where(descriptor=descriptor)
+        return self._column("SELECT DISTINCT task FROM scenes" + where +
+                            " ORDER BY task", args)
+
+    def names(self):
+        """Every (descriptor, task) pair, sorted"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT DISTINCT descriptor, task FROM scenes "
+                "ORDER BY descriptor, task").fetchall()
+
+    def _entries(self, query, args=()):
+        with self._lock:
+            return [SceneEntry(*row)
+                    for row in self._db.execute(query, args)]
+
+    def _column(self, query, args=()):
+        with self._lock:
+            return [row[0] for row in self._db.execute(query, args)]
+
+
+def default_db_path(root):
+    """A catalog file per scenes root in the home folder.
+
+    Scene folders are often on network shares where SQLite locking is
+    unreliable, so the catalog is kept locally."""
+    digest = hashlib.sha1(root.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(os.path.expanduser("~"), ".sfa_scene_catalog",
+                        digest + ".sqlite")
+
+
+def _list_folder(path, known_mtime, extensions):
+    """Returns the mtime, scene files and subfolders of a folder.
+
+    Only files following the naming convention with one of the
+    extensions are returned, and only those are stat'ed. Files and
+    subfolders are None when the folder did not change, the mtime is
+    None when it is gone."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None, None, None
+    if mtime == known_mtime:
+        return mtime, None, None
+    files = []
+    subfolders = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subfolders.append(entry.path)
+                    continue
+                parsed = version_index.parse_filename(entry.name)
+                if (parsed is not None and parsed[0][2] in extensions and
+                        entry.is_file()):
+                    stat = entry.stat()
+                    files.append((entry.name, stat.st_size, stat.st_mtime))
+    except OSError as err:
+        log.warning("Unable to list %s: %s", path, err)
+        return None, None, None
+    return mtime, files, subfolders
+
+
+def _where(**fields):
+    names = [name for name, value in sorted(fields.items())
+             if value is not None]
+    if not names:
+        return "", ()
+    if "folder" in fields and fields["folder"] is not None:
+        fields["folder"] = os.path.abspath(os.fspath(fields["folder"]))
+    return (" WHERE " + " AND ".join(name + " = ?" for name in names),
+            tuple(fields[name] for name in names))
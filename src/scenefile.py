@@ -1,27 +1,55 @@
-import logging
+"""Versioned scene file names and saving.
 
-import pymel.core as pmc
+Naming, parsing and finding the next version only use the standard
+library, so this imports instantly outside of maya. maya and pymel are
+imported by the methods that need them."""
+import logging
+import os
+import pathlib
 
-from pymel.core.system import Path
+import profiling
+import version_index
 
 log = logging.getLogger(__name__)
 
 
 class SceneFile(object):
+    """A scene named {descriptor}_{task}_v{ver}{ext} in folder_path.
+
+    Without a path it is main_model_v001.ma, the name Smart Save offers
+    for a new scene."""
+
     def __init__(self, path=None):
-        self.folder_path = Path()
+        self._folder_path = pathlib.Path()
         self.descriptor = 'main'
-        self.task = None
+        self.task = 'model'
         self.ver = 1
         self.ext = '.ma'
-        scene = pmc.system.sceneName()
-        if not path and scene:
-            path = scene
-        if not path and not scene:
-            log.warning("Unable to initialize SceneFile object from a new"
-                        "scene. Please specify a path")
-            return
-        self._init_from_path(path)
+        self.store = None
+        if path:
+            self._init_from_path(path)
+
+    @classmethod
+    def from_current_scene(cls):
+        """The open scene, or the defaults in the workspace scenes folder"""
+        import maya.cmds as cmds
+
+        scene = cmds.file(query=True, sceneName=True)
+        if scene:
+            return cls(scene)
+        log.info("Initialize with default properties")
+        scene_file = cls()
+        scene_file.folder_path = os.path.join(
+            cmds.workspace(query=True, rootDirectory=True), "scenes")
+        return scene_file
+
+    @property
+    def folder_path(self):
+        return self._folder_path
+
+    @folder_path.setter
+    def folder_path(self, val):
+        self._folder_path = pathlib.Path(val)
 
     @property
     def filename(self):
@@ -36,38 +64,43 @@ class SceneFile(object):
         return self.folder_path / self.filename
 
     def _init_from_path(self, path):
-        path = Path(path)
+        path = pathlib.Path(path)
         self.folder_path = path.parent
-        self.ext = path.ext
-        self.descriptor, self.task, ver = path.name.stripext().split("_")
+        self.ext = path.suffix
+        self.descriptor, self.task, ver = path.stem.split("_")
         self.ver = int(ver.split("v")[-1])
 
     def save(self):
-        try:
-            return pmc.system.saveAs(self.path)
-        except RuntimeError as err:
+        with profiling.span("save"):
+            mtime_before = version_index.folder_mtime(self.folder_path)
+            result = self._save()
+            version_index.record_save(self.path, mtime_before)
+            if self.store is not None:
+                self.store.add(self.path)
+        profiling.report(log)
+        return result
+
+    def _save(self):
+        import pymel.core as pmc
+
+        if not self.folder_path.is_dir():
             log.warning("Missing directories in path. Creating directories...")
-            self.folder_path.makedirs_p()
-            return pmc.system.saveAs(self.path)
+            with profiling.span("save.makedirs"):
+                self.folder_path.mkdir(parents=True, exist_ok=True)
+        with profiling.span("save.saveAs"):
+            return pmc.system.saveAs(str(self.path))
 
     def next_avail_ver(self):
-        pattern = "{descriptor}_{task}_v*{ext}".format(
-            descriptor=self.descriptor,
-            task=self.task,
-            ext=self.ext)
-        matching_scene_files = []
-        for file_ in self.folder_path.files():
-            if file_.name.fnmatch(pattern):
-                matching_scene_files.append(file_)
-        if not matching_scene_files:
-            return 1;
-
-        matching_scene_files.sort(reverse=True)
-        latest_scene_file = matching_scene_files[0]
-        latest_scene_file = latest_scene_file.name.stripext()
-        latest_ver_num = int(latest_scene_file.split("_v")[-1])
+        with profiling.span("save.next_avail_ver"):
+            return self._next_avail_ver()
+
+    def _next_avail_ver(self):
+        latest_ver_num = version_index.latest_version(
+            self.folder_path, self.descriptor, self.task, self.ext)
         return latest_ver_num + 1
 
     def increment_save(self):
-        self.ver = self.next_avail_ver()
-        self.save()
\ No newline at end of file
+        with profiling.span("save.increment_save"):
+            self.ver = self.next_avail_ver()
+            self.save()
+        profiling.report(log)
@@ -1,12 +1,17 @@
+import collections
+import concurrent.futures
 import logging
+import os
 
 from PySide2 import QtWidgets, QtCore
 from shiboken2 import wrapInstance
 import maya.OpenMayaUI as omui
 import maya.cmds as cmds
-import pymel.core as pmc
 
-from pymel.core.system import Path
+import chunk_store
+import post_save
+import scene_catalog
+import scenefile
 
 log = logging.getLogger(__name__)
 
@@ -14,7 +19,17 @@ log = logging.getLogger(__name__)
 def maya_main_window():
     """Return the maya main window widget"""
     main_window = omui.MQtUtil.mainWindow()
-    return wrapInstance(long(main_window), QtWidgets.QWidget)
+    return wrapInstance(int(main_window), QtWidgets.QWidget)
+
+
+class PostSaveSignals(QtCore.QObject):
+    """Brings post save results from the worker threads to the ui"""
+    finished = QtCore.Signal(object)
+
+
+class CatalogSignals(QtCore.QObject):
+    """Brings the scene names of background catalog scans to the ui"""
+    scanned = QtCore.Signal(object)
 
 
 class SmartSaveUI(QtWidgets.QDialog):
@@ -27,9 +42,26 @@ class SmartSaveUI(QtWidgets.QDialog):
         self.setMaximumHeight(200)
         self.setWindowFlags(self.windowFlags() ^
                             QtCore.Qt.WindowContextHelpButtonHint)
-        self.scenefile = SceneFile()
+        self.scenefile = scenefile.SceneFile.from_current_scene()
         self.create_ui()
         self.create_connections()
+        self.scene_names = {}
+        self.catalog = scene_catalog.SceneCatalog(self.folder_le.text())
+        self.catalog_signals = CatalogSignals(self)
+        self.catalog_signals.scanned.connect(self._update_completers)
+        self._catalog_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="scene_catalog")
+        self._submit_catalog(self.catalog.scan)
+        self.post_save_signals = PostSaveSignals(self)
+        self.post_save_signals.finished.connect(self._post_save_finished)
+        self.post_save_queue = post_save.PostSaveQueue(
+            archive_folder=os.environ.get("SFA_ARCHIVE_DIR"),
+            store=chunk_store.default_store())
+
+    def closeEvent(self, event):
+        self.post_save_queue.shutdown(wait=False)
+        self._catalog_pool.shutdown(wait=False)
+        super(SmartSaveUI, self).closeEvent(event)
 
     def create_ui(self):
         self.title_lbl = QtWidgets.QLabel("Smart Save")
@@ -41,6 +73,8 @@ class SmartSaveUI(QtWidgets.QDialog):
         self.main_lay.addWidget(self.title_lbl)
         self.main_lay.addLayout(self.folder_lay)
         self.main_lay.addLayout(self.filename_lay)
+        self.status_lbl = QtWidgets.QLabel()
+        self.main_lay.addWidget(self.status_lbl)
         self.main_lay.addStretch()
         self.main_lay.addLayout(self.button_lay)
         self.setLayout(self.main_lay)
@@ -50,12 +84,51 @@ class SmartSaveUI(QtWidgets.QDialog):
         self.folder_browse_btn.clicked.connect(self._browse_folder)
         self.save_btn.clicked.connect(self._save)
         self.save_increment_btn.clicked.connect(self._save_increment)
+        self.descriptor_le.editingFinished.connect(self._update_task_completer)
+
+    def _submit_catalog(self, step, *args):
+        """Runs a catalog update in a worker thread.
+
+        A scan of a big network folder takes a while, so the ui only gets
+        the scene names once it is done. Updates run one at a time."""
+        self._catalog_pool.submit(self._run_catalog, step, *args)
+
+    def _run_catalog(self, step, *args):
+        try:
+            step(*args)
+            scene_names = collections.defaultdict(list)
+            for descriptor, task in self.catalog.names():
+                scene_names[descriptor].append(task)
+        except Exception as err:
+            log.warning("Scene catalog update failed: %s", err)
+            return
+        self.catalog_signals.scanned.emit(dict(scene_names))
+
+    @QtCore.Slot(object)
+    def _update_completers(self, scene_names):
+        """Completes the descriptors and tasks found by the catalog"""
+        self.scene_names = scene_names
+        self.descriptor_le.setCompleter(
+            QtWidgets.QCompleter(sorted(scene_names), self))
+        self._update_task_completer()
+
+    @QtCore.Slot()
+    def _update_task_completer(self):
+        """Completes the tasks already saved for the typed descriptor"""
+        descriptor = self.descriptor_le.text()
+        if descriptor:
+            tasks = self.scene_names.get(descriptor, [])
+        else:
+            tasks = sorted(set(task for tasks in self.scene_names.values()
+                               for task in tasks))
+        self.task_le.setCompleter(QtWidgets.QCompleter(tasks, self))
 
     @QtCore.Slot()
     def _save_increment(self):
         """Save an increment of the scene"""
         self._set_scenefile_properties_from_ui()
         self.scenefile.increment_save()
+        self._after_save()
         self.ver_sbx.setValue(self.scenefile.ver)
 
     @QtCore.Slot()
@@ -63,6 +136,31 @@ class SmartSaveUI(QtWidgets.QDialog):
         """Save the scene"""
         self._set_scenefile_properties_from_ui()
         self.scenefile.save()
+        self._after_save()
+
+    def _after_save(self):
+        """Hands the saved scene to the post save queue"""
+        path = self.scenefile.path
+        self._submit_catalog(self.catalog.record, path)
+        self.status_lbl.setText("Saved {}, post save running...".format(
+            os.path.basename(path)))
+        self.post_save_queue.submit(
+            path, metadata={"descriptor": self.scenefile.descriptor,
+                            "task": self.scenefile.task,
+                            "version": self.scenefile.ver},
+            callback=self.post_save_signals.finished.emit)
+
+    @QtCore.Slot(object)
+    def _post_save_finished(self, result):
+        name = os.path.basename(result.path)
+        if result.ok:
+            self.status_lbl.setText("Post save of {} done in {:.1f}s".format(
+                name, result.seconds))
+        else:
+            self.status_lbl.setText("Post save of {} failed: {}".format(
+                name, result.error))
+            log.warning("Post save of %s failed after %d attempts: %s",
+                        result.path, result.attempts, result.error)
 
     def _set_scenefile_properties_from_ui(self):
         self.scenefile.folder_path = self.folder_le.text()
@@ -96,7 +194,8 @@ class SmartSaveUI(QtWidgets.QDialog):
         self.task_le.setFixedWidth(50)
         self.ver_sbx = QtWidgets.QSpinBox()
         self.ver_sbx.setButtonSymbols(QtWidgets.QAbstractSpinBox.PlusMinus)
-        self.ver_sbx.setFixedWidth(50)
+        self.ver_sbx.setFixedWidth(60)
+        self.ver_sbx.setMaximum(99999)
         self.ver_sbx.setValue(self.scenefile.ver)
         self.ext_lbl = QtWidgets.QLabel(".ma")
         layout.addWidget(self.descriptor_le, 1, 0)
@@ -121,8 +220,8 @@ class SmartSaveUI(QtWidgets.QDialog):
         return layout
 
     def _create_folder_ui(self):
-        default_folder = Path(cmds.workspace(rootDirectory=True, query=True))
-        default_folder = default_folder / "scenes"
+        default_folder = os.path.join(
+            cmds.workspace(rootDirectory=True, query=True), "scenes")
         self.folder_le = QtWidgets.QLineEdit(default_folder)
         self.folder_browse_btn = QtWidgets.QPushButton("...")
         layout = QtWidgets.QHBoxLayout()
@@ -130,76 +229,3 @@ class SmartSaveUI(QtWidgets.QDialog):
         layout.addWidget(self.folder_browse_btn)
         return layout
 
-
-class SceneFile(object):
-    def __init__(self, path=None):
-        self._folder_path = Path(cmds.workspace(query=True,
-                                               rootDirectory=True)) / "scenes"
-        self.descriptor = 'main'
-        self.task = 'model'
-        self.ver = 1
-        self.ext = '.ma'
-        scene = pmc.system.sceneName()
-        if not path and scene:
-            path = scene
-        if not path and not scene:
-            log.info("Initialize with default properties")
-            return
-        self._init_from_path(path)
-
-    @property
-    def folder_path(self):
-        return self._folder_path
-
-    @folder_path.setter
-    def folder_path(self, val):
-        self._folder_path = Path(val)
-
-    @property
-    def filename(self):
-        pattern = "{descriptor}_{task}_v{ver:03d}{ext}"
-        return pattern.format(descriptor=self.descriptor,
-                              task=self.task,
-                              ver=self.ver,
-                              ext=self.ext)
-
-    @property
-    def path(self):
-        return self.folder_path / self.filename
-
-    def _init_from_path(self, path):
-        path = Path(path)
-        self.folder_path = path.parent
-        self.ext = path.ext
-        self.descriptor, self.task, ver = path.name.stripext().split("_")
-        self.ver = int(ver.split("v")[-1])
-
-    def save(self):
-        try:
-            return pmc.system.saveAs(self.path)
-        except RuntimeError as err:
-            log.warning("Missing directories in path. Creating directories...")
-            self.folder_path.makedirs_p()
-            return pmc.system.saveAs(self.path)
-
-    def next_avail_ver(self):
-        pattern = "{descriptor}_{task}_v*{ext}".format(
-            descriptor=self.descriptor,
-            task=self.task,
-            ext=self.ext)
-        matching_scene_files = []
-        for file_ in self.folder_path.files():
-            if file_.name.fnmatch(pattern):
-                matching_scene_files.append(file_)
-        if not matching_scene_files:
-            return 1;
-
-        matching_scene_files.sort(reverse=True)
-        latest_scene_file = matching_scene_files[0]
-        latest_scene_file = latest_scene_file.name.stripext()
-        latest_ver_num = int(latest_scene_file.split("_v")[-1])
-        return latest_ver_num + 1
-
-    def increment_save(self):
-        self.ver = self.next_avail_ver()
-        self.save()
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""Remembers the latest version of every scene name in a folder.
+
+Scene files are named {descriptor}_{task}_v{ver}{ext}. Each folder is
+listed once with os.scandir into a map from (descriptor, task, ext) to
+the highest version number. The map is listed again only when the
+modification time of the folder changes, and our own saves update it
+directly, so looking up the next version does not touch the disk.
+An own save only counts as the latest listing when nobody else changed
+the folder since, otherwise the next lookup lists it again."""
+import os
+import threading
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+class VersionIndex(object):
+    """Highest version of every (descriptor, task, ext) in one folder"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.mtime = None
+        self.versions = {}
+
+    def refresh(self):
+        """Lists the folder again when it changed since the last listing"""
+        mtime = folder_mtime(self.folder)
+        if mtime == self.mtime:
+            return
+        versions = {}
+        if mtime is not None:
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    parsed = parse_filename(entry.name)
+                    if parsed is None or not entry.is_file():
+                        continue
+                    key, ver = parsed
+                    if ver > versions.get(key, 0):
+                        versions[key] = ver
+        self.versions = versions
+        self.mtime = mtime
+
+    def latest(self, descriptor, task, ext):
+        """The highest saved version, 0 when there is none"""
+        return self.versions.get((descriptor, task, ext), 0)
+
+    def record(self, descriptor, task, ver, ext, mtime_before=None):
+        """Adds a version we saved ourselves without listing the folder.
+
+        mtime_before is the folder mtime right before the save. Unless it
+        is the one of the last listing, files others saved since then are
+        missing, so the index stays stale and the next refresh lists."""
+        key = (descriptor, task, ext)
+        self.versions[key] = max(self.versions.get(key, 0), ver)
+        self.record_change(mtime_before)
+
+    def record_change(self, mtime_before=None):
+        """Takes a change of our own that added no scene as listed.
+
+        Only when mtime_before, the folder mtime right before the change,
+        is the one of the last listing, see record."""
+        if mtime_before is not None and mtime_before == self.mtime:
+            self.mtime = folder_mtime(self.folder)
+
+
+def parse_filename(name):
+    """Returns ((descriptor, task, ext), ver) for a scene file name.
+
+    Returns None when the name does not follow the naming convention."""
+    stem, ext = os.path.splitext(name)
+    base, _, ver = stem.rpartition("_v")
+    descriptor, _, task = base.partition("_")
+    if not descriptor or not task or not ver.isdigit():
+        return None
+    return (descriptor, task, ext), int(ver)
+
+
+def latest_version(folder, descriptor, task, ext):
+    """The highest version of a scene name in folder, 0 when there is none"""
+    with _lock:
+        index = _folder_index(folder)
+        index.refresh()
+        return index.latest(descriptor, task, ext)
+
+
+def record_save(path, mtime_before=None):
+    """Updates the index of the folder of path after saving to it.
+
+    mtime_before is the folder_mtime of the folder taken right before the
+    save, without it the folder is listed again on the next lookup.
+    Folders that were never looked up are left for the first lookup to
+    list."""
+    folder, name = os.path.split(os.fspath(path))
+    parsed = parse_filename(name)
+    if parsed is None:
+        return
+    (descriptor, task, ext), ver = parsed
+    with _lock:
+        index = _indexes.get(_folder_key(folder))
+        if index is not None and index.mtime is not None:
+            index.record(descriptor, task, ver, ext, mtime_before)
+
+
+def record_change(folder, mtime_before):
+    """Updates the index of folder after writing a file that is no scene.
+
+    Keeps files like sidecars from making the next lookup list the folder
+    again. mtime_before is the folder_mtime right before the write."""
+    with _lock:
+        index = _indexes.get(_folder_key(folder))
+        if index is not None:
+            index.record_change(mtime_before)
+
+
+def clear():
+    """Forgets every folder, the next lookups list them again"""
+    with _lock:
+        _indexes.clear()
+
+
+def _folder_key(folder):
+    return os.path.normcase(os.path.abspath(os.fspath(folder)))
+
+
+def _folder_index(folder):
+    folder = _folder_key(folder)
+    if folder not in _indexes:
+        _indexes[folder] = VersionIndex(folder)
+    return _indexes[folder]
+
+
+def folder_mtime(folder):
+    """Modification time of a folder in ns, None when it is missing"""
+    try:
+        return os.stat(os.fspath(folder)).st_mtime_ns
+    except OSError:
+        return None
@@ -0,0 +1,112 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "bench"))
+
+import fake_maya  # noqa: E402
+
+fake_maya.install()
+
+import batch_scatter  # noqa: E402
+import scatter_core  # noqa: E402
+import scenefile  # noqa: E402
+import version_index  # noqa: E402
+
+
+def write_jobs(tmp_path, scatter):
+    path = tmp_path / "jobs.json"
+    scatter = dict({"targets": ["ground"], "prototypes": ["pine", "birch"]},
+                   **scatter)
+    path.write_text(json.dumps({"jobs": [{
+        "name": "forest", "scene": "/proj/forest_layout_v001.ma",
+        "scatters": [scatter]}]}))
+    return str(path)
+
+
+def test_load_jobs_takes_a_weight_per_prototype(tmp_path):
+    spec = batch_scatter.load_jobs(write_jobs(tmp_path, {"weights": [3, 1]}))
+    settings = batch_scatter.scatter_settings(
+        spec["jobs"][0]["scatters"][0])
+    assert settings.prototype_weights == (3.0, 1.0)
+    assert settings.prototype_weights == scatter_core.prototype_weights(
+        [3, 1], 2)
+
+
+def test_scatter_settings_weigh_like_the_dialog():
+    config = {"targets": ["ground"], "prototypes": ["pine", "birch", "oak"]}
+    assert batch_scatter.scatter_settings(config).prototype_weights == (
+        scatter_core.prototype_weights([], 3))
+    config["prototypes"] = ["pine"]
+    config["weights"] = [2]
+    assert batch_scatter.scatter_settings(config).prototype_weights == ()
+
+
+@pytest.mark.parametrize("weights", [[3, 1, 1], [1], [1, "heavy"],
+                                     [1, -2], [True, 1], "3 1"])
+def test_load_jobs_rejects_bad_weights(tmp_path, weights):
+    with pytest.raises(ValueError):
+        batch_scatter.load_jobs(write_jobs(tmp_path, {"weights": weights}))
+
+
+def test_load_jobs_rejects_unknown_keys(tmp_path):
+    with pytest.raises(ValueError):
+        batch_scatter.load_jobs(write_jobs(tmp_path, {"weight": [3, 1]}))
+
+
+def test_assign_versions_after_the_latest_on_disk(tmp_path):
+    version_index.clear()
+    output = tmp_path / "scatter"
+    output.mkdir()
+    (output / "forest_scatter_v004.ma").write_bytes(b"")
+    jobs = [{"name": name, "scene": str(tmp_path / scene),
+             "output": {"folder": str(output), "task": "scatter"}}
+            for name, scene in (("first", "forest_layout_v001.ma"),
+                                ("second", "forest_layout_v002.ma"),
+                                ("other", "meadow_layout_v001.ma"),
+                                ("third", "forest_layout_v007.ma"))]
+    batch_scatter.assign_versions(jobs)
+    assert [os.path.basename(job["save_path"]) for job in jobs] == [
+        "forest_scatter_v005.ma", "forest_scatter_v006.ma",
+        "meadow_scatter_v001.ma", "forest_scatter_v007.ma"]
+
+
+def test_assign_versions_rejects_bad_names(tmp_path):
+    with pytest.raises(ValueError):
+        batch_scatter.assign_versions([{"name": "bad",
+                                        "scene": str(tmp_path / "forest.ma")}])
+
+
+def test_save_version_skips_versions_taken_meanwhile(tmp_path, monkeypatch):
+    version_index.clear()
+    monkeypatch.delenv("SFA_VERSION_STORE", raising=False)
+    saved = []
+
+    def fake_save(scene_file):
+        scene_file.path.write_bytes(b"saved")
+        saved.append(scene_file.path.name)
+
+    monkeypatch.setattr(scenefile.SceneFile, "_save", fake_save)
+    (tmp_path / "forest_scatter_v001.ma").write_bytes(b"other")
+    (tmp_path / "forest_scatter_v002.ma").write_bytes(b"other")
+    path = batch_scatter.save_version(str(tmp_path /
+                                          "forest_scatter_v001.ma"))
+    assert os.path.basename(path) == "forest_scatter_v003.ma"
+    assert saved == ["forest_scatter_v003.ma"]
+    assert (tmp_path / "forest_scatter_v001.ma").read_bytes() == b"other"
+
+
+def test_save_version_removes_the_file_when_saving_fails(tmp_path,
+                                                         monkeypatch):
+    monkeypatch.delenv("SFA_VERSION_STORE", raising=False)
+
+    def failing_save(scene_file):
+        raise RuntimeError("maya crashed")
+
+    monkeypatch.setattr(scenefile.SceneFile, "_save", failing_save)
+    with pytest.raises(RuntimeError):
+        batch_scatter.save_version(str(tmp_path / "forest_scatter_v001.ma"))
+    assert not (tmp_path / "forest_scatter_v001.ma").exists()
@@ -0,0 +1,109 @@
+import concurrent.futures
+import os
+import threading
+
+import pytest
+
+import chunk_store
+
+
+def test_dedup_and_restore(tmp_path):
+    store = chunk_store.ChunkStore(tmp_path / "store", compress=False)
+    scene = tmp_path / "scenes" / "forest_layout_v001.ma"
+    scene.parent.mkdir()
+    lines = [b"setAttr \".t\" %d %d %d;\n" % (i, i * 2, i * 3)
+             for i in range(40000)]
+    scene.write_bytes(b"".join(lines))
+    first = store.add(scene)
+    lines[20000] = b"setAttr \".t\" 0 0 0;\n"
+    edited = tmp_path / "scenes" / "forest_layout_v002.ma"
+    edited.write_bytes(b"".join(lines))
+    second = store.add(edited)
+    assert first >= os.path.getsize(scene)
+    assert second < 4 * chunk_store.MAX_CHUNK
+    for path in (scene, edited):
+        target = tmp_path / ("restored_" + path.name)
+        store.restore(chunk_store.version_name(path), target)
+        assert target.read_bytes() == path.read_bytes()
+
+
+def test_same_names_in_other_folders_stay_apart(tmp_path):
+    store = chunk_store.ChunkStore(tmp_path / "store", compress=False)
+    paths = []
+    for folder, content in (("a", b"first"), ("b", b"second")):
+        path = tmp_path / folder / "main_model_v001.ma"
+        path.parent.mkdir()
+        path.write_bytes(content)
+        store.add(path)
+        paths.append(path)
+    assert len(store.versions()) == 2
+    for path in paths:
+        target = tmp_path / "restored.ma"
+        store.restore(chunk_store.version_name(path), target)
+        assert target.read_bytes() == path.read_bytes()
+
+
+def test_failed_restore_leaves_nothing_behind(tmp_path):
+    store = chunk_store.ChunkStore(tmp_path / "store", compress=False)
+    scene = tmp_path / "main_model_v001.ma"
+    scene.write_bytes(os.urandom(50000))
+    store.add(scene)
+    name = chunk_store.version_name(scene)
+    chunk_hash = store.manifest(name)["chunks"][-1][0]
+    os.remove(store._chunk_path(chunk_hash, chunk_store.RAW))
+    restored = tmp_path / "restored"
+    restored.mkdir()
+    with pytest.raises(OSError):
+        store.restore(name, restored / "out.ma")
+    assert os.listdir(restored) == []
+
+
+def test_concurrent_restores_to_one_path(tmp_path):
+    store = chunk_store.ChunkStore(tmp_path / "store", compress=False)
+    scene = tmp_path / "main_model_v001.ma"
+    scene.write_bytes(os.urandom(500000))
+    store.add(scene)
+    target = tmp_path / "restored" / "out.ma"
+    target.parent.mkdir()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(store.restore,
+                      [chunk_store.version_name(scene)] * 8, [target] * 8))
+    assert target.read_bytes() == scene.read_bytes()
+    assert os.listdir(target.parent) == ["out.ma"]
+
+
+def test_collect_garbage(tmp_path):
+    store = chunk_store.ChunkStore(tmp_path / "store", compress=False)
+    scene = tmp_path / "main_model_v001.ma"
+    scene.write_bytes(os.urandom(50000))
+    store.add(scene)
+    store.remove(chunk_store.version_name(scene))
+    assert store.collect_garbage() > 0
+    assert store.versions() == []
+
+
+def test_threads_adding_the_same_chunks(tmp_path):
+    store = chunk_store.ChunkStore(tmp_path / "store", compress=False)
+    content = os.urandom(300000)
+    paths = []
+    for num in range(8):
+        path = tmp_path / "main_model_v{:03d}.ma".format(num + 1)
+        path.write_bytes(content)
+        paths.append(path)
+    barrier = threading.Barrier(len(paths))
+
+    def add(path):
+        barrier.wait()
+        return store.add(path)
+
+    with concurrent.futures.ThreadPoolExecutor(len(paths)) as pool:
+        written = list(pool.map(add, paths))
+    assert sum(written) >= len(content)
+    assert len(store.versions()) == len(paths)
+    for path in paths:
+        target = tmp_path / "restored.ma"
+        store.restore(chunk_store.version_name(path), target)
+        assert target.read_bytes() == content
+    leftovers = [name for _, _, names in os.walk(str(tmp_path / "store"))
+                 for name in names if name.endswith(".partial")]
+    assert leftovers == []
@@ -0,0 +1,135 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "bench"))
+
+import fake_maya  # noqa: E402
+
+fake_maya.install()
+
+import maya.api.OpenMaya as om  # noqa: E402
+import mesh_reader  # noqa: E402
+
+
+def test_compress_ranges():
+    assert mesh_reader.compress_ranges([]) == []
+    assert mesh_reader.compress_ranges(np.array([3])) == [(3, 3)]
+    assert mesh_reader.compress_ranges(
+        np.array([0, 1, 2, 5, 7, 8])) == [(0, 2), (5, 5), (7, 8)]
+
+
+def test_summary_writes_ranges():
+    selection = mesh_reader.TargetSelection([
+        mesh_reader.SelectionEntry("|ground|groundShape"),
+        mesh_reader.SelectionEntry("|pPlane1", mesh_reader.FACES,
+                                   np.array([0, 1, 2, 3, 10]))])
+    assert selection.summary() == ("groundShape, pPlane1.f[0:3], "
+                                   "pPlane1.f[10]")
+
+
+def test_summary_counts_many_ranges():
+    selection = mesh_reader.TargetSelection([
+        mesh_reader.SelectionEntry("|pPlane1", mesh_reader.VERTICES,
+                                   np.arange(0, 100, 2))])
+    assert selection.summary() == "pPlane1 (50 vertices)"
+    assert selection.summary(max_ranges=100, max_length=40) == (
+        "1 meshes, 50 components")
+
+
+POINTS = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [1.0, 0.0, 1.0],
+                   [0.0, 0.0, 1.0], [2.0, 0.0, 0.5], [2.0, 0.0, 2.0],
+                   [1.0, 0.0, 2.5]])
+FACE_COUNTS = np.array([4, 3, 5])
+FACE_VERTICES = np.array([0, 1, 2, 3, 1, 4, 2, 2, 4, 5, 6, 3])
+
+
+@pytest.fixture
+def mesh():
+    fake_maya.reset()
+    fake_maya.add_mesh("ground", POINTS,
+                       np.tile((0.0, 1.0, 0.0), (len(POINTS), 1)),
+                       FACE_COUNTS, FACE_VERTICES)
+    fake_maya.add_mesh("rock", POINTS + 10.0,
+                       np.tile((1.0, 0.0, 0.0), (len(POINTS), 1)),
+                       FACE_COUNTS, FACE_VERTICES)
+    return "ground"
+
+
+def test_read_mesh_is_one_call_per_array(mesh):
+    data = mesh_reader.read_mesh(om.MDagPath(mesh))
+    assert data.name == mesh
+    np.testing.assert_array_equal(data.points, POINTS)
+    np.testing.assert_array_equal(data.face_counts, FACE_COUNTS)
+    np.testing.assert_array_equal(data.face_vertices, FACE_VERTICES)
+    assert data.vertex_count == 7 and data.face_count == 3
+    assert fake_maya.calls["om.MFnMesh.getPoints"] == 1
+    assert fake_maya.calls["om.MFnMesh.getVertexNormals"] == 1
+    assert fake_maya.calls["om.MFnMesh.getVertices"] == 1
+
+
+def test_face_vertex_indices(mesh):
+    data = mesh_reader.read_mesh(om.MDagPath(mesh))
+    np.testing.assert_array_equal(data.face_vertex_indices([1]), [1, 2, 4])
+    np.testing.assert_array_equal(data.face_vertex_indices([0, 2]),
+                                  np.arange(7))
+
+
+def test_contained_faces(mesh):
+    data = mesh_reader.read_mesh(om.MDagPath(mesh))
+    np.testing.assert_array_equal(data.contained_faces([0, 1, 2, 3]), [0])
+    np.testing.assert_array_equal(data.contained_faces([1, 2, 4]), [1])
+    np.testing.assert_array_equal(data.contained_faces([0, 1, 2, 3, 4]),
+                                  [0, 1])
+    assert not len(data.contained_faces([5, 6]))
+
+
+def test_read_selection_keeps_components_as_arrays(mesh):
+    selection = mesh_reader.read_selection(["ground.vtx[1:4]", "rock.f[2]",
+                                            "rock"])
+    assert [(entry.path, entry.kind) for entry in selection] == [
+        ("|ground", mesh_reader.VERTICES), ("|rock", mesh_reader.FACES),
+        ("|rock", None)]
+    np.testing.assert_array_equal(selection.entries[0].indices, [1, 2, 3, 4])
+    np.testing.assert_array_equal(selection.entries[1].indices, [2])
+
+
+def test_read_selection_skips_edges_and_other_shapes(mesh, caplog):
+    selection = mesh_reader.read_selection(["ground.e[0:3]", "locator1",
+                                            "rock.vtx[0]"])
+    assert [entry.path for entry in selection] == ["|rock"]
+    messages = " ".join(record.getMessage() for record in caplog.records)
+    assert "Only vertex and face components" in messages
+    assert "locator1 is not a polygon mesh" in messages
+
+
+def test_read_targets_converts_components(mesh):
+    selection = mesh_reader.read_selection(["ground.f[1]", "rock.vtx[0:4]",
+                                            "ground"])
+    vertex_targets = mesh_reader.read_targets(selection)
+    np.testing.assert_array_equal(vertex_targets[0].indices, [1, 2, 4])
+    np.testing.assert_array_equal(vertex_targets[1].indices, np.arange(5))
+    np.testing.assert_array_equal(vertex_targets[2].indices, np.arange(7))
+    np.testing.assert_array_equal(vertex_targets[1].positions,
+                                  POINTS[:5] + 10.0)
+    face_targets = mesh_reader.read_targets(selection, faces=True)
+    np.testing.assert_array_equal(face_targets[0].indices, [1])
+    np.testing.assert_array_equal(face_targets[1].indices, [0, 1])
+    np.testing.assert_array_equal(face_targets[2].indices, [0, 1, 2])
+    np.testing.assert_allclose(face_targets[0].positions,
+                               [POINTS[[1, 4, 2]].mean(axis=0)])
+    assert face_targets[2].component_name(2) == "ground.f[2]"
+    # Every mesh is read once however often it is selected
+    assert fake_maya.calls["om.MFnMesh.getPoints"] == 4
+
+
+def test_surface_triangles_of_mixed_faces(mesh):
+    selection = mesh_reader.read_selection(["ground.f[1:2]"])
+    target = mesh_reader.read_targets(selection, faces=True)[0]
+    corners, normals, weights, face_ids = target.triangles()
+    assert corners.shape == (4, 3, 3)
+    assert weights is None
+    np.testing.assert_array_equal(face_ids, [0, 1, 1, 1])
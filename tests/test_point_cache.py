@@ -0,0 +1,28 @@
+import numpy as np
+
+import point_cache
+import scatter_core
+
+
+def test_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    result = scatter_core.ScatterResult(
+        rng.random((1000, 3)), rng.random((1000, 3)) * 360.0,
+        rng.random((1000, 3)), None, np.arange(1000),
+        rng.integers(0, 3, 1000))
+    path = point_cache.write_point_cache(
+        str(tmp_path / ("forest" + point_cache.EXTENSION)), result,
+        ["pine", "birch", "rock"])
+    cache = point_cache.read_point_cache(path)
+    assert len(cache) == 1000
+    assert cache.prototypes == ["pine", "birch", "rock"]
+    for name in ("positions", "rotations", "scales"):
+        np.testing.assert_allclose(getattr(cache, name),
+                                   getattr(result, name), rtol=1e-6)
+    np.testing.assert_array_equal(cache.prototype_ids, result.prototype_ids)
+
+
+def test_empty_round_trip(tmp_path):
+    path = point_cache.write_point_cache(
+        str(tmp_path / "empty.scatter"), scatter_core.empty_result(), [])
+    assert len(point_cache.read_point_cache(path)) == 0
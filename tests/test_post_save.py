@@ -0,0 +1,121 @@
+import concurrent.futures
+import hashlib
+import json
+import os
+
+import post_save
+import scenefile
+import version_index
+
+
+class FlakyStore(object):
+    """A store whose first adds fail with an OSError"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.added = []
+
+    def add(self, path):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("share not reachable")
+        self.added.append(path)
+
+
+def write_scene(tmp_path, content=b"requires maya \"2024\";\n"):
+    path = tmp_path / "scenes" / "forest_layout_v001.ma"
+    path.parent.mkdir()
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_checksum_archive_and_sidecar(tmp_path):
+    path = write_scene(tmp_path)
+    queue = post_save.PostSaveQueue(str(tmp_path / "archive"))
+    result = queue.submit(path, metadata={"task": "layout"}).result()
+    queue.shutdown()
+    assert result.ok
+    with open(path, "rb") as scene_file:
+        assert result.checksum == hashlib.sha256(scene_file.read()).hexdigest()
+    assert result.archive_path.startswith(str(tmp_path / "archive"))
+    assert result.archive_path.endswith(path.lstrip(os.sep))
+    with open(result.sidecar_path) as sidecar_file:
+        sidecar = json.load(sidecar_file)
+    assert result.sidecar_path == path + post_save.SIDECAR_EXTENSION
+    assert sidecar["task"] == "layout"
+    assert sidecar["sha256"] == result.checksum
+    assert sidecar["archive_path"] == result.archive_path
+
+
+def test_archives_of_equal_names_stay_apart(tmp_path):
+    first = post_save.archive_path("/proj/a/main_model_v001.ma", "/archive")
+    second = post_save.archive_path("/proj/b/main_model_v001.ma", "/archive")
+    assert first != second
+
+
+def test_os_errors_are_retried(tmp_path):
+    path = write_scene(tmp_path)
+    store = FlakyStore(failures=2)
+    queue = post_save.PostSaveQueue(retries=3, retry_delay=0.0, store=store)
+    result = queue.submit(path).result()
+    queue.shutdown()
+    assert result.ok
+    assert store.added == [path]
+    assert result.attempts == 5
+
+
+def test_gives_up_after_retries(tmp_path):
+    path = write_scene(tmp_path)
+    queue = post_save.PostSaveQueue(retries=1, retry_delay=0.0,
+                                    store=FlakyStore(failures=5))
+    result = queue.submit(path).result()
+    queue.shutdown()
+    assert isinstance(result.error, OSError)
+    assert not os.path.exists(path + post_save.SIDECAR_EXTENSION)
+
+
+def test_missing_scene_is_not_retried(tmp_path):
+    results = []
+    queue = post_save.PostSaveQueue(retries=3, retry_delay=10.0)
+    queue.submit(str(tmp_path / "gone_model_v001.ma"),
+                 callback=results.append)
+    queue.shutdown()
+    assert isinstance(results[0].error, FileNotFoundError)
+    assert results[0].attempts == 1
+
+
+def test_concurrent_writes_of_one_scene_stay_whole(tmp_path):
+    path = write_scene(tmp_path, os.urandom(500000))
+    archive = str(tmp_path / "archive")
+    metadata = [{"num": num, "pad": "x" * 100000} for num in range(16)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as pool:
+        copies = list(pool.map(post_save.archive_copy, [path] * 16,
+                               [archive] * 16))
+        sidecars = list(pool.map(post_save.write_sidecar, [path] * 16,
+                                 metadata))
+    assert post_save.file_checksum(copies[0]) == post_save.file_checksum(path)
+    with open(sidecars[0]) as sidecar_file:
+        assert json.load(sidecar_file)["num"] in range(16)
+    folders = (os.path.dirname(path), os.path.dirname(copies[0]))
+    assert not [name for folder in folders for name in os.listdir(folder)
+                if name.endswith(".partial")]
+
+
+def test_sidecar_does_not_make_the_next_lookup_list(tmp_path, monkeypatch):
+    version_index.clear()
+    scene_file = scenefile.SceneFile(str(tmp_path / "forest_layout_v001.ma"))
+    monkeypatch.setattr(scenefile.SceneFile, "_save",
+                        lambda self: self.path.write_bytes(b"scene"))
+    listed = []
+    scandir = os.scandir
+    monkeypatch.setattr(version_index.os, "scandir",
+                        lambda folder: listed.append(folder) or
+                        scandir(folder))
+    assert scene_file.next_avail_ver() == 1
+    scene_file.save()
+    queue = post_save.PostSaveQueue()
+    result = queue.submit(str(scene_file.path)).result()
+    queue.shutdown()
+    assert os.path.isfile(result.sidecar_path)
+    assert scene_file.next_avail_ver() == 2
+    assert len(listed) == 1
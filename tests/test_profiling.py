@@ -0,0 +1,128 @@
+import json
+import logging
+import threading
+
+import pytest
+
+import profiling
+
+log = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def profiler():
+    yield profiling.enable()
+    profiling.disable()
+
+
+def test_nothing_is_recorded_while_disabled():
+    profiling.disable()
+    with profiling.span("scatter"):
+        profiling.count("maya.nodes", 3)
+    assert profiling.current() is None
+
+
+def test_nested_spans(profiler):
+    with profiling.span("scatter"):
+        with profiling.span("scatter.sample"):
+            assert profiler.depth == 2
+        with profiling.span("scatter.sample"):
+            pass
+        profiling.count("maya.nodes", 3)
+        profiling.count("maya.nodes")
+    assert profiler.depth == 0
+    assert [(name, depth) for name, _, _, depth, _ in profiler.spans] == [
+        ("scatter.sample", 1), ("scatter.sample", 1), ("scatter", 0)]
+    totals = profiler.totals()
+    assert list(totals) == ["scatter", "scatter.sample"]
+    assert totals["scatter.sample"][1] == 2
+    assert totals["scatter"][0] >= totals["scatter.sample"][0]
+    assert profiler.counters["maya.nodes"] == 4
+
+
+def test_threaded_spans_keep_their_own_depth(profiler):
+    started = threading.Barrier(4)
+    depths = []
+
+    def work():
+        with profiling.span("worker"):
+            started.wait()
+            depths.append(profiler.depth)
+            profiling.count("jobs")
+
+    with profiling.span("scatter"):
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert depths == [1] * 4
+    workers = [span for span in profiler.spans if span[0] == "worker"]
+    assert [span[3] for span in workers] == [0] * 4
+    assert len(set(span[4] for span in workers)) == 4
+    assert profiler.counters["jobs"] == 4
+    assert profiler.open_spans == 0
+
+
+def test_report_waits_for_open_spans(profiler, caplog):
+    caplog.set_level(logging.INFO)
+    with profiling.span("save"):
+        profiling.report(log)
+        assert not caplog.records
+    assert profiler.spans
+    profiling.report(log)
+    assert "save" in caplog.records[-1].getMessage()
+    assert not profiler.spans
+
+
+def test_report_waits_for_spans_of_other_threads(profiler, caplog):
+    caplog.set_level(logging.INFO)
+    entered = threading.Event()
+    leave = threading.Event()
+
+    def work():
+        with profiling.span("post_save"):
+            entered.set()
+            leave.wait()
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    entered.wait()
+    profiling.report(log)
+    assert not caplog.records
+    leave.set()
+    thread.join()
+    profiling.report(log)
+    assert "post_save" in caplog.records[-1].getMessage()
+
+
+def test_chrome_trace(profiler):
+    with profiling.span("scatter"):
+        with profiling.span("scatter.sample"):
+            pass
+    profiling.count("maya.nodes", 5)
+    events = json.loads(json.dumps(profiler.chrome_trace()))["traceEvents"]
+    spans = [event for event in events if event["ph"] == "X"]
+    counters = [event for event in events if event["ph"] == "C"]
+    assert [event["name"] for event in spans] == ["scatter.sample", "scatter"]
+    sample, outer = spans
+    assert outer["ts"] <= sample["ts"]
+    assert sample["ts"] + sample["dur"] <= outer["ts"] + outer["dur"]
+    assert sample["pid"] == outer["pid"]
+    assert sample["tid"] == threading.get_ident()
+    assert counters == [{"name": "maya.nodes", "ph": "C",
+                         "ts": pytest.approx(outer["ts"] + outer["dur"]),
+                         "pid": outer["pid"], "args": {"maya.nodes": 5}}]
+
+
+def test_report_writes_the_trace(tmp_path):
+    path = tmp_path / "trace.json"
+    profiling.enable(str(path))
+    try:
+        with profiling.span("save"):
+            pass
+        profiling.report(log)
+    finally:
+        profiling.disable()
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [event["name"] for event in events] == ["save"]
@@ -0,0 +1,55 @@
+import numpy as np
+
+import scatter_cache
+import scatter_core
+
+
+def make_result(count=100, prototypes=True):
+    rng = np.random.default_rng(0)
+    return scatter_core.ScatterResult(
+        rng.random((count, 3)), rng.random((count, 3)), rng.random((count, 3)),
+        rng.random((count, 3)), np.arange(count),
+        rng.integers(0, 3, count) if prototypes else None)
+
+
+def test_cache_key_follows_settings_and_arrays():
+    positions = np.random.default_rng(1).random((50, 3))
+    settings = scatter_core.ScatterSettings(seed=1)
+    key = scatter_cache.cache_key(settings, [positions, None])
+    assert key == scatter_cache.cache_key(scatter_core.ScatterSettings(seed=1),
+                                          [positions.copy(), None])
+    assert key != scatter_cache.cache_key(scatter_core.ScatterSettings(seed=2),
+                                          [positions, None])
+    assert key != scatter_cache.cache_key(settings, [positions[:-1], None])
+    assert key != scatter_cache.cache_key(settings, [positions, positions])
+
+
+def test_disk_round_trip(tmp_path):
+    result = make_result()
+    scatter_cache.ScatterCache(folder=str(tmp_path)).put("key", result)
+    cached = scatter_cache.ScatterCache(folder=str(tmp_path)).get("key")
+    for name in scatter_cache.RESULT_ARRAYS + scatter_cache.OPTIONAL_ARRAYS:
+        np.testing.assert_array_equal(getattr(cached, name),
+                                      getattr(result, name))
+    assert scatter_cache.ScatterCache(
+        folder=str(tmp_path)).get("other") is None
+
+
+def test_memory_entries_are_evicted_oldest_first():
+    cache = scatter_cache.ScatterCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, make_result(prototypes=False))
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+
+
+def test_same_seed_same_result():
+    rng = np.random.default_rng(2)
+    positions = rng.random((2000, 3))
+    normals = np.tile((0.0, 1.0, 0.0), (len(positions), 1))
+    settings = scatter_core.ScatterSettings(rot_max=(0.0, 360.0, 0.0),
+                                            percentage=0.3, seed=9)
+    first = scatter_core.scatter(positions, normals, settings)
+    second = scatter_core.scatter(positions, normals, settings)
+    np.testing.assert_array_equal(first.indices, second.indices)
+    np.testing.assert_array_equal(first.rotations, second.rotations)
@@ -0,0 +1,315 @@
+import numpy as np
+import pytest
+
+import scatter_core
+
+
+def test_sample_count():
+    assert scatter_core.sample_count(1000, 0.25) == 250
+    assert scatter_core.sample_count(0, 1.0) == 0
+
+
+def test_sample_indices_are_unique_and_sorted():
+    indices = scatter_core.sample_indices(10000, 2500,
+                                          np.random.default_rng(0))
+    assert len(np.unique(indices)) == 2500
+    assert (np.diff(indices) > 0).all()
+
+
+def test_scatter_stays_within_ranges():
+    rng = np.random.default_rng(1)
+    positions = rng.random((4000, 3))
+    normals = np.tile((0.0, 1.0, 0.0), (len(positions), 1))
+    settings = scatter_core.ScatterSettings(
+        rot_min=(-10.0, 0.0, 0.0), rot_max=(10.0, 360.0, 0.0),
+        scale_min=(0.5, 1.0, 1.0), scale_max=(2.0, 1.0, 3.0),
+        percentage=0.1, seed=2)
+    result = scatter_core.scatter(positions, normals, settings)
+    assert len(result) == 400
+    np.testing.assert_array_equal(result.positions,
+                                  positions[result.indices])
+    assert (result.rotations >= settings.rot_min).all()
+    assert (result.rotations <= settings.rot_max).all()
+    assert (result.scales >= settings.scale_min).all()
+    assert (result.scales <= settings.scale_max).all()
+
+
+def test_euler_round_trip():
+    rotations = np.random.default_rng(4).uniform(-89.0, 89.0, (1000, 3))
+    matrices = scatter_core.euler_to_matrices(rotations)
+    np.testing.assert_allclose(scatter_core.matrices_to_euler(matrices),
+                               rotations, atol=1e-9)
+
+
+def test_align_rotations_point_up_along_normals():
+    rng = np.random.default_rng(5)
+    normals = scatter_core.normalized(rng.normal(size=(1000, 3)))
+    normals[0] = (0.0, -1.0, 0.0)
+    rotations = np.zeros((1000, 3))
+    rotations[:, 1] = rng.uniform(0.0, 360.0, 1000)
+    aligned = scatter_core.align_rotations(rotations, normals)
+    ups = scatter_core.euler_to_matrices(aligned)[:, :, 1]
+    np.testing.assert_allclose(ups, normals, atol=1e-9)
+
+
+def test_triangulate_fans_every_face():
+    triangles, faces = scatter_core.triangulate(
+        np.array([4, 3, 5]), np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11]))
+    np.testing.assert_array_equal(triangles, [[0, 1, 2], [0, 2, 3],
+                                              [4, 5, 6], [7, 8, 9],
+                                              [7, 9, 10], [7, 10, 11]])
+    np.testing.assert_array_equal(faces, [0, 0, 1, 2, 2, 2])
+
+
+def test_sample_triangles_is_uniform_by_area():
+    corners = np.array([[[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]],
+                        [[0.0, 0.0, 5.0], [3.0, 0.0, 5.0], [0.0, 1.0, 5.0]]])
+    picks, weights = scatter_core.sample_triangles(
+        corners, 100000, np.random.default_rng(3))
+    assert abs(np.mean(picks == 1) - 0.75) < 0.01
+    np.testing.assert_allclose(weights.sum(axis=1), 1.0)
+    assert (weights >= 0.0).all()
+    # A corner triangle of half the size holds a quarter of the area
+    first = weights[picks == 0]
+    assert abs(np.mean(first[:, 0] > 0.5) - 0.25) < 0.01
+
+
+def assert_spaced(positions, radii):
+    distances = np.linalg.norm(positions[:, None] - positions[None], axis=2)
+    np.fill_diagonal(distances, np.inf)
+    assert (distances >= radii[:, None] + radii[None]).all()
+
+
+def test_poisson_filter_keeps_spacing():
+    rng = np.random.default_rng(2)
+    positions = rng.random((5000, 3)) * 10.0
+    radii = rng.uniform(0.1, 0.4, len(positions))
+    keep = scatter_core.poisson_filter(positions, radii)
+    assert len(keep) > 100
+    assert_spaced(positions[keep], radii[keep])
+
+
+def test_poisson_filter_far_from_the_origin():
+    rng = np.random.default_rng(16)
+    base = rng.random((600, 3)) * 0.2
+    positions = np.concatenate((base, base + 1e9, base - 1e9))
+    positions[:, 1] += rng.choice([0.0, 3e8, -3e8], len(positions))
+    radii = np.full(len(positions), 0.005)
+    keep = scatter_core.poisson_filter(positions, radii)
+    assert len(keep) < len(positions)
+    assert_spaced(positions[keep], radii[keep])
+
+
+def test_poisson_filter_stops_at_limit():
+    positions = np.random.default_rng(3).random((1000, 3)) * 100.0
+    keep = scatter_core.poisson_filter(positions, np.full(1000, 0.01),
+                                       limit=10)
+    np.testing.assert_array_equal(keep, np.arange(10))
+
+
+def test_spaced_scatter_keeps_spacing():
+    rng = np.random.default_rng(4)
+    positions = rng.random((3000, 3)) * 10.0
+    normals = np.tile((0.0, 1.0, 0.0), (len(positions), 1))
+    settings = scatter_core.ScatterSettings(percentage=0.5, spacing=0.6,
+                                            seed=5)
+    result = scatter_core.scatter(positions, normals, settings)
+    assert 0 < len(result) < 1500
+    assert_spaced(result.positions, np.full(len(result), 0.3))
+
+
+def test_alias_table_distribution():
+    weights = np.array([5.0, 1.0, 0.0, 2.0, 12.0])
+    table = scatter_core.alias_table(weights)
+    draws = scatter_core.alias_draw(table, 200000,
+                                    np.random.default_rng(0))
+    frequencies = np.bincount(draws, minlength=len(weights)) / len(draws)
+    assert frequencies[2] == 0.0
+    np.testing.assert_allclose(frequencies, weights / weights.sum(),
+                               atol=0.005)
+
+
+def test_alias_table_rejects_zero_weights():
+    with pytest.raises(ValueError):
+        scatter_core.alias_table([0.0, 0.0])
+
+
+def test_weighted_indices_are_unique_and_complete():
+    rng = np.random.default_rng(1)
+    weights = np.exp(-np.linspace(-5.0, 5.0, 2000) ** 2)
+    indices = scatter_core.weighted_indices(weights, 500, rng)
+    assert len(np.unique(indices)) == 500
+    assert len(scatter_core.weighted_indices(weights, 2000, rng)) == 2000
+
+
+def test_weighted_indices_skip_zero_weights():
+    weights = np.array([0.0, 1.0, 0.0, 3.0])
+    indices = scatter_core.weighted_indices(weights, 4,
+                                            np.random.default_rng(2))
+    np.testing.assert_array_equal(indices, [1, 3])
+
+
+def test_retransform_matches_a_seeded_scatter():
+    rng = np.random.default_rng(6)
+    positions = rng.random((3000, 3)) * 10.0
+    normals = np.tile((0.0, 1.0, 0.0), (len(positions), 1))
+    options = dict(scale_min=(0.5, 0.5, 0.5), scale_max=(2.0, 2.0, 2.0),
+                   percentage=0.2, spacing=0.2, seed=7)
+    preview = scatter_core.ScatterSettings(rot_max=(0.0, 90.0, 0.0),
+                                           **options)
+    final = scatter_core.ScatterSettings(rot_max=(0.0, 360.0, 0.0),
+                                         **options)
+    retransformed = scatter_core.retransform(
+        scatter_core.scatter(positions, normals, preview), final)
+    direct = scatter_core.scatter(positions, normals, final)
+    np.testing.assert_array_equal(retransformed.indices, direct.indices)
+    np.testing.assert_array_equal(retransformed.rotations, direct.rotations)
+    np.testing.assert_array_equal(retransformed.scales, direct.scales)
+
+
+def test_retransform_keeps_spacing_scales():
+    rng = np.random.default_rng(7)
+    positions = rng.random((2000, 3)) * 10.0
+    normals = np.tile((0.0, 1.0, 0.0), (len(positions), 1))
+    settings = scatter_core.ScatterSettings(
+        rot_max=(0.0, 360.0, 0.0), scale_min=(0.5, 0.5, 0.5),
+        scale_max=(2.0, 2.0, 2.0), percentage=0.5, spacing=0.3,
+        scale_spacing=True, seed=8)
+    result = scatter_core.scatter(positions, normals, settings)
+    again = scatter_core.retransform(result, settings, np.random.default_rng())
+    np.testing.assert_array_equal(again.scales, result.scales)
+
+
+def test_frustum_mask():
+    positions = np.array([[0.0, 0.0, -5.0], [4.0, 0.0, -5.0],
+                          [5.8, 0.0, -5.0], [0.0, 0.0, 5.0],
+                          [0.0, 0.0, -50.0], [0.0, 5.5, -5.0]])
+    fov = (np.radians(90.0), np.radians(90.0))
+    np.testing.assert_array_equal(
+        scatter_core.frustum_mask(positions, np.eye(4), fov, (0.1, 20.0)),
+        [True, True, False, False, False, False])
+    np.testing.assert_array_equal(
+        scatter_core.frustum_mask(positions, np.eye(4), fov, (0.1, 20.0),
+                                  padding=1.0),
+        [True, True, True, False, False, True])
+
+
+def test_frustum_mask_moves_with_the_camera():
+    world_to_camera = np.eye(4)
+    world_to_camera[3, :3] = (-100.0, 0.0, 0.0)
+    mask = scatter_core.frustum_mask(
+        np.array([[100.0, 0.0, -5.0], [0.0, 0.0, -5.0]]), world_to_camera,
+        (np.radians(60.0), np.radians(60.0)))
+    np.testing.assert_array_equal(mask, [True, False])
+
+
+def test_lod_levels():
+    positions = np.array([[0.0, 0.0, -1.0], [0.0, 0.0, -15.0],
+                          [0.0, 0.0, -40.0], [0.0, 0.0, -80.0],
+                          [0.0, 0.0, 10.0]])
+    fov = (np.radians(90.0), np.radians(90.0))
+    cull = scatter_core.CullSettings((0.0, 0.0, 0.0), np.eye(4), fov,
+                                     bands=(10.0, 30.0), max_distance=60.0)
+    np.testing.assert_array_equal(scatter_core.lod_levels(positions, cull),
+                                  [0, 1, 2, -1, -1])
+    cull.proxy_outside = True
+    np.testing.assert_array_equal(scatter_core.lod_levels(positions, cull),
+                                  [0, 1, 2] + [scatter_core.OUTSIDE_LEVEL] * 2)
+
+
+def test_poisson_filter_keeps_clear_of_obstacles():
+    rng = np.random.default_rng(8)
+    positions = rng.random((5000, 3)) * 10.0
+    radii = rng.uniform(0.1, 0.4, len(positions))
+    centers = np.array([[5.0, 5.0, 5.0]])
+    keep = scatter_core.poisson_filter(positions, radii,
+                                       obstacles=(centers, np.array([2.0])))
+    assert_spaced(positions[keep], radii[keep])
+    distances = np.linalg.norm(positions[keep] - centers, axis=1)
+    assert (distances >= radii[keep] + 2.0).all()
+
+
+def test_poisson_filter_needs_a_radius_per_position():
+    with pytest.raises(ValueError):
+        scatter_core.poisson_filter(np.zeros((3, 3)), np.ones(4))
+
+
+def test_weighted_scatter_keeps_clear_of_obstacles():
+    rng = np.random.default_rng(9)
+    positions = rng.random((2000, 3)) * 10.0
+    normals = np.tile((0.0, 1.0, 0.0), (len(positions), 1))
+    weights = np.ones(len(positions))
+    weights[::2] = 0.0
+    centers = np.array([[5.0, 5.0, 5.0]])
+    settings = scatter_core.ScatterSettings(spacing=0.1, seed=10)
+    result = scatter_core.scatter(positions, normals, settings,
+                                  weights=weights,
+                                  obstacles=(centers, np.array([3.0])))
+    assert len(result)
+    assert (weights[result.indices] > 0.0).all()
+    assert (np.linalg.norm(result.positions - centers, axis=1) >= 3.0).all()
+
+
+def test_prototype_weights_pad_and_truncate():
+    assert scatter_core.prototype_weights(["3"], 3) == (3.0, 1.0, 1.0)
+    assert scatter_core.prototype_weights([3, 1, 2, 5], 2) == (3.0, 1.0)
+    assert scatter_core.prototype_weights([], 2) == (1.0, 1.0)
+    assert scatter_core.prototype_weights([3, 1], 1) == ()
+
+
+@pytest.mark.parametrize("weights", [["heavy"], ["-1", "3"], ["inf", "1"],
+                                     ["nan"], [None]])
+def test_prototype_weights_reject_bad_weights(weights):
+    with pytest.raises(ValueError, match="prototype weight"):
+        scatter_core.prototype_weights(weights, 2)
+
+
+def test_random_prototypes_follow_the_weights():
+    settings = scatter_core.ScatterSettings(prototype_weights=(3.0, 1.0,
+                                                               0.0, 4.0))
+    ids = scatter_core.random_prototypes(100000, settings,
+                                         np.random.default_rng(11))
+    np.testing.assert_allclose(np.bincount(ids, minlength=4) / len(ids),
+                               [0.375, 0.125, 0.0, 0.5], atol=0.005)
+    single = scatter_core.ScatterSettings(prototype_weights=(3.0,))
+    assert scatter_core.random_prototypes(10, single,
+                                          np.random.default_rng()) is None
+
+
+def test_seeded_scatter_splits_prototypes_by_weight():
+    rng = np.random.default_rng(12)
+    positions = rng.random((40000, 3))
+    normals = np.tile((0.0, 1.0, 0.0), (len(positions), 1))
+    settings = scatter_core.ScatterSettings(percentage=0.5, seed=13,
+                                            prototype_weights=(1.0, 3.0))
+    result = scatter_core.scatter(positions, normals, settings)
+    again = scatter_core.scatter(positions, normals, settings)
+    np.testing.assert_array_equal(result.prototype_ids, again.prototype_ids)
+    assert abs(np.mean(result.prototype_ids == 1) - 0.75) < 0.01
+
+
+def test_spacing_radii_use_the_radius_of_each_prototype():
+    settings = scatter_core.ScatterSettings(spacing=0.4,
+                                            prototype_radii=(0.1, 1.0))
+    scales = np.array([[1.0, 1.0, 1.0], [1.0, 2.0, 1.0],
+                       [1.0, 1.0, 1.0], [0.5, 0.5, 0.5]])
+    np.testing.assert_allclose(
+        scatter_core.spacing_radii(scales, settings, np.array([0, 1, 0, 1])),
+        [0.2, 2.0, 0.2, 0.5])
+    np.testing.assert_allclose(scatter_core.spacing_radii(scales, settings),
+                               [0.2, 0.2, 0.2, 0.2])
+
+
+def test_spaced_scatter_keeps_each_prototype_radius():
+    rng = np.random.default_rng(14)
+    positions = rng.random((5000, 3)) * 10.0
+    normals = np.tile((0.0, 1.0, 0.0), (len(positions), 1))
+    settings = scatter_core.ScatterSettings(
+        scale_min=(0.5, 0.5, 0.5), scale_max=(1.5, 1.5, 1.5),
+        percentage=0.5, seed=15, prototype_weights=(1.0, 1.0),
+        prototype_radii=(0.1, 0.5))
+    result = scatter_core.scatter(positions, normals, settings)
+    assert len(np.unique(result.prototype_ids)) == 2
+    radii = (np.array([0.1, 0.5])[result.prototype_ids] *
+             np.abs(result.scales).max(axis=1))
+    assert_spaced(result.positions, radii)
@@ -0,0 +1,75 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "bench"))
+
+import fake_maya  # noqa: E402
+
+fake_maya.install()
+
+import profiling  # noqa: E402
+import scatter_core  # noqa: E402
+import scatter_instancer  # noqa: E402
+
+
+def test_write_transforms_is_one_command():
+    fake_maya.reset()
+    nodes = ["pCube{}".format(num) for num in range(4)]
+    positions = np.arange(12, dtype=np.float64).reshape(4, 3)
+    scatter_instancer.write_transforms(nodes, positions, positions * 10.0,
+                                       np.ones((4, 3)))
+    assert fake_maya.calls["cmds.scatterWriteTransforms"] == 1
+    assert fake_maya.calls["om.MDGModifier.newPlugValueDouble"] == 4 * 9
+    assert fake_maya.calls["om.MDGModifier.doIt"] == 1
+
+
+def test_write_transforms_needs_a_value_per_node():
+    scatter_instancer.load_plugin()
+    with pytest.raises(ValueError):
+        fake_maya.commands["scatterWriteTransforms"](
+            ["pCube1", "pCube2"], translation=[[0, 0, 0]],
+            rotation=[[0, 0, 0]] * 2, scale=[[1, 1, 1]] * 2)
+
+
+@pytest.mark.parametrize("object_ids", [None, np.array([0, 1, 1])])
+def test_create_instancer_counts_its_commands(object_ids):
+    fake_maya.reset()
+    positions = np.zeros((3, 3))
+    result = scatter_core.ScatterResult(positions, positions, positions + 1.0,
+                                        positions, np.arange(3))
+    profiler = profiling.enable()
+    try:
+        scatter_instancer.create_instancer(["pine", "birch"], result,
+                                           object_ids=object_ids)
+    finally:
+        profiling.disable()
+    assert profiler.counters["maya.commands"] == fake_maya.command_calls()
+    assert profiler.counters["maya.nodes"] == 3
+
+
+def test_create_instancer_sets_arrays_with_undoable_set_attr(monkeypatch):
+    fake_maya.reset()
+    arrays = {}
+
+    def set_attr(plug, *values, **kwargs):
+        if kwargs.get("type"):
+            arrays[plug] = (kwargs["type"], values)
+
+    monkeypatch.setitem(fake_maya.commands, "setAttr", set_attr)
+    positions = np.zeros((2, 3))
+    rotations = np.array([[0.0, 45.0, 0.0], [0.0, 90.0, 0.0]])
+    result = scatter_core.ScatterResult(positions, rotations, positions + 2.0,
+                                        positions, np.arange(2))
+    scatter_instancer.create_instancer(["pine", "birch"], result,
+                                       object_ids=np.array([1, 0]))
+    assert arrays["scatter_pointsShape.rotationPP"] == (
+        "vectorArray", (2, (0.0, 45.0, 0.0), (0.0, 90.0, 0.0)))
+    assert arrays["scatter_pointsShape.scalePP0"] == (
+        "vectorArray", (2, (2.0, 2.0, 2.0), (2.0, 2.0, 2.0)))
+    assert arrays["scatter_pointsShape.objectIndexPP"] == (
+        "doubleArray", ([1.0, 0.0],))
+    assert not fake_maya.api_calls()
@@ -0,0 +1,50 @@
+import sys
+
+import numpy as np
+
+import scatter_core
+import scatter_parallel
+
+
+def make_jobs():
+    rng = np.random.default_rng(0)
+    normals = np.tile((0.0, 1.0, 0.0), (3000, 1))
+    return [scatter_parallel.candidate_job(rng.random((3000, 3)) * 10.0,
+                                           normals) for _ in range(3)]
+
+
+def assert_same(first, second):
+    for name in ("positions", "rotations", "scales", "indices"):
+        np.testing.assert_array_equal(getattr(first, name),
+                                      getattr(second, name))
+
+
+def test_pool_gives_the_serial_result():
+    jobs = make_jobs()
+    settings = scatter_core.ScatterSettings(
+        rot_max=(0.0, 360.0, 0.0), scale_min=(0.5, 0.5, 0.5),
+        scale_max=(2.0, 2.0, 2.0), percentage=0.2, spacing=0.3, seed=4)
+    serial = scatter_parallel.scatter_jobs(jobs, settings, workers=1)
+    pooled = scatter_parallel.scatter_jobs(jobs, settings, workers=2,
+                                           min_parallel=0,
+                                           executable=sys.executable)
+    assert len(serial)
+    assert_same(serial, pooled)
+
+
+def test_indices_are_offset_by_job():
+    jobs = make_jobs()
+    settings = scatter_core.ScatterSettings(percentage=0.1, seed=1)
+    result = scatter_parallel.scatter_jobs(jobs, settings, workers=1)
+    positions = np.concatenate([job["positions"] for job in jobs])
+    np.testing.assert_array_equal(result.positions,
+                                  positions[result.indices])
+
+
+def test_plain_sampling_stays_in_process():
+    settings = scatter_core.ScatterSettings(percentage=0.1)
+    assert not scatter_parallel.is_expensive(settings)
+    assert scatter_parallel.is_expensive(
+        scatter_core.ScatterSettings(spacing=0.1))
+    assert scatter_parallel.is_expensive(
+        scatter_core.ScatterSettings(surface=True))
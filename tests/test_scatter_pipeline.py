@@ -0,0 +1,137 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "bench"))
+
+import fake_maya  # noqa: E402
+
+fake_maya.install()
+
+import scatter_core  # noqa: E402
+import scatter_instancer  # noqa: E402
+import scatter_pipeline  # noqa: E402
+
+FOV = (np.radians(90.0), np.radians(90.0))
+POSITIONS = np.array([[0.0, 0.0, -1.0], [0.0, 0.0, -15.0],
+                      [0.0, 0.0, -40.0], [0.0, 0.0, 10.0]])
+
+
+def cull_result(bands, prototype_ids=None):
+    cull = scatter_core.CullSettings((0.0, 0.0, 0.0), np.eye(4), FOV,
+                                     bands=bands, max_distance=30.0,
+                                     proxy_outside=True)
+    result = scatter_core.ScatterResult(POSITIONS, None, None, None,
+                                        np.arange(len(POSITIONS)),
+                                        prototype_ids)
+    return result, scatter_core.lod_levels(POSITIONS, cull)
+
+
+def test_object_indices_without_levels():
+    result = scatter_core.ScatterResult(POSITIONS, None, None, None,
+                                        np.arange(4), np.array([0, 1, 2, 1]))
+    np.testing.assert_array_equal(
+        scatter_pipeline.object_indices(result, 2, 3), [0, 1, 1, 1])
+
+
+def test_object_indices_walk_the_proxies():
+    result, _ = cull_result(())
+    levels = np.array([0, 1, 2, 5])
+    np.testing.assert_array_equal(
+        scatter_pipeline.object_indices(result, 1, 3, levels), [0, 1, 2, 2])
+
+
+def test_object_indices_drop_culled_instances():
+    result, _ = cull_result(())
+    levels = np.array([0, scatter_core.CULLED_LEVEL, 1,
+                       scatter_core.CULLED_LEVEL])
+    np.testing.assert_array_equal(
+        scatter_pipeline.object_indices(result, 1, 2, levels),
+        [0, -1, 1, -1])
+
+
+def test_outside_points_get_the_last_proxy_without_bands():
+    result, levels = cull_result(())
+    np.testing.assert_array_equal(
+        scatter_pipeline.object_indices(result, 1, 3, levels), [0, 0, 2, 2])
+
+
+def test_outside_points_get_the_last_proxy_past_the_bands():
+    result, levels = cull_result((10.0,), np.array([0, 1, 1, 0]))
+    np.testing.assert_array_equal(
+        scatter_pipeline.object_indices(result, 2, 4, levels), [0, 2, 3, 3])
+
+
+def test_outside_points_keep_their_prototype_without_proxies():
+    result, levels = cull_result((10.0,), np.array([0, 1, 1, 0]))
+    np.testing.assert_array_equal(
+        scatter_pipeline.object_indices(result, 2, 2, levels), [0, 1, 1, 0])
+
+
+@pytest.fixture
+def events(monkeypatch):
+    fake_maya.reset()
+    recorded = []
+    for name in ("undoInfo", "refresh"):
+        monkeypatch.setitem(
+            fake_maya.commands, name,
+            lambda name=name, **kwargs: recorded.append((name, kwargs)))
+    return recorded
+
+
+def scattered(count):
+    positions = np.zeros((count, 3))
+    return scatter_core.ScatterResult(positions, positions, positions + 1.0,
+                                      positions, np.arange(count))
+
+
+def assert_wrapped(events):
+    assert events[0] == ("undoInfo", {"openChunk": True,
+                                      "chunkName": "scatter"})
+    assert events[-1] == ("undoInfo", {"closeChunk": True})
+    assert [kwargs for name, kwargs in events if name == "refresh"] == [
+        {"suspend": True}, {"suspend": False}, {}]
+    assert len(events) == 5
+
+
+def test_instance_result_makes_batches_in_one_undo_step(events):
+    count = 2 * scatter_instancer.BATCH_SIZE + 7
+    progress = []
+    scatter_pipeline.instance_result(
+        scattered(count), "pine",
+        on_batch=lambda made, total: progress.append((made, total)) or True)
+    assert progress == [(scatter_instancer.BATCH_SIZE, count),
+                        (2 * scatter_instancer.BATCH_SIZE, count),
+                        (count, count)]
+    assert fake_maya.calls["cmds.instance"] == count
+    assert fake_maya.calls["cmds.scatterWriteTransforms"] == 3
+    assert_wrapped(events)
+
+
+def test_cancel_stops_between_batches(events):
+    count = 3 * scatter_instancer.BATCH_SIZE
+    scatter_pipeline.instance_result(scattered(count), "pine",
+                                     on_batch=lambda made, total: False)
+    assert fake_maya.calls["cmds.instance"] == scatter_instancer.BATCH_SIZE
+    assert_wrapped(events)
+
+
+def test_errors_close_the_undo_chunk_and_restore_refresh(events,
+                                                         monkeypatch):
+    def fail(*args):
+        raise RuntimeError("pine was deleted")
+
+    monkeypatch.setattr(scatter_instancer, "write_transforms", fail)
+    with pytest.raises(RuntimeError):
+        scatter_pipeline.instance_result(scattered(10), "pine")
+    assert_wrapped(events)
+
+
+def test_instancer_is_one_undo_step(events):
+    scatter_pipeline.instance_result(scattered(10), "pine", instancer=True)
+    assert events[0][0] == "undoInfo" and events[0][1]["openChunk"]
+    assert events[-1] == ("undoInfo", {"closeChunk": True})
+    assert fake_maya.calls["cmds.particleInstancer"] == 1
@@ -0,0 +1,54 @@
+import os
+import shutil
+
+import scene_catalog
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(str(path)), exist_ok=True)
+    open(str(path), "wb").close()
+
+
+def make_catalog(tmp_path):
+    return scene_catalog.SceneCatalog(tmp_path / "scenes",
+                                      db_path=str(tmp_path / "catalog.db"))
+
+
+def test_rescans_only_changed_folders(tmp_path):
+    scenes = tmp_path / "scenes"
+    for name in ("forest/forest_layout_v001.ma", "forest/notes.txt",
+                 "rocks/rock_model_v001.ma", "rocks/rock_model_v002.mb"):
+        touch(scenes / name)
+    catalog = make_catalog(tmp_path)
+    assert catalog.scan() == 3
+    assert catalog.names() == [("forest", "layout"), ("rock", "model")]
+    assert catalog.scan() == 0
+    touch(scenes / "forest" / "forest_layout_v002.ma")
+    assert catalog.scan() == 1
+    assert [entry.version for entry in catalog.versions("forest")] == [1, 2]
+    shutil.rmtree(str(scenes / "rocks"))
+    assert catalog.scan() == 1
+    assert catalog.descriptors() == ["forest"]
+
+
+def test_catalog_persists_between_sessions(tmp_path):
+    touch(tmp_path / "scenes" / "forest_layout_v003.ma")
+    make_catalog(tmp_path).scan()
+    catalog = make_catalog(tmp_path)
+    assert catalog.scan() == 0
+    assert catalog.latest_version(tmp_path / "scenes", "forest", "layout",
+                                  ".ma") == 3
+
+
+def test_latest_and_record(tmp_path):
+    scenes = tmp_path / "scenes"
+    for ver in (1, 2, 10):
+        touch(scenes / "forest_layout_v{:03d}.ma".format(ver))
+    catalog = make_catalog(tmp_path)
+    catalog.scan()
+    saved = scenes / "forest_layout_v1000.ma"
+    touch(saved)
+    catalog.record(saved)
+    latest = catalog.latest(descriptor="forest")
+    assert [entry.version for entry in latest] == [1000]
+    assert latest[0].path == str(saved)
@@ -0,0 +1,76 @@
+import os
+import pathlib
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "bench"))
+
+import fake_maya  # noqa: E402
+
+fake_maya.install()
+
+import scenefile  # noqa: E402
+import version_index  # noqa: E402
+
+
+def test_parses_the_path():
+    scene_file = scenefile.SceneFile("/proj/scenes/forest_layout_v012.mb")
+    assert scene_file.folder_path == pathlib.Path("/proj/scenes")
+    assert scene_file.descriptor == "forest"
+    assert scene_file.task == "layout"
+    assert scene_file.ver == 12
+    assert scene_file.ext == ".mb"
+
+
+@pytest.mark.parametrize("name", ["forest_layout_v001.ma",
+                                  "forest_layout_v1000.ma"])
+def test_path_round_trip(name):
+    path = pathlib.Path("/proj/scenes") / name
+    scene_file = scenefile.SceneFile(str(path))
+    assert scene_file.filename == name
+    assert scene_file.path == path
+    assert scenefile.SceneFile(scene_file.path).path == path
+
+
+def test_defaults():
+    scene_file = scenefile.SceneFile()
+    assert scene_file.filename == "main_model_v001.ma"
+    scene_file.ver = 7
+    assert scene_file.filename == "main_model_v007.ma"
+
+
+@pytest.mark.parametrize("name", ["forest.ma", "forest_layout.ma",
+                                  "forest_layout_extra_v001.ma",
+                                  "forest_layout_vx.ma"])
+def test_names_off_the_convention_raise(name):
+    with pytest.raises(ValueError):
+        scenefile.SceneFile(os.path.join("/proj/scenes", name))
+
+
+def test_next_avail_ver(tmp_path):
+    version_index.clear()
+    scene_file = scenefile.SceneFile(str(tmp_path / "forest_layout_v001.ma"))
+    assert scene_file.next_avail_ver() == 1
+    for name in ("forest_layout_v001.ma", "forest_layout_v009.ma",
+                 "forest_model_v020.ma", "forest_layout_v030.mb",
+                 "meadow_layout_v040.ma", "notes.txt"):
+        tmp_path.joinpath(name).write_bytes(b"")
+    version_index.clear()
+    assert scene_file.next_avail_ver() == 10
+
+
+def test_from_current_scene(monkeypatch):
+    monkeypatch.setitem(fake_maya.commands, "file",
+                        lambda **kwargs: "/proj/scenes/forest_layout_v003.ma")
+    scene_file = scenefile.SceneFile.from_current_scene()
+    assert scene_file.path == pathlib.Path("/proj/scenes/"
+                                           "forest_layout_v003.ma")
+
+
+def test_from_current_scene_of_a_new_scene(monkeypatch):
+    monkeypatch.setitem(fake_maya.commands, "file", lambda **kwargs: "")
+    scene_file = scenefile.SceneFile.from_current_scene()
+    assert scene_file.path == pathlib.Path(".", "scenes",
+                                           "main_model_v001.ma")
@@ -0,0 +1,59 @@
+import os
+
+import version_index
+
+
+def touch(folder, name):
+    folder.joinpath(name).write_bytes(b"")
+
+
+def test_parse_filename():
+    assert version_index.parse_filename("forest_layout_v012.ma") == (
+        ("forest", "layout", ".ma"), 12)
+    assert version_index.parse_filename("notes.txt") is None
+
+
+def test_latest_version_past_999(tmp_path):
+    version_index.clear()
+    touch(tmp_path, "forest_layout_v998.ma")
+    touch(tmp_path, "forest_layout_v999.ma")
+    assert version_index.latest_version(tmp_path, "forest", "layout",
+                                        ".ma") == 999
+    mtime = version_index.folder_mtime(tmp_path)
+    touch(tmp_path, "forest_layout_v1000.ma")
+    version_index.record_save(tmp_path / "forest_layout_v1000.ma", mtime)
+    assert version_index.latest_version(tmp_path, "forest", "layout",
+                                        ".ma") == 1000
+    version_index.clear()
+    assert version_index.latest_version(tmp_path, "forest", "layout",
+                                        ".ma") == 1000
+
+
+def test_own_save_does_not_hide_others(tmp_path):
+    version_index.clear()
+    touch(tmp_path, "forest_layout_v001.ma")
+    assert version_index.latest_version(tmp_path, "forest", "layout",
+                                        ".ma") == 1
+    touch(tmp_path, "forest_layout_v005.ma")
+    touch(tmp_path, "forest_layout_v002.ma")
+    version_index.record_save(tmp_path / "forest_layout_v002.ma",
+                              version_index.folder_mtime(tmp_path))
+    assert version_index.latest_version(tmp_path, "forest", "layout",
+                                        ".ma") == 5
+
+
+def test_save_into_an_unindexed_folder_does_not_list_it(tmp_path,
+                                                       monkeypatch):
+    version_index.clear()
+    listed = []
+    scandir = os.scandir
+    monkeypatch.setattr(version_index.os, "scandir",
+                        lambda folder: listed.append(folder) or
+                        scandir(folder))
+    touch(tmp_path, "forest_layout_v003.ma")
+    version_index.record_save(tmp_path / "forest_layout_v003.ma",
+                              version_index.folder_mtime(tmp_path))
+    assert not listed
+    assert version_index.latest_version(tmp_path, "forest", "layout",
+                                        ".ma") == 3
+    assert len(listed) == 1